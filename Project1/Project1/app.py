@@ -3,14 +3,23 @@ try:
     from tkinter import ttk
     from os import path
     from enum import Enum
-    from ctypes import windll
     import threading
-    from .text_classification import AI
+    import queue
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from .registry import ModelRegistry, build_ai, print_event
+    from .ensemble import Ensemble
+    from .predictioncache import PredictionCache
     from .spinner import Spinner
 except ModuleNotFoundError as e:
     print(f"Couldn't import modules: {e}")
     exit(1)
 
+try:
+    from ctypes import windll
+except ImportError:
+    windll = None
+
 class Appstate(Enum):
     START = 0
     INPUT = 1
@@ -20,6 +29,11 @@ class Appstate(Enum):
     CNN = 5
     MODELBUILT = 6
     ANALYSIS = 7
+    FAILED = 8
+    ENSEMBLE = 9
+
+LIVE_DELAY = 300
+POLL_INTERVAL = 20
 
 class app:
     """
@@ -32,21 +46,47 @@ class app:
     - state (Appstate): The current state of the application.
     - modelstate (Appstate): The current model selected by the user.
     - analysistext (tk.StringVar): A variable for storing the text to be analyzed.
+    - live (tk.BooleanVar): Whether the text is re-scored as the user types.
+    - analyzer (ThreadPoolExecutor): The single worker thread the model calls run on, so the window stays responsive.
+    - request (int): The number of the latest analysis request. Results of older requests are stale and dropped.
+    - pending (str): The `after` id of the scheduled live analysis, or None.
+    - registry (ModelRegistry): Keeps the loaded models warm so switching between them needs no reload.
+    - ai (AI or Ensemble): The selected model, or None before one is loaded.
+    - events (queue.Queue): The state transitions and progress messages posted by background workers, handled on the Tk main thread by `onevent`.
+    - outstanding (int): The number of background tasks that have not finished yet.
+    - polling (str): The `after` id of the next poll of the event queue, or None while no task is outstanding.
+    - started (float): The `time.perf_counter()` value at launch.
+    - timings (dict): The seconds from launch to the first window ("first_window") and to the first prediction ("first_prediction").
     
     Methods:
     - __init__: Initializes the application with the given root window.
     - __new__: A singleton method for ensuring only one instance of the class is created.
     - setgeometry: Sets up the geometry of the root window.
     - setupui: Sets up the UI of the application.
+    - post: Posts an event to the Tk main loop from any thread.
+    - background: Runs a task off the main thread and polls its events until it finishes.
+    - poll: Handles the posted events while background tasks are outstanding.
+    - report: Posts a progress message to the status line from any thread.
+    - transition: Posts a state transition from any thread.
+    - onevent: Handles the posted events on the Tk main thread.
+    - setstate: Changes the state and updates the UI for it.
+    - firstmap: Records the time to the first window and starts the background warm-up.
+    - warmup: Imports the ML stack on a background thread.
+    - registryevent: Reports model loads in the status line.
+    - selectui: Shows the model selection buttons.
     - style_button: Sets up the style of the buttons in the application.
-    - updateui: Updates the UI of the application based on its current state.
+    - updateui: Updates the UI of the application for its current state.
     - rnn: Starts the process of building an RNN model.
     - lstm: Starts the process of building an LSTM model.
     - cnn: Starts the process of building a CNN model.
+    - ensemble: Starts the process of building an ensemble of all three models.
     - startbuild: Starts the process of building the model selected by the user.
     - build: The method for building the model.
-    - analyze: Analyzes the text in the entry box using the current model.
+    - analyze: Starts the analysis of the text in the entry box on the worker thread.
+    - textchanged: Cancels stale results and schedules a live analysis when the text changes.
+    - showresult: Shows the result of an analysis unless it is stale.
     - clear: Clears the text in the entry box.
+    - switchmodel: Returns to the model selection screen.
     """
     _instance = None
     def __new__(cls, *args, **kwargs):
@@ -66,29 +106,45 @@ class app:
         if not cls._instance:
             cls._instance = super().__new__(cls)
         return cls._instance
-    def __init__(self, root):
+    def __init__(self, root, started=None):
         """
         Initializes the application with the given root window.
 
-        This method sets up the main window of the application and initializes its attributes. It sets the DPI awareness level, sets the window title, sets the window geometry, disables resizing, styles the buttons, initializes the analysis text variable, sets the window icon, sets the initial state of the application, and sets up the UI.
+        This method sets up the main window of the application and initializes its attributes. It sets the DPI awareness level on Windows, sets the window title, sets the window geometry, disables resizing, styles the buttons, initializes the analysis text variable, sets the window icon, sets the initial state of the application, and sets up the UI.
+        Nothing here imports TensorFlow, so the window shows immediately. The ML stack is imported in the background once the window is mapped.
 
         Parameters:
         - root (tkinter.Tk): The main window of the application.
+        - started (float, optional): The `time.perf_counter()` value at launch, used to measure the time to the first window and the first prediction. Defaults to now.
         """
         if not hasattr(self, 'root'):
-            windll.shcore.SetProcessDpiAwareness(2)
+            if windll is not None:
+                windll.shcore.SetProcessDpiAwareness(2)
             self.root = root
+            self.started = started if started is not None else time.perf_counter()
+            self.timings = {}
+            self.events = queue.Queue()
+            self.outstanding = 0
+            self.polling = None
             self.root.title("Sentiment Analysis")
             self.setgeometry()
             self.root.resizable(False, False)
             self.style_button()
             self.analysistext = tk.StringVar()
+            self.analysistext.trace_add("write", self.textchanged)
+            self.live = tk.BooleanVar(value=False)
+            self.analyzer = ThreadPoolExecutor(1, thread_name_prefix="analysis")
+            self.request = 0
+            self.pending = None
             try:
                 self.root.iconbitmap(path.join(path.dirname(__file__), 'assets', 'app.ico'))
             except Exception as e:
                 print(f"Couldn't set icon: {e}")
             self.state = Appstate.START
+            self.ai = None
+            self.registry = ModelRegistry(capacity=3, loader=build_ai, cache=PredictionCache(capacity=10000), on_event=self.registryevent)
             self.setupui()
+            self.root.bind("<Map>", self.firstmap)
             
     def setgeometry(self):
         """
@@ -107,7 +163,144 @@ class app:
         Parameters:
         - self: The instance of the class.
         """
-        self.root.heading1 = ttk.Label(self.root, text="Sentiment Analysis", font=("Helvetica", 36)).pack(pady=20)
+        self.root.heading1 = ttk.Label(self.root, text="Sentiment Analysis", font=("Helvetica", 36))
+        self.root.heading1.pack(pady=20)
+        self.root.status = ttk.Label(self.root, text="", font=("Helvetica", 12))
+        self.root.status.pack(side="bottom", pady=5)
+        self.selectui()
+
+    def post(self, kind, value):
+        """
+        Posts an event to the Tk main loop. Safe to call from any thread.
+
+        The event is only queued: no Tk call is made, so it works with any Tcl build. The main thread handles it in `onevent` on its next `poll`, which runs while a `background` task is outstanding.
+
+        Parameters:
+        - kind (str): "state", "progress", "result" or "done".
+        - value (Appstate, str or tuple): The new state, the progress message, or the request number and sentiment of an analysis. None for "done".
+        """
+        self.events.put((kind, value))
+
+    def background(self, task, executor=None):
+        """
+        Runs a task off the main thread, and polls the event queue from the main thread until the task finishes. Must be called on the Tk main thread.
+
+        Parameters:
+        - task (callable): The task. It must reach the UI only through `post`.
+        - executor (ThreadPoolExecutor, optional): Runs the task. Defaults to a new daemon thread.
+        """
+        def run():
+            try:
+                task()
+            finally:
+                self.post("done", None)
+        self.outstanding += 1
+        if self.polling is None:
+            self.polling = self.root.after(POLL_INTERVAL, self.poll)
+        if executor is None:
+            threading.Thread(target=run, daemon=True).start()
+        else:
+            executor.submit(run)
+
+    def poll(self):
+        """
+        Handles the posted events, and polls again every `POLL_INTERVAL` milliseconds while background tasks are outstanding. Runs on the Tk main thread, so nothing runs there while the app is idle.
+        """
+        self.polling = None
+        self.onevent()
+        if self.outstanding and self.polling is None:
+            self.polling = self.root.after(POLL_INTERVAL, self.poll)
+
+    def report(self, message):
+        """
+        Posts a progress message to the status line. Safe to call from any thread.
+
+        Parameters:
+        - message (str): The message.
+        """
+        self.post("progress", message)
+
+    def transition(self, state):
+        """
+        Posts a state transition, applied on the Tk main thread. Safe to call from any thread.
+
+        Parameters:
+        - state (Appstate): The new state.
+        """
+        self.post("state", state)
+
+    def onevent(self):
+        """
+        Handles the events posted by background workers on the Tk main thread. State transitions update the UI, progress messages are shown in the status line, analysis results in the sentiment label, and finished tasks are no longer outstanding.
+        """
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "done":
+                self.outstanding -= 1
+            elif kind == "state":
+                self.setstate(value)
+            elif kind == "result":
+                self.showresult(*value)
+            else:
+                self.root.status.config(text=value)
+
+    def setstate(self, state):
+        """
+        Changes the state of the application and updates the UI for it. Must be called on the Tk main thread.
+
+        Parameters:
+        - state (Appstate): The new state.
+        """
+        self.state = state
+        self.updateui()
+
+    def firstmap(self, event):
+        """
+        Records the time to the first window and starts the background warm-up.
+
+        Parameters:
+        - event (tkinter.Event): The <Map> event. Events of child widgets are ignored.
+        """
+        if event.widget is not self.root or "first_window" in self.timings:
+            return
+        self.timings["first_window"] = time.perf_counter() - self.started
+        print(f"Startup: first window after {self.timings['first_window']:.2f}s")
+        self.warmup()
+
+    def warmup(self):
+        """
+        Imports TensorFlow and the model code on a background thread, so the first model selection does not wait for it.
+        """
+        def warmup_task():
+            self.report("Loading TensorFlow...")
+            start = time.perf_counter()
+            from . import text_classification
+            self.report(f"Ready (TensorFlow loaded in {time.perf_counter() - start:.1f}s)")
+        self.background(warmup_task)
+
+    def registryevent(self, event, modelname, info):
+        """
+        Prints registry events and reports model loads in the status line.
+
+        Parameters:
+        - event (str): "load", "hit" or "evict".
+        - modelname (str): The model concerned.
+        - info (dict): The event details.
+        """
+        print_event(event, modelname, info)
+        if event == "load":
+            self.report(f"Loaded {modelname} in {info['seconds']:.1f}s")
+
+    def selectui(self):
+        """
+        Shows the model selection heading and buttons.
+
+        Parameters:
+        - self: The instance of the class.
+        """
         self.root.heading2 = ttk.Label(self.root, text="Select Model", font=("Helvetica", 24)).pack()
         self.root.button1 = ttk.Button(self.root, text="RNN", command=self.rnn, style="MyButton.TButton")
         self.root.button1.pack(pady=10, ipady=5, ipadx=5)
@@ -115,6 +308,8 @@ class app:
         self.root.button2.pack(pady=10, ipady=5, ipadx=5)
         self.root.button3 = ttk.Button(self.root, text="CNN", command=self.cnn, style="MyButton.TButton")
         self.root.button3.pack(pady=10, ipady=5, ipadx=5)
+        self.root.button7 = ttk.Button(self.root, text="Ensemble", command=self.ensemble, style="MyButton.TButton")
+        self.root.button7.pack(pady=10, ipady=5, ipadx=5)
         
     @classmethod
     def style_button(cls):
@@ -142,53 +337,48 @@ class app:
         
     def updateui(self):
         """
-        Updates the user interface based on the current state of the application.
+        Updates the user interface for the current state of the application. Called by `setstate` on every state transition, on the Tk main thread.
 
-        This method is responsible for updating the user interface of the application based on its current state. It performs different actions depending on the value of the `state` attribute.
+        If the state is `Appstate.INPUT`, the method destroys all the widgets in the main window except for the heading1 and status labels. It then creates a new heading2 label with the text "Building" and a loading Spinner widget, packs them, starts the spinner and changes the state to `Appstate.BUILDING`. The spinner animates on the main loop and stops when it is destroyed.
 
-        If the state is `Appstate.INPUT`, the method destroys all the widgets in the main window except for the heading1 label. It then creates a new heading2 label with the text "Building" and packs it into the main window. It also creates a new loading Spinner widget with specified size, color, number of segments, speed, and width. The loading widget is packed into the main window. The state is changed to `Appstate.BUILDING` and a new thread is started to rotate the loading widget. A binding is created to stop the loading widget when it is destroyed.
+        If the state is `Appstate.MODELBUILT`, the method stops the spinner. It destroys all the widgets in the main window except for the heading1 and status labels, and creates the current model label, the entry widget, the "Analyze", "Clear" and "Switch Model" buttons, the "Live" checkbox and the sentiment label. The state is changed to `Appstate.ANALYSIS`.
 
-        If the state is `Appstate.BUILDING`, the method is an intermediate state. It does nothing.
+        If the state is `Appstate.FAILED`, the model could not be loaded. The method stops the spinner and shows the model selection buttons again.
 
-        If the state is `Appstate.MODELBUILT`, the method stops the loading widget rotation. It destroys all the widgets in the main window except for the heading1 label. It creates a new sentiment label with an empty text and packs it into the main window. It also creates a new currmodel label with the text "Current Model: " followed by the name of the current model state. It packs the currmodel label into the main window. It creates a new entry widget with specified font, width, and textvariable. The entry widget is packed into the main window. It creates two new buttons with the text "Analyze" and "Clear" respectively, and specified command and style. The buttons are packed into the main window. The sentiment label is packed into the main window. The state is changed to `Appstate.ANALYSIS`.
-
-        If the state is `Appstate.ANALYSIS`, the method is an intermediate state. It does nothing.
-
-        After performing the necessary actions, the method schedules itself to be called again after 50 milliseconds using the `after` method of the main window.
+        The other states need no UI change.
 
         Parameters:
         - self: The instance of the class.
         """
         if self.state == Appstate.INPUT:
             for widget in self.root.winfo_children():
-                if widget != self.root.heading1:
+                if widget not in (self.root.heading1, self.root.status):
                     widget.destroy()
             self.root.heading2 = ttk.Label(self.root, text="Building", font=("Helvetica", 24)).pack()
             self.root.loading = Spinner(self.root, size=100, color="blue", num_segments=12, speed=2, width=5)
             self.root.loading.pack()
-            self.state = Appstate.BUILDING
-            threading.Thread(target=self.root.loading.rotate).start()
             self.root.loading.bind("<Destroy>", lambda event: self.root.loading.on_destroy())
-        elif self.state == Appstate.BUILDING:
-            # self.root.loading.rotate()
-            pass
+            self.root.loading.start()
+            self.state = Appstate.BUILDING
         elif self.state == Appstate.MODELBUILT:
             self.root.loading.stop()
             for widget in self.root.winfo_children():
-                if widget != self.root.heading1:
+                if widget not in (self.root.heading1, self.root.status):
                     widget.destroy()
             self.root.sentiment = ttk.Label(self.root, text="", font=("Helvetica", 24))
             self.root.currmodel = ttk.Label(self.root, text="Current Model: " + self.modelstate.name, font=("Helvetica", 24)).pack()
             self.root.entry = ttk.Entry(self.root, font=("Helvetica", 24), width=50, textvariable=self.analysistext).pack()
             self.root.button4 = ttk.Button(self.root, text="Analyze", command=self.analyze, style="MyButton.TButton").pack()
             self.root.button5 = ttk.Button(self.root, text="Clear", command=self.clear, style="MyButton.TButton").pack()
+            self.root.button6 = ttk.Button(self.root, text="Switch Model", command=self.switchmodel, style="MyButton.TButton").pack()
+            self.root.livecheck = ttk.Checkbutton(self.root, text="Live", variable=self.live, command=self.textchanged).pack()
             self.root.sentiment.pack()
             self.state = Appstate.ANALYSIS
-        elif self.state == Appstate.ANALYSIS:
-            pass
-            
-        self.root.after(50, self.updateui)
-        
+        elif self.state == Appstate.FAILED:
+            if hasattr(self.root, "loading"):
+                self.root.loading.stop()
+            self.switchmodel()
+
     def rnn(self):
         """
         Sets the model state to Appstate.RNN and starts the build process.
@@ -227,58 +417,135 @@ class app:
         print("CNN")
         self.modelstate = Appstate.CNN
         self.startbuild()
+
+    def ensemble(self):
+        """
+        Sets the model state to Appstate.ENSEMBLE and starts the build process.
+
+        The ensemble runs RNN, LSTM and CNN together on one tokenization pass and labels a text "Uncertain" when they disagree.
+
+        Parameters:
+        - self (object): The instance of the class.
+        """
+        print("Ensemble")
+        self.modelstate = Appstate.ENSEMBLE
+        self.startbuild()
         
     def startbuild(self):
         """
         Starts the build process by setting the state to Appstate.INPUT and calling the build() method.
 
-        This function sets the state attribute of the object to Appstate.INPUT, indicating that the build process is about to begin. It then calls the build() method to perform the actual build.
+        This function sets the state of the object to Appstate.INPUT, which shows the spinner, and then calls the build() method to perform the actual build on a background thread.
 
         Parameters:
         - self (object): The instance of the class.
         """
-        self.state = Appstate.INPUT
+        self.setstate(Appstate.INPUT)
         self.build()
         
     def build(self):
         """
         Builds the model based on the current model state.
 
-        This function is responsible for building the model based on the current model state. It creates a new thread that runs the `build_task` function. The `build_task` function builds the user-selected model and then sets the state of the object to `Appstate.MODELBUILT`.
+        This function is responsible for building the model based on the current model state. It creates a new thread that runs the `build_task` function. The `build_task` function gets the user-selected model from the registry, which only loads or builds it if it is not already warm, and then posts a transition to `Appstate.MODELBUILT`, or to `Appstate.FAILED` if loading raised, which the Tk main loop applies. Progress is reported to the status line.
 
         Parameters:
         - self (object): The instance of the class.
         """
-        self.ai = AI(modelname=self.modelstate.name)
         def build_task():
-            self.ai.build()
-            self.state = Appstate.MODELBUILT
-        threading.Thread(target=build_task).start()
+            modelname = self.modelstate.name
+            self.report(f"Loading {modelname}...")
+            try:
+                if isinstance(self.ai, Ensemble):
+                    self.ai.close()
+                if self.modelstate == Appstate.ENSEMBLE:
+                    self.ai = Ensemble({name: self.registry.get(name) for name in ("RNN", "LSTM", "CNN")}, combination="disagreement")
+                else:
+                    self.ai = self.registry.get(modelname)
+            except Exception as e:
+                self.report(f"Couldn't load {modelname}: {e}")
+                self.transition(Appstate.FAILED)
+                return
+            self.transition(Appstate.MODELBUILT)
+        self.background(build_task)
         
     def analyze(self):
         """
-        Analyzes the input text and updates the sentiment label accordingly.
+        Starts the analysis of the input text on the worker thread.
 
-        This function checks if the analysis text is empty. If it is, it updates the sentiment label to display the message "Please enter text". If the analysis text is not empty, it checks the sentiment of the text and updates the sentiment label accordingly. The sentiment label is colour-coded accordingly.
+        This function checks if the analysis text is empty. If it is, it updates the sentiment label to display the message "Please enter text". If the analysis text is not empty, it numbers the request and submits it to the worker thread, which posts the sentiment back to the main loop for `showresult`. A request still queued when a newer one arrives is skipped without calling the model.
 
         Parameters:
         - self (object): The instance of the class.
         """
-        if self.analysistext.get() == "":
-            self.root.sentiment.config(text="Please enter text")
+        self.pending = None
+        text = self.analysistext.get()
+        if text == "":
+            self.root.sentiment.config(text="Please enter text", foreground="")
+            return
+        self.request += 1
+        request = self.request
+        ai = self.ai
+        if not self.live.get():
+            self.root.sentiment.config(text="Analyzing...", foreground="gray")
+
+        def analyze_task():
+            if request != self.request:
+                return
+            try:
+                sentiment = ai.analyze(text)
+            except Exception as e:
+                self.report(f"Couldn't analyze the text: {e}")
+                sentiment = None
+            self.post("result", (request, sentiment))
+        self.background(analyze_task, self.analyzer)
+
+    def textchanged(self, *args):
+        """
+        Cancels stale results when the text changes, and in live mode schedules an analysis of the latest text.
+
+        Results of requests made before the change are dropped. In live mode the analysis starts `LIVE_DELAY` milliseconds after the last change, so typing does not queue a model call per keystroke and only the latest text is scored.
+
+        Parameters:
+        - *args: The arguments of the variable trace, unused.
+        """
+        self.request += 1
+        if self.state != Appstate.ANALYSIS:
+            return
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
+        if not self.live.get():
+            self.root.sentiment.config(text="")
+        elif self.analysistext.get() == "":
+            self.root.sentiment.config(text="")
         else:
-            if self.ai.analyze(self.analysistext.get()) == "Positive":
-                self.root.sentiment.config(text="Positive")
-                self.root.sentiment.config(foreground="green")
-            elif self.ai.analyze(self.analysistext.get()) == "Negative":
-                self.root.sentiment.config(text="Negative")
-                self.root.sentiment.config(foreground="red")
-                
+            self.pending = self.root.after(LIVE_DELAY, self.analyze)
+
+    def showresult(self, request, sentiment):
+        """
+        Shows the result of an analysis in the sentiment label, colour-coded by sentiment, unless a newer request or a text change made it stale. The time from launch to the first prediction is recorded and printed.
+
+        Parameters:
+        - request (int): The number of the request.
+        - sentiment (str): The sentiment, or None if the analysis failed.
+        """
+        if request != self.request or self.state != Appstate.ANALYSIS:
+            return
+        if sentiment is None:
+            self.root.sentiment.config(text="")
+            return
+        if "first_prediction" not in self.timings:
+            self.timings["first_prediction"] = time.perf_counter() - self.started
+            print(f"Startup: first prediction after {self.timings['first_prediction']:.2f}s")
+        colors = {"Positive": "green", "Negative": "red", "Uncertain": "orange"}
+        self.root.sentiment.config(text=sentiment, foreground=colors.get(sentiment, ""))
+
     def clear(self):
         """
         Clears the analysis text and resets the sentiment label.
 
-        This function clears the `analysistext` variable by setting it to an empty string. It also resets the `text` attribute of the `sentiment` widget to an empty string.
+        This function clears the `analysistext` variable by setting it to an empty string, which also cancels any pending analysis. It also resets the `text` attribute of the `sentiment` widget to an empty string.
 
         Parameters:
         - self (object): The instance of the class.
@@ -286,17 +553,33 @@ class app:
         self.analysistext.set("")
         self.root.sentiment.config(text="")
 
+    def switchmodel(self):
+        """
+        Returns to the model selection screen.
+
+        This function clears the analysis text, destroys all the widgets in the main window except for the heading1 label and shows the model selection buttons again. Models that were already loaded stay warm in the registry.
+
+        Parameters:
+        - self (object): The instance of the class.
+        """
+        self.analysistext.set("")
+        for widget in self.root.winfo_children():
+            if widget not in (self.root.heading1, self.root.status):
+                widget.destroy()
+        self.state = Appstate.START
+        self.selectui()
+
     @classmethod
-    def run(cls):
+    def run(cls, started=None):
         """
         Run the application.
 
-        This class method initializes a Tkinter root window, creates an instance of the class with the root window, and calls the `updateui` method to update the user interface. It then enters the Tkinter main loop to start the application.
+        This class method initializes a Tkinter root window and creates an instance of the class with the root window. It then enters the Tkinter main loop, which polls the events posted by background workers while any are running and updates the user interface for them.
 
         Parameters:
         - cls (type): The class object.
+        - started (float, optional): The `time.perf_counter()` value at launch. Defaults to now.
         """
         root = tk.Tk()
-        _app_instance = cls(root)
-        _app_instance.updateui()
+        cls(root, started)
         root.mainloop()
\ No newline at end of file
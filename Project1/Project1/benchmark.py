@@ -0,0 +1,459 @@
+try:
+    import json
+    import os
+    import platform
+    import sys
+    import tempfile
+    import time
+    from os import path
+    import numpy as np
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+REPORT_FORMAT_VERSION = 1
+
+def _word(index):
+    """
+    Returns the synthetic word with the given rank, spelled in base 26.
+    """
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('a') + remainder) + letters
+    return letters
+
+class SyntheticCorpus:
+    """
+    A reproducible synthetic review corpus.
+
+    Words follow a Zipf distribution over a fixed vocabulary, and review lengths follow a log-normal distribution close to that of IMDB reviews, so tokenization and padding costs are realistic without any download.
+    """
+    def __init__(self, seed=0, vocab_size=20000, mean_words=230, sigma=0.7):
+        """
+        Initializes the corpus generator.
+
+        Parameters:
+        - seed (int, optional): The random seed. Defaults to 0.
+        - vocab_size (int, optional): The number of distinct words. Defaults to 20000.
+        - mean_words (int, optional): The mean review length in words. Defaults to 230.
+        - sigma (float, optional): The spread of the log-normal length distribution. Defaults to 0.7.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.vocab = np.array([_word(i) for i in range(vocab_size)])
+        weights = 1.0 / np.arange(1, vocab_size + 1) ** 1.1
+        self.probabilities = weights / weights.sum()
+        self.mean_words = mean_words
+        self.sigma = sigma
+
+    def lengths(self, n):
+        """
+        Draws review lengths.
+
+        Parameters:
+        - n (int): The number of lengths.
+
+        Returns:
+        - lengths (numpy.ndarray): Lengths in words, between 5 and 2500.
+        """
+        mu = np.log(self.mean_words) - self.sigma ** 2 / 2
+        return np.clip(self.rng.lognormal(mu, self.sigma, n), 5, 2500).astype(int)
+
+    def texts(self, n, length=None):
+        """
+        Generates reviews.
+
+        Parameters:
+        - n (int): The number of reviews.
+        - length (int, optional): The length of every review in words. Defaults to None (realistic lengths).
+
+        Returns:
+        - texts (list): The reviews.
+        """
+        lengths = [length] * n if length else self.lengths(n)
+        words = self.vocab[self.rng.choice(len(self.vocab), size=int(np.sum(lengths)), p=self.probabilities)]
+        texts = []
+        start = 0
+        for count in lengths:
+            texts.append(" ".join(words[start:start + count]) + ".")
+            start += count
+        return texts
+
+def read_corpus(filename, limit=None):
+    """
+    Reads a locally cached review corpus with one review per line.
+
+    Parameters:
+    - filename (str): The corpus file.
+    - limit (int, optional): The maximum number of reviews. Defaults to None.
+
+    Returns:
+    - texts (list): The reviews.
+    """
+    texts = []
+    with open(filename, encoding="utf8") as f:
+        for line in f:
+            if line.strip():
+                texts.append(line.rstrip("\r\n"))
+                if limit and len(texts) >= limit:
+                    break
+    return texts
+
+def latency_stats(samples, items):
+    """
+    Summarizes per-call latencies.
+
+    Parameters:
+    - samples (list): The call durations in seconds.
+    - items (int): The number of items processed per call.
+
+    Returns:
+    - stats (dict): The p50, p90 and p99 latencies and the mean in milliseconds, and the throughput in items per second.
+    """
+    samples = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p90_ms": float(np.percentile(samples, 90)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+        "throughput": float(items / (samples.mean() / 1000))
+    }
+
+def timed(function, iterations, warmup=2):
+    """
+    Times repeated calls of a function.
+
+    Parameters:
+    - function (callable): The function to time.
+    - iterations (int): The number of timed calls.
+    - warmup (int, optional): The number of untimed calls first. Defaults to 2.
+
+    Returns:
+    - samples (list): The duration of each timed call in seconds.
+    """
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+class Benchmark:
+    """
+    An offline benchmark suite for `text_classification.AI`.
+
+    It measures tokenization throughput, and for every model: load time, time per training epoch, inference latency percentiles and throughput across batch sizes and input lengths, the speedup of length bucketing on reviews of natural length, and the epoch time, inference throughput and label agreement of each execution mode. Saved models are used when present; otherwise untrained models of the same architecture are timed, which is representative because the cost does not depend on the weights. Results are returned as a machine-readable report.
+    """
+    def __init__(self, models=("RNN", "LSTM", "CNN"), batch_sizes=(1, 32, 256), lengths=(20, 100, 400), iterations=20, train_samples=2048, epochs=2, corpus=None, seed=0, log=None, modes=("default",)):
+        """
+        Initializes the suite.
+
+        Parameters:
+        - models (tuple, optional): The models to benchmark. Defaults to ("RNN", "LSTM", "CNN").
+        - batch_sizes (tuple, optional): The inference batch sizes. Defaults to (1, 32, 256).
+        - lengths (tuple, optional): The input lengths in words. Defaults to (20, 100, 400).
+        - iterations (int, optional): The number of timed calls per measurement. Defaults to 20.
+        - train_samples (int, optional): The number of training reviews per epoch. Defaults to 2048.
+        - epochs (int, optional): The number of timed training epochs. Defaults to 2.
+        - corpus (str, optional): A local review corpus with one review per line. Defaults to None (synthetic reviews).
+        - seed (int, optional): The random seed. Defaults to 0.
+        - log (file object, optional): Where progress is printed. Defaults to stderr.
+        - modes (tuple, optional): The execution modes compared, see `AI`. Defaults to ("default",).
+        """
+        self.models = models
+        self.batch_sizes = batch_sizes
+        self.lengths = lengths
+        self.iterations = iterations
+        self.train_samples = train_samples
+        self.epochs = epochs
+        self.corpus = corpus
+        self.seed = seed
+        self.log = log or sys.stderr
+        self.modes = modes
+        self.metrics = []
+        self.synthetic = SyntheticCorpus(seed)
+
+    def record(self, name, value, unit, better):
+        """
+        Records one metric.
+
+        Parameters:
+        - name (str): The dotted metric name.
+        - value (float): The measured value.
+        - unit (str): The unit of the value.
+        - better (str): "lower" or "higher", the direction of improvement.
+        """
+        self.metrics.append({"name": name, "value": float(value), "unit": unit, "better": better})
+        print(f"{name}: {value:.3f} {unit}", file=self.log, flush=True)
+
+    def record_latency(self, prefix, samples, items):
+        """
+        Records the latency percentiles and throughput of a measurement.
+
+        Parameters:
+        - prefix (str): The dotted metric name prefix.
+        - samples (list): The call durations in seconds.
+        - items (int): The number of items processed per call.
+        """
+        for key, value in latency_stats(samples, items).items():
+            if key == "throughput":
+                self.record(prefix + ".throughput", value, "items/s", "higher")
+            else:
+                self.record(prefix + "." + key, value, "ms", "lower")
+
+    def texts(self, n, length=None):
+        """
+        Returns benchmark reviews from the local corpus or the synthetic generator.
+
+        Parameters:
+        - n (int): The number of reviews.
+        - length (int, optional): The length of every review in words. Defaults to None (natural lengths).
+
+        Returns:
+        - texts (list): The reviews.
+        """
+        if self.corpus and not length:
+            texts = read_corpus(self.corpus, n)
+            return (texts * (n // max(len(texts), 1) + 1))[:n]
+        return self.synthetic.texts(n, length)
+
+    def bench_tokenization(self, tokenizer, name="tokenization.fast"):
+        """
+        Measures the tokenization throughput of a tokenizer.
+
+        Parameters:
+        - tokenizer (FastTokenizer or HashingTokenizer): The fitted tokenizer.
+        - name (str, optional): The metric name prefix. Defaults to "tokenization.fast".
+        """
+        texts = self.texts(2000)
+        samples = timed(lambda: tokenizer.texts_to_padded(texts), max(self.iterations // 4, 3), warmup=1)
+        self.record_latency(name, samples, len(texts))
+
+    def bench_model(self, modelname, tokenizer):
+        """
+        Measures load time, training epoch time and inference latency of one model.
+
+        Parameters:
+        - modelname (str): "RNN", "LSTM" or "CNN".
+        - tokenizer (FastTokenizer): The fitted tokenizer used when the model has no saved tokenizer.
+        """
+        import keras
+        from .text_classification import AI
+
+        ai = AI(modelname=modelname)
+        source = "saved" if ai.model is not None else "untrained"
+        if ai.model is None:
+            ai.model = ai.create_model()
+            ai.model.build((None, ai.maxlen))
+        if ai.tokenizer is None:
+            ai.tokenizer = tokenizer
+        print(f"Benchmarking {modelname} ({source} model)", file=self.log, flush=True)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = path.join(directory, modelname + ".keras")
+            keras.models.save_model(ai.model, filename)
+            samples = timed(lambda: keras.models.load_model(filename), 3, warmup=1)
+        self.record(f"load.{modelname}.seconds", float(np.median(samples)), "s", "lower")
+
+        self.bench_training(ai)
+
+        for length in self.lengths:
+            texts = self.texts(max(self.batch_sizes), length)
+            for batch_size in self.batch_sizes:
+                batch = texts[:batch_size]
+                samples = timed(lambda: ai.analyze_batch(batch, batch_size=batch_size), self.iterations)
+                self.record_latency(f"inference.{modelname}.bs{batch_size}.len{length}", samples, batch_size)
+
+        self.bench_bucketing(ai)
+        if self.modes != ("default",):
+            self.bench_execution(ai)
+
+    def bench_bucketing(self, ai):
+        """
+        Measures the inference throughput gain of length bucketing, and how often it changes the predicted label, on reviews of natural length and on an even mix of the benchmark's input lengths.
+
+        Parameters:
+        - ai (AI): The model.
+        """
+        batch_size = max(self.batch_sizes)
+        distributions = {
+            "natural": self.texts(batch_size * 4),
+            "mixed": [text for length in self.lengths for text in self.texts(batch_size * 4 // len(self.lengths), length)]
+        }
+        for distribution, texts in distributions.items():
+            prefix = f"bucketing.{ai.modelname}.{distribution}"
+            results = {}
+            for bucketing in (False, True):
+                mode = "bucketed" if bucketing else "fixed"
+                ai.bucketing = bucketing
+                samples = timed(lambda: ai.analyze_batch(texts, batch_size=batch_size), max(self.iterations // 4, 3))
+                self.record_latency(f"{prefix}.{mode}", samples, len(texts))
+                results[mode] = (float(np.mean(samples)), ai.analyze_batch(texts, batch_size=batch_size)[1])
+            self.record(f"{prefix}.speedup", results["fixed"][0] / results["bucketed"][0], "x", "higher")
+            self.record(f"{prefix}.label_agreement", float(np.mean((results["fixed"][1] > 0.5) == (results["bucketed"][1] > 0.5))), "ratio", "higher")
+        ai.bucketing = False
+
+    def bench_execution(self, ai):
+        """
+        Measures the time per training epoch, the inference throughput and the label agreement with the default mode of each execution mode.
+
+        Parameters:
+        - ai (AI): The model, in the default mode.
+        """
+        from .execution import resolve, with_execution
+
+        batch_size = max(self.batch_sizes)
+        padded = ai.tokenizer.texts_to_padded(self.texts(batch_size * 4), maxlen=ai.maxlen, padding=ai.padding, truncating=ai.truncating)
+        base = ai.model
+        reference = np.concatenate([np.asarray(base.predict_on_batch(padded[i:i + batch_size])).reshape(-1) for i in range(0, len(padded), batch_size)])
+        done = set()
+        for requested in self.modes:
+            mode = resolve(requested)
+            if mode in done:
+                continue
+            done.add(mode)
+            print(f"Benchmarking {ai.modelname} in {mode} mode", file=self.log, flush=True)
+            ai.execution = mode
+            self.bench_training(ai, f"execution.{ai.modelname}.{mode}")
+            model = base if mode == "default" else with_execution(base, mode)
+            run = lambda: np.concatenate([np.asarray(model.predict_on_batch(padded[i:i + batch_size])).reshape(-1) for i in range(0, len(padded), batch_size)])
+            samples = timed(run, max(self.iterations // 4, 3))
+            self.record_latency(f"execution.{ai.modelname}.{mode}.inference", samples, len(padded))
+            self.record(f"execution.{ai.modelname}.{mode}.label_agreement", float(np.mean((run() > 0.5) == (reference > 0.5))), "ratio", "higher")
+        ai.execution = "default"
+
+    def bench_training(self, ai, prefix=None):
+        """
+        Measures the time per training epoch of a fresh model of the same architecture.
+
+        Parameters:
+        - ai (AI): The model whose architecture, tokenizer and execution mode are used.
+        - prefix (str, optional): The metric name prefix. Defaults to "training.<modelname>".
+        """
+        import keras
+
+        times = []
+        class EpochTimer(keras.callbacks.Callback):
+            def on_epoch_begin(self, epoch, logs=None):
+                self.start = time.perf_counter()
+            def on_epoch_end(self, epoch, logs=None):
+                times.append(time.perf_counter() - self.start)
+
+        padded = ai.tokenizer.texts_to_padded(self.texts(self.train_samples), maxlen=ai.maxlen, padding=ai.padding, truncating=ai.truncating)
+        labels = np.random.default_rng(self.seed).integers(0, 2, len(padded))
+        model = ai.create_model()
+        model.fit(padded, labels, epochs=self.epochs + 1, verbose=0, callbacks=[EpochTimer()])
+        prefix = prefix or f"training.{ai.modelname}"
+        # The first epoch includes tracing, so it is reported separately.
+        self.record(f"{prefix}.first_epoch_seconds", times[0], "s", "lower")
+        self.record(f"{prefix}.epoch_seconds", float(np.mean(times[1:])), "s", "lower")
+        self.record(f"{prefix}.samples_per_second", len(padded) / float(np.mean(times[1:])), "items/s", "higher")
+
+    def run(self):
+        """
+        Runs the whole suite.
+
+        Returns:
+        - report (dict): The environment description and the list of recorded metrics.
+        """
+        import keras
+        import tensorflow as tf
+        from .tokenizer import FastTokenizer, HashingTokenizer
+        from .text_classification import NUM_WORDS, OOV_TOKEN
+
+        keras.utils.set_random_seed(self.seed)
+        tokenizer = FastTokenizer(num_words=NUM_WORDS, oov_token=OOV_TOKEN)
+        tokenizer.fit_on_texts(self.texts(5000))
+        self.bench_tokenization(tokenizer)
+        self.bench_tokenization(HashingTokenizer(num_words=NUM_WORDS), "tokenization.hashing")
+        for modelname in self.models:
+            self.bench_model(modelname, tokenizer)
+        return {
+            "format_version": REPORT_FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "cpu_count": os.cpu_count(),
+                "tensorflow": tf.__version__,
+                "keras": keras.__version__
+            },
+            "config": {
+                "models": list(self.models),
+                "batch_sizes": list(self.batch_sizes),
+                "lengths": list(self.lengths),
+                "iterations": self.iterations,
+                "train_samples": self.train_samples,
+                "epochs": self.epochs,
+                "corpus": self.corpus or "synthetic",
+                "seed": self.seed,
+                "modes": list(self.modes)
+            },
+            "metrics": self.metrics
+        }
+
+def compare(report, baseline, threshold=0.1):
+    """
+    Compares a report against a stored baseline.
+
+    Parameters:
+    - report (dict): The current report.
+    - baseline (dict): The baseline report.
+    - threshold (float, optional): The relative change in the worse direction that counts as a regression. Defaults to 0.1.
+
+    Returns:
+    - rows (list): One dict per metric present in both reports, with the baseline and current values, the relative change and whether it regressed.
+    """
+    previous = {metric["name"]: metric for metric in baseline["metrics"]}
+    rows = []
+    for metric in report["metrics"]:
+        before = previous.get(metric["name"])
+        if before is None or before["value"] == 0:
+            continue
+        change = (metric["value"] - before["value"]) / abs(before["value"])
+        worse = change > threshold if metric["better"] == "lower" else change < -threshold
+        rows.append({"name": metric["name"], "baseline": before["value"], "current": metric["value"], "change": change, "regression": worse})
+    return rows
+
+def print_comparison(rows, file=None):
+    """
+    Prints a comparison table, flagging regressions.
+
+    Parameters:
+    - rows (list): The rows returned by `compare`.
+    - file (file object, optional): Where to print. Defaults to stderr.
+    """
+    file = file or sys.stderr
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<55} {row['baseline']:>12.3f} {row['current']:>12.3f} {row['change']:>+8.1%} {flag}", file=file)
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{regressions} regression(s) in {len(rows)} compared metrics", file=file)
+
+def load_report(filename):
+    """
+    Reads a report written by `save_report`.
+
+    Parameters:
+    - filename (str): The report file.
+
+    Returns:
+    - report (dict): The report.
+    """
+    with open(filename, encoding="utf8") as f:
+        return json.load(f)
+
+def save_report(report, filename):
+    """
+    Writes a report as JSON.
+
+    Parameters:
+    - report (dict): The report.
+    - filename (str): The report file.
+    """
+    with open(filename, "w", encoding="utf8") as f:
+        json.dump(report, f, indent=2)
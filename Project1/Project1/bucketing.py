@@ -0,0 +1,70 @@
+try:
+    import numpy as np
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+def bucket_bounds(maxlen, smallest=16):
+    """
+    Returns the bucket lengths for sequences padded to `maxlen`: powers of two from `smallest`, then `maxlen`.
+
+    Parameters:
+    - maxlen (int): The padded length.
+    - smallest (int, optional): The shortest bucket. Defaults to 16, long enough for the CNN's convolution and pooling.
+
+    Returns:
+    - bounds (tuple): The increasing bucket lengths, ending with `maxlen`.
+    """
+    bounds = []
+    bound = smallest
+    while bound < maxlen:
+        bounds.append(bound)
+        bound *= 2
+    bounds.append(maxlen)
+    return tuple(bounds)
+
+def sequence_lengths(padded, padding='post'):
+    """
+    Recovers the unpadded length of each padded sequence. Token index 0 is only used for padding.
+
+    Parameters:
+    - padded (numpy.ndarray): The padded sequences.
+    - padding (str, optional): 'post' or 'pre'. Defaults to 'post'.
+
+    Returns:
+    - lengths (numpy.ndarray): The length of each sequence.
+    """
+    nonzero = np.asarray(padded) != 0
+    if padding == 'post':
+        lengths = nonzero.shape[1] - np.argmax(nonzero[:, ::-1], axis=1)
+    else:
+        lengths = nonzero.shape[1] - np.argmax(nonzero, axis=1)
+    return np.where(nonzero.any(axis=1), lengths, 0)
+
+def bucket_batches(padded, batch_size, bounds, padding='post', rng=None):
+    """
+    Groups padded sequences into length buckets and yields batches cropped to their bucket's length.
+
+    Parameters:
+    - padded (numpy.ndarray): The sequences, padded to `bounds[-1]`.
+    - batch_size (int): The maximum number of sequences per batch.
+    - bounds (tuple): The bucket lengths, as returned by `bucket_bounds`.
+    - padding (str, optional): 'post' or 'pre'. Defaults to 'post'.
+    - rng (numpy.random.Generator, optional): Shuffles the sequences within each bucket and the order of the batches. Defaults to None (sequences in input order, shortest bucket first).
+
+    Yields:
+    - (indices, batch) (tuple): The positions of the batch's sequences in `padded`, and the sequences with the padding beyond their bucket's length removed. Writing results to `output[indices]` restores the input order.
+    """
+    buckets = np.minimum(np.searchsorted(bounds, sequence_lengths(padded, padding)), len(bounds) - 1)
+    batches = []
+    for bucket, bound in enumerate(bounds):
+        indices = np.flatnonzero(buckets == bucket)
+        if rng is not None:
+            rng.shuffle(indices)
+        for start in range(0, len(indices), batch_size):
+            batches.append((indices[start:start + batch_size], bound))
+    order = rng.permutation(len(batches)) if rng is not None else range(len(batches))
+    for i in order:
+        indices, bound = batches[i]
+        rows = np.asarray(padded[indices])
+        yield indices, (rows[:, :bound] if padding == 'post' else rows[:, rows.shape[1] - bound:])
@@ -0,0 +1,143 @@
+try:
+    import json
+    import os
+    from os import path, makedirs
+    import keras
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+class ResumableEarlyStopping(keras.callbacks.EarlyStopping):
+    """
+    Early stopping whose patience counter and best value can be saved and restored, so a resumed run stops at the same epoch as an uninterrupted one.
+    """
+    def __init__(self, state=None, **kwargs):
+        """
+        Initializes the callback.
+
+        Parameters:
+        - state (dict, optional): A state returned by `get_state`, restored when training begins. Defaults to None (a fresh start).
+        - **kwargs: The arguments of `keras.callbacks.EarlyStopping`.
+        """
+        super().__init__(**kwargs)
+        self.restored = state
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        if self.restored:
+            self.wait = self.restored["wait"]
+            self.best = self.restored["best"]
+            self.best_epoch = self.restored["best_epoch"]
+
+    def get_state(self):
+        """
+        Returns the patience counter, the best monitored value and its epoch, and whether training was stopped, as a JSON-serializable dict.
+        """
+        return {
+            "wait": self.wait,
+            "best": None if self.best is None else float(self.best),
+            "best_epoch": self.best_epoch,
+            "stopped": bool(self.model.stop_training)
+        }
+
+class TrainingCheckpoint(keras.callbacks.Callback):
+    """
+    Saves the state of a training run at the end of every epoch, so an interrupted run can resume from the last completed epoch.
+
+    Three files are kept in the checkpoint directory:
+    - `<name>.last.keras`: The model with its optimizer state after the last completed epoch.
+    - `<name>.best.keras`: The model of the epoch with the lowest validation loss so far.
+    - `<name>.state.json`: The number of completed epochs, the history so far, the early-stopping state and the run configuration a resume must match.
+
+    Every file is written under a temporary name and moved into place, and the state is written last, so a crash mid-save leaves the previous epoch resumable. Place the callback after the early-stopping callback so it saves the state of the finished epoch.
+    """
+    def __init__(self, directory, name, config, early_stopping=None):
+        """
+        Initializes the callback.
+
+        Parameters:
+        - directory (str): The checkpoint directory.
+        - name (str): The file name prefix, normally the model name.
+        - config (dict): The settings of the run, e.g. the model name, epochs and data. A checkpoint saved with different settings is not resumed.
+        - early_stopping (ResumableEarlyStopping, optional): The early-stopping callback whose state is saved. Defaults to None.
+        """
+        super().__init__()
+        self.directory = directory
+        self.lastfile = path.join(directory, name + ".last.keras")
+        self.bestfile = path.join(directory, name + ".best.keras")
+        self.statefile = path.join(directory, name + ".state.json")
+        self.config = config
+        self.early_stopping = early_stopping
+        self.history = {}
+        self.best = None
+
+    def load_state(self):
+        """
+        Reads the saved state.
+
+        Returns:
+        - state (dict): The saved state, or None if there is no checkpoint, it is unreadable, or it was saved with a different format or configuration.
+        """
+        try:
+            with open(self.statefile, encoding="utf8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("format_version") != CHECKPOINT_FORMAT_VERSION or state.get("config") != self.config or not path.exists(self.lastfile):
+            return None
+        return state
+
+    def restore(self):
+        """
+        Loads the model and state of the last completed epoch.
+
+        Returns:
+        - (model, state) (tuple): The compiled model with its optimizer state and the saved state, or (None, None) if there is nothing to resume.
+        """
+        state = self.load_state()
+        if state is None:
+            return None, None
+        model = keras.models.load_model(self.lastfile)
+        self.history = state["history"]
+        self.best = state["best"]
+        return model, state
+
+    def _save_model(self, filename):
+        """
+        Saves the model under a temporary name and moves it into place.
+        """
+        temporary = filename[:-len(".keras")] + ".tmp.keras"
+        self.model.save(temporary)
+        os.replace(temporary, filename)
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        for key, value in logs.items():
+            self.history.setdefault(key, []).append(float(value))
+        makedirs(self.directory, exist_ok=True)
+        val_loss = logs.get("val_loss")
+        if val_loss is not None and (self.best is None or val_loss < self.best):
+            self.best = float(val_loss)
+            self._save_model(self.bestfile)
+        self._save_model(self.lastfile)
+        state = {
+            "format_version": CHECKPOINT_FORMAT_VERSION,
+            "config": self.config,
+            "epoch": epoch + 1,
+            "history": self.history,
+            "best": self.best,
+            "early_stopping": self.early_stopping.get_state() if self.early_stopping is not None else None
+        }
+        with open(self.statefile + ".tmp", "w", encoding="utf8") as f:
+            json.dump(state, f)
+        os.replace(self.statefile + ".tmp", self.statefile)
+
+    def clear(self):
+        """
+        Removes the resumable state once the trained model is saved. The best model is kept.
+        """
+        for filename in (self.statefile, self.lastfile):
+            if path.exists(filename):
+                os.remove(filename)
@@ -0,0 +1,344 @@
+try:
+    import numpy as np
+    import json
+    import hashlib
+    import re
+    from os import path
+    from .tokenizer import tokenizer_from_json
+    from .metrics import NULL_METRICS, SIZE_BUCKETS
+    from .bucketing import bucket_bounds, bucket_batches
+    from .windowing import sliding_windows, aggregate, AGGREGATIONS
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+MAXLEN = 100
+PADDING = 'post'
+TRUNCATING = 'post'
+TOKENIZER_FORMAT_VERSION = 1
+VERSION_PATTERN = re.compile(r"(.+)\.v(\d+)$")
+
+def split_version(modelname):
+    """
+    Splits a model name into the base model and the saved version.
+
+    Parameters:
+    - modelname (str): "RNN", "LSTM" or "CNN", or a saved version of one such as "RNN.v3".
+
+    Returns:
+    - (base, version) (tuple): The base model name and the version number, or None for the default model.
+    """
+    match = VERSION_PATTERN.match(modelname)
+    if match is None:
+        return modelname, None
+    return match.group(1), int(match.group(2))
+
+class Classifier:
+    """
+    The Classifier class scores texts with a saved model. It holds the inference path shared by all backends: the tokenizer artifact, the prediction cache, the metrics and `analyze_batch`.
+
+    On its own it serves models exported with the "numpy" backend, and neither it nor its imports load TensorFlow, so a scoring process starts in a fraction of a second. `AI` extends it with training and the Keras and TFLite backends.
+    """
+    backends = ("numpy",)
+
+    def __init__(self, modelname = "", cache = None, metrics = None, backend = "numpy", bucketing = False):
+        """
+        Initializes the object and loads the exported model of the "numpy" backend with its tokenizer artifact.
+
+        Parameters:
+        - modelname (str, optional): "RNN", "LSTM" or "CNN", or a saved version such as "RNN.v3". `modelname` is set to the base name and `version` to the version number. Defaults to "".
+        - cache (PredictionCache, optional): A prediction cache consulted before the model, shared with other models or not. Defaults to None.
+        - metrics (Metrics, optional): Records per-stage timers, histograms and counters of the inference path. Defaults to None (disabled).
+        - backend (str, optional): The inference backend. Defaults to "numpy".
+        - bucketing (bool, optional): Whether batches are grouped by length and padded only to their bucket's length. Faster on short texts. The models have no masking, so cropping the padding changes predictions substantially unless the model was trained with bucketing too. Defaults to False.
+        """
+        if backend not in self.backends:
+            raise ValueError(f"Unknown backend {backend}")
+        self.modelname, version = split_version(modelname)
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.namespace = modelname
+        self.modelpath = path.join(path.dirname(__file__), 'models')
+        self.use_version(version)
+        self.tokenizer = None
+        self.maxlen = MAXLEN
+        self.padding = PADDING
+        self.truncating = TRUNCATING
+        self.backend = backend
+        self.bucketing = bucketing
+        self.trained_bucketing = False
+        self.model = None
+        self.runtime = None
+        if backend == "numpy":
+            from .numpyengine import NumpyModel
+            self.load_runtime(NumpyModel, self.numpyfile)
+
+    def use_version(self, version):
+        """
+        Points the model, tokenizer and exported files at a saved version of the model.
+
+        Parameters:
+        - version (int): The version number, or None for the default model `<modelname>.keras`.
+        """
+        self.version = version
+        stem = self.modelname if version is None else f"{self.modelname}.v{version}"
+        self.modelfile = path.join(self.modelpath, stem + ".keras")
+        self.tokenizerfile = path.join(self.modelpath, stem + ".tokenizer.json")
+        self.tflitefile = path.join(self.modelpath, stem + ".tflite")
+        self.numpyfile = path.join(self.modelpath, stem + ".npz")
+        self.savedmodelfile = path.join(self.modelpath, stem + ".savedmodel")
+
+    def load_runtime(self, runtime, modelfile):
+        """
+        Loads an exported model and the tokenizer artifact of the Keras model it was exported from.
+
+        Parameters:
+        - runtime (type): The runtime class, taking the model file and exposing `source_fingerprint`, `quantization` and `predict_on_batch`, or `string_input`, `maxlen` and `predict_texts` for artifacts that tokenize in their own graph. Those need no tokenizer artifact.
+        - modelfile (str): The exported model file.
+        """
+        try:
+            self.runtime = runtime(modelfile)
+            if getattr(self.runtime, "string_input", False):
+                self.namespace = self._namespace(self.runtime.source_fingerprint)
+                self.maxlen = self.runtime.maxlen
+            else:
+                self.load_tokenizer(self.runtime.source_fingerprint)
+            self.namespace += ":" + self.backend + "-" + self.runtime.quantization
+        except (OSError, ValueError) as e:
+            print(f"Couldn't load {self.backend} model: {e}. Export it with `main.py export` first.")
+            self.runtime = None
+
+    def build(self):
+        """
+        Checks that the exported model was loaded. Exported backends cannot be trained.
+
+        Raises:
+        - ValueError: If no exported model was loaded.
+        """
+        if self.runtime is None:
+            raise ValueError(f"No exported {self.backend} model for {self.modelname}. Export it with `main.py export` first.")
+
+    def _model_fingerprint(self):
+        """
+        Computes the fingerprint of the saved model file.
+
+        Returns:
+        - fingerprint (str): The SHA-256 hex digest of `<modelname>.keras`.
+        """
+        digest = hashlib.sha256()
+        with open(self.modelfile, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def load_tokenizer(self, fingerprint=None):
+        """
+        Loads the tokenizer artifact saved next to the model, and whether the model was trained with bucketing into `trained_bucketing`.
+
+        Parameters:
+        - fingerprint (str, optional): The model fingerprint the artifact must match. Defaults to the fingerprint of `<modelname>.keras`.
+
+        Raises:
+        - OSError: If the artifact or the model file cannot be read.
+        - ValueError: If the artifact has an unsupported format version or was saved for a different model file.
+        """
+        with open(self.tokenizerfile, encoding='utf8') as f:
+            artifact = json.load(f)
+        if artifact.get('format_version') != TOKENIZER_FORMAT_VERSION:
+            raise ValueError(f"unsupported tokenizer format version {artifact.get('format_version')}")
+        if fingerprint is None:
+            fingerprint = self._model_fingerprint()
+        if artifact.get('model_fingerprint') != fingerprint:
+            raise ValueError("tokenizer fingerprint does not match " + self.modelfile)
+        self.namespace = self._namespace(fingerprint)
+        self.maxlen = artifact['maxlen']
+        self.padding = artifact['padding']
+        self.truncating = artifact['truncating']
+        self.trained_bucketing = artifact.get('bucketing', False)
+        self.tokenizer = tokenizer_from_json(artifact['tokenizer'])
+
+    def _namespace(self, fingerprint):
+        """
+        Returns the prediction cache namespace of the model with the given fingerprint. Bucketed predictions differ, so they get their own namespace.
+        """
+        return self.modelname + ":" + fingerprint + (":bucketed" if self.bucketing else "")
+
+    def _predict(self, padded, batch_size):
+        """
+        Runs the model, or the exported runtime when one is loaded, on padded sequences, one call per batch.
+
+        With `bucketing`, each batch holds sequences of similar length and is cropped to its bucket's length, and the results are written back in input order.
+
+        Parameters:
+        - padded (numpy.ndarray): The padded sequences.
+        - batch_size (int): The number of sequences per model call.
+
+        Returns:
+        - probabilities (numpy.ndarray): The positive-class probability of each sequence.
+        """
+        predictor = self.runtime if self.runtime is not None else self.model
+        probabilities = np.empty(len(padded), dtype=np.float32)
+        if self.bucketing:
+            batches = bucket_batches(padded, batch_size, bucket_bounds(self.maxlen), self.padding)
+        else:
+            batches = ((slice(start, start + batch_size), padded[start:start + batch_size]) for start in range(0, len(padded), batch_size))
+        for indices, batch in batches:
+            with self.metrics.timer("stage_seconds", stage="predict", model=self.modelname):
+                probabilities[indices] = np.asarray(predictor.predict_on_batch(batch)).reshape(-1)
+            self.metrics.observe("model_batch_size", len(batch), SIZE_BUCKETS, model=self.modelname)
+        return probabilities
+
+    def _predict_cached(self, padded, batch_size):
+        """
+        Runs the model only on the padded sequences missing from the prediction cache.
+
+        Parameters:
+        - padded (numpy.ndarray): The padded sequences.
+        - batch_size (int): The number of sequences per model call.
+
+        Returns:
+        - probabilities (numpy.ndarray): The positive-class probability of each sequence.
+
+        Duplicate sequences within the batch are run once. New results are added to the cache under this model's namespace.
+        """
+        with self.metrics.timer("stage_seconds", stage="cache_lookup", model=self.modelname):
+            keys = [row.tobytes() for row in padded]
+            cached = self.cache.get_many(self.namespace, keys)
+        probabilities = np.array([np.nan if p is None else p for p in cached], dtype=np.float32)
+        first = {}
+        for i, p in enumerate(cached):
+            if p is None:
+                first.setdefault(keys[i], i)
+        misses = sum(p is None for p in cached)
+        self.metrics.count("cache_hits_total", len(cached) - misses, model=self.modelname)
+        self.metrics.count("cache_misses_total", misses, model=self.modelname)
+        if first:
+            indices = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+            computed = self._predict(padded[indices], batch_size)
+            self.cache.put_many(self.namespace, list(first), computed.tolist())
+            lookup = dict(zip(first, computed))
+            for i, p in enumerate(cached):
+                if p is None:
+                    probabilities[i] = lookup[keys[i]]
+        return probabilities
+
+    def analyze_batch(self, texts, batch_size=256):
+        """
+        Analyzes a list of texts and returns the predicted sentiments and probabilities.
+
+        Parameters:
+        - texts (list): The input texts to analyze.
+        - batch_size (int, optional): The number of texts passed to the model per call. Defaults to 256.
+
+        Returns:
+        - labels (numpy.ndarray): The predicted sentiment ("Positive" or "Negative") of each text.
+        - probabilities (numpy.ndarray): The raw positive-class probability of each text.
+
+        The whole list is tokenized and padded in one pass, then the model is run once per batch. When a prediction cache is set, only texts whose padded sequences are not cached reach the model.
+        A string-in runtime is passed the raw texts instead, one call per batch, and its graph tokenizes, pads and labels them. It does not use the prediction cache.
+        Each stage (tokenize_pad, cache_lookup, predict, postprocess) is timed into the `metrics` registry, together with request, text, batch size and error counts.
+        """
+        metrics = self.metrics
+        metrics.count("requests_total", model=self.modelname)
+        try:
+            with metrics.timer("request_seconds", model=self.modelname):
+                if self.model is None and self.runtime is None:
+                    raise Exception("Model not initialized. Please call build() or buildCNN_model() first.")
+                if getattr(self.runtime, "string_input", False):
+                    labels, probabilities = self._predict_texts(texts, batch_size)
+                else:
+                    with metrics.timer("stage_seconds", stage="tokenize_pad", model=self.modelname):
+                        padded = self.tokenizer.texts_to_padded(texts, maxlen=self.maxlen, padding=self.padding, truncating=self.truncating)
+                    if self.cache is not None:
+                        probabilities = self._predict_cached(padded, batch_size)
+                    else:
+                        probabilities = self._predict(padded, batch_size)
+                    with metrics.timer("stage_seconds", stage="postprocess", model=self.modelname):
+                        labels = np.where(probabilities > 0.5, "Positive", "Negative")
+        except Exception:
+            metrics.count("errors_total", model=self.modelname)
+            raise
+        metrics.count("texts_total", len(labels), model=self.modelname)
+        metrics.observe("request_texts", len(labels), SIZE_BUCKETS, model=self.modelname)
+        return labels, probabilities
+
+    def _predict_texts(self, texts, batch_size):
+        """
+        Runs a string-in runtime on raw texts, one call per batch.
+
+        Parameters:
+        - texts (list): The texts.
+        - batch_size (int): The number of texts per call.
+
+        Returns:
+        - labels (numpy.ndarray): The label of each text, thresholded by the runtime.
+        - probabilities (numpy.ndarray): The positive-class probability of each text.
+        """
+        texts = list(texts)
+        labels = np.empty(len(texts), dtype="<U8")
+        probabilities = np.empty(len(texts), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            with self.metrics.timer("stage_seconds", stage="predict", model=self.modelname):
+                labels[start:start + len(batch)], probabilities[start:start + len(batch)] = self.runtime.predict_texts(batch)
+            self.metrics.observe("model_batch_size", len(batch), SIZE_BUCKETS, model=self.modelname)
+        return labels, probabilities
+
+    def analyze_long(self, texts, stride=None, aggregation="mean", batch_size=256):
+        """
+        Analyzes a list of texts of any length and returns the predicted sentiments and probabilities.
+
+        Parameters:
+        - texts (list): The input texts to analyze.
+        - stride (int, optional): The distance in tokens between the starts of consecutive windows. Defaults to half of `maxlen`.
+        - aggregation (str, optional): How the windows of a text are combined: "mean", "max_confidence" or "length_weighted". Defaults to "mean".
+        - batch_size (int, optional): The number of windows passed to the model per call. Defaults to 256.
+
+        Returns:
+        - labels (numpy.ndarray): The predicted sentiment ("Positive" or "Negative") of each text.
+        - probabilities (numpy.ndarray): The aggregated positive-class probability of each text.
+
+        Instead of truncating each text to `maxlen` tokens, every text is split into overlapping windows of `maxlen` tokens, and the windows of all texts are scored together in one batched pass, so a long text costs extra rows rather than extra model calls. Texts no longer than `maxlen` have one window and get the same result as `analyze_batch`.
+        """
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {aggregation}")
+        if self.tokenizer is None and self.runtime is not None:
+            raise ValueError(f"Windowing needs the tokenizer artifact, which the {self.backend} backend does not use")
+        metrics = self.metrics
+        metrics.count("requests_total", model=self.modelname)
+        try:
+            with metrics.timer("request_seconds", model=self.modelname):
+                if self.model is None and self.runtime is None:
+                    raise Exception("Model not initialized. Please call build() or buildCNN_model() first.")
+                with metrics.timer("stage_seconds", stage="tokenize_pad", model=self.modelname):
+                    sequences = self.tokenizer.texts_to_sequences(texts)
+                    padded, owners, lengths = sliding_windows(sequences, self.maxlen, stride or self.maxlen // 2, self.padding)
+                if self.cache is not None:
+                    probabilities = self._predict_cached(padded, batch_size)
+                else:
+                    probabilities = self._predict(padded, batch_size)
+                with metrics.timer("stage_seconds", stage="postprocess", model=self.modelname):
+                    probabilities = aggregate(probabilities, owners, lengths, len(sequences), aggregation)
+                    labels = np.where(probabilities > 0.5, "Positive", "Negative")
+        except Exception:
+            metrics.count("errors_total", model=self.modelname)
+            raise
+        metrics.count("texts_total", len(sequences), model=self.modelname)
+        metrics.count("windows_total", len(padded), model=self.modelname)
+        metrics.observe("request_texts", len(sequences), SIZE_BUCKETS, model=self.modelname)
+        return labels, probabilities
+
+    def analyze(self, text):
+        """
+        Analyzes the input text and returns the predicted sentiment.
+
+        Parameters:
+        - text (str): The input text to analyze.
+
+        Returns:
+        - sentiment (str): The predicted sentiment of the input text.
+
+        The function is a thin wrapper over `analyze_batch` for a single text.
+        """
+        labels, _ = self.analyze_batch([text])
+        return str(labels[0])
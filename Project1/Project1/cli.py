@@ -0,0 +1,614 @@
+try:
+    import argparse
+    import csv
+    import json
+    import sys
+    import time
+    from itertools import islice
+    from os import path
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+MODELS = ("RNN", "LSTM", "CNN")
+BACKENDS = ("keras", "tflite", "numpy", "savedmodel")
+EXPORT_FORMATS = ("tflite", "numpy", "savedmodel")
+QUANTIZATIONS = ("none", "float16", "int8")
+COMBINATIONS = ("mean", "weighted", "disagreement")
+EXECUTION_MODES = ("default", "xla", "bf16", "xla_bf16")
+AGGREGATIONS = ("mean", "max_confidence", "length_weighted")
+FORMATS = ("csv", "jsonl", "txt")
+
+def detect_format(filename):
+    """
+    Detects the record format of a file from its extension.
+
+    Parameters:
+    - filename (str): The name of the file.
+
+    Returns:
+    - format (str): "csv" for .csv files, "jsonl" for .jsonl and .json files and "txt" otherwise.
+    """
+    extension = path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".json"):
+        return "jsonl"
+    return "txt"
+
+def versioned(modelname, version):
+    """
+    Returns the name of a saved version of a model.
+
+    Parameters:
+    - modelname (str): "RNN", "LSTM" or "CNN".
+    - version (int): The version number, or None for the default model.
+
+    Returns:
+    - name (str): "<modelname>.v<version>", or `modelname` for the default model.
+    """
+    return modelname if version is None else f"{modelname}.v{version}"
+
+def iter_records(file, fmt, field, skipped=None):
+    """
+    Streams records and their texts from an open input file.
+
+    Parameters:
+    - file (file object): The input file opened in text mode.
+    - fmt (str): The record format, one of "csv", "jsonl" or "txt".
+    - field (str): The CSV column or JSON key holding the text. Ignored for "txt".
+    - skipped (list, optional): Collects the line number of every skipped record. Defaults to None.
+
+    Yields:
+    - (record, text) (tuple): The original record as a dict and the text to analyze.
+
+    Records are read one at a time so memory does not depend on the file size. JSONL lines that are not valid JSON objects, and records whose text field is missing or not a string, are skipped with a message on stderr.
+    """
+    def skip(number, reason):
+        print(f"Skipping line {number}: {reason}", file=sys.stderr)
+        if skipped is not None:
+            skipped.append(number)
+
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            text = record.get(field)
+            if not isinstance(text, str):
+                skip(reader.line_num, f"no {field!r} column")
+                continue
+            yield record, text
+    elif fmt == "jsonl":
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                skip(number, f"invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                skip(number, f"expected a JSON object, got {type(record).__name__}")
+                continue
+            text = record.get(field)
+            if not isinstance(text, str):
+                skip(number, f"no {field!r} key" if field not in record else f"{field!r} is {type(text).__name__}, not a string")
+                continue
+            yield record, text
+    else:
+        for line in file:
+            text = line.rstrip("\r\n")
+            yield {field: text}, text
+
+def chunked(iterable, size):
+    """
+    Splits an iterable into lists of at most `size` items.
+
+    Parameters:
+    - iterable (iterable): The items to split.
+    - size (int): The maximum number of items per chunk.
+
+    Yields:
+    - chunk (list): The next chunk of items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class RecordWriter:
+    """
+    Writes scored records incrementally as CSV or JSONL.
+
+    The CSV header is taken from the first record written, so the output columns are the input columns followed by `label` and `probability`. Keys that first appear in a later record are dropped from the CSV output, with a warning on stderr the first time each is seen.
+    """
+    def __init__(self, file, fmt):
+        """
+        Initializes the writer.
+
+        Parameters:
+        - file (file object): The output file opened in text mode.
+        - fmt (str): The output format, either "csv" or "jsonl".
+        """
+        self.file = file
+        self.fmt = fmt
+        self.writer = None
+        self.dropped = set()
+
+    def write(self, records):
+        """
+        Writes a chunk of scored records and flushes the output.
+
+        Parameters:
+        - records (list): The records to write, as dicts.
+        """
+        if self.fmt == "csv":
+            if self.writer is None:
+                self.writer = csv.DictWriter(self.file, fieldnames=list(records[0].keys()), extrasaction="ignore")
+                self.writer.writeheader()
+            for record in records:
+                for key in record.keys() - self.writer.fieldnames - self.dropped:
+                    print(f"Warning: column {key!r} is not in the CSV header of the first record and is dropped. Write JSONL to keep it.", file=sys.stderr)
+                    self.dropped.add(key)
+            self.writer.writerows(records)
+        else:
+            for record in records:
+                self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+def report(scored, elapsed, final=False, skipped=0):
+    """
+    Prints progress and throughput to stderr.
+
+    Parameters:
+    - scored (int): The number of records scored so far.
+    - elapsed (float): The seconds elapsed since scoring started.
+    - final (bool, optional): Whether this is the final summary line. Defaults to False.
+    - skipped (int, optional): The number of records skipped so far. Defaults to 0.
+    """
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    prefix = "Done:" if final else "Progress:"
+    suffix = f", {skipped} skipped" if skipped else ""
+    print(f"{prefix} {scored} records in {elapsed:.1f}s ({rate:.0f} records/s){suffix}", file=sys.stderr, flush=True)
+
+def score(args):
+    """
+    Scores every record of the input file and writes the results incrementally.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `score` command.
+
+    Returns:
+    - status (int): The process exit status.
+
+    The input is read in chunks of `--chunk-size` records, each chunk is scored with `AI.analyze_batch` (or `AI.analyze_long` with `--long-documents`) in batches of `--batch-size` and written before the next chunk is read, so memory stays bounded whatever the file size.
+    With `--ensemble`, each chunk is tokenized once and scored by all members concurrently. The records also get each member's probability and whether the members agree, and the mean latency of each member is printed at the end.
+    With the numpy backend TensorFlow is never imported.
+    """
+    from .registry import load_ai, ModelNotFound
+    from .predictioncache import PredictionCache
+    from .metrics import Metrics
+
+    if args.ensemble and args.long_documents:
+        print("--long-documents cannot be combined with --ensemble", file=sys.stderr)
+        return 2
+    if args.weights and len(args.weights) != len(args.ensemble or ()):
+        print("--weights needs one weight per --ensemble member", file=sys.stderr)
+        return 2
+    if args.ensemble and len(set(args.ensemble)) != len(args.ensemble):
+        print("--ensemble members must be different models", file=sys.stderr)
+        return 2
+    if args.ensemble and args.version is not None:
+        print("--version cannot be combined with --ensemble", file=sys.stderr)
+        return 2
+    infmt = args.format or detect_format(args.input)
+    outfmt = "csv" if args.output and detect_format(args.output) == "csv" else "jsonl"
+    cache = PredictionCache(capacity=args.cache_size) if args.cache_size else None
+    metrics = Metrics() if args.metrics else None
+    try:
+        if args.ensemble:
+            from .ensemble import load_ensemble
+            weights = dict(zip(args.ensemble, args.weights)) if args.weights else None
+            ai = load_ensemble(args.ensemble, combination=args.combination, weights=weights, cache=cache, metrics=metrics, backend=args.backend, bucketing=args.bucketing, execution=args.execution)
+            member_seconds = dict.fromkeys(args.ensemble, 0.0)
+            ensemble_seconds = 0.0
+        else:
+            ai = load_ai(versioned(args.model, args.version), cache=cache, metrics=metrics, backend=args.backend, bucketing=args.bucketing, execution=args.execution)
+    except ModelNotFound as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    try:
+        infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf8")
+    except OSError as e:
+        print(f"Couldn't open input: {e}", file=sys.stderr)
+        if args.ensemble:
+            ai.close()
+        return 2
+    outfile = open(args.output, "w", newline="", encoding="utf8") if args.output else sys.stdout
+    writer = RecordWriter(outfile, outfmt)
+    scored = 0
+    skipped = []
+    start = time.perf_counter()
+    try:
+        for chunk in chunked(iter_records(infile, infmt, args.field, skipped), args.chunk_size):
+            records, texts = zip(*chunk)
+            if args.ensemble:
+                result = ai.predict(texts, batch_size=args.batch_size)
+                labels, probabilities = result["labels"], result["probabilities"]
+                for name, seconds in result["member_seconds"].items():
+                    member_seconds[name] += seconds
+                ensemble_seconds += result["seconds"]
+            elif args.long_documents:
+                labels, probabilities = ai.analyze_long(texts, stride=args.stride, aggregation=args.aggregation, batch_size=args.batch_size)
+            else:
+                labels, probabilities = ai.analyze_batch(texts, batch_size=args.batch_size)
+            for i, (record, label, probability) in enumerate(zip(records, labels, probabilities)):
+                record["label"] = str(label)
+                record["probability"] = float(probability)
+                if args.ensemble:
+                    for name, member in result["member_probabilities"].items():
+                        record["probability_" + name] = float(member[i])
+                    record["agree"] = bool(result["agree"][i])
+            writer.write(records)
+            scored += len(records)
+            if not args.quiet:
+                report(scored, time.perf_counter() - start, skipped=len(skipped))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+        if args.ensemble:
+            ai.close()
+    report(scored, time.perf_counter() - start, final=True, skipped=len(skipped))
+    if args.ensemble:
+        members = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in member_seconds.items())
+        print(f"Ensemble: {ensemble_seconds:.2f}s in total, members {members}", file=sys.stderr)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}", file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf8") as f:
+            if args.metrics.endswith(".json"):
+                json.dump(metrics.snapshot(), f, indent=2)
+            else:
+                f.write(metrics.to_prometheus())
+    return 0
+
+def serve(args):
+    """
+    Serves the selected model over HTTP until interrupted.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `serve` command.
+
+    Returns:
+    - status (int): The process exit status.
+    """
+    import asyncio
+    from .registry import ModelRegistry, ModelNotFound
+    from .server import InferenceServer
+    from .predictioncache import PredictionCache
+    from .metrics import Metrics
+
+    cache = PredictionCache(capacity=args.cache_size, ttl=args.cache_ttl) if args.cache_size else None
+    registry = ModelRegistry(capacity=args.capacity, cache=cache, metrics=None if args.no_metrics else Metrics(), backend=args.backend, bucketing=args.bucketing, execution=args.execution)
+    modelname = versioned(args.model, args.version)
+    server = InferenceServer(registry, modelname, models=tuple(dict.fromkeys(MODELS + (modelname,))), host=args.host, port=args.port, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue)
+    try:
+        asyncio.run(server.serve())
+    except ModelNotFound as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+def export(args):
+    """
+    Exports trained models to TFLite, the NumPy engine or a string-in SavedModel and reports the size reduction and accuracy drift of each.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `export` command.
+
+    Returns:
+    - status (int): 1 if the accuracy of a model dropped by more than `--max-drift`, 0 otherwise.
+    """
+    from .text_classification import AI
+    from .export import export
+
+    reports = []
+    for modelname in args.models:
+        ai = AI(modelname=modelname)
+        ai.build()
+        report = export(ai, fmt=args.format, quantization=args.quantization, samples=args.samples, batch_size=args.batch_size)
+        reports.append(report)
+        line = f"{modelname}: {report['keras_bytes'] / 2**20:.2f} MB -> {report['exported_bytes'] / 2**20:.2f} MB ({abs(report['size_reduction']):.0%} {'smaller' if report['size_reduction'] >= 0 else 'larger'}, {args.format} {report['quantization']})"
+        if "warmup_seconds" in report:
+            line += f", warm-up {report['warmup_seconds']:.2f}s at load"
+        if args.samples:
+            line += f", accuracy {report['keras_accuracy']:.4f} -> {report['exported_accuracy']:.4f} (drift {report['accuracy_drift']:+.4f}, {report['label_agreement']:.2%} labels agree, max probability difference {report['max_probability_diff']:.2g}), {report['keras_seconds']:.2f}s -> {report['exported_seconds']:.2f}s"
+        print(line, file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(reports, f, indent=2)
+    if args.samples and any(report["accuracy_drift"] < -args.max_drift for report in reports):
+        return 1
+    return 0
+
+def train(args):
+    """
+    Trains several models concurrently on data preprocessed once, and prints a summary per model.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `train` command.
+
+    Returns:
+    - status (int): 1 if a model failed to train, 0 otherwise.
+    """
+    from .trainer import train_all
+
+    summary = train_all(models=args.models, workers=args.workers, bucketing=args.bucketing, resume=args.resume, execution=args.execution, hashing=args.hashing, log=lambda line: print(line, file=sys.stderr, flush=True))
+    print(f"{'model':<6} {'seconds':>8} {'epochs':>6} {'val_loss':>9} {'val_acc':>8} {'best':>5} {'words':>6} {'vs_vocab':>8}", file=sys.stderr)
+    for result in summary["models"]:
+        if "error" in result:
+            print(f"{result['model']:<6} failed: {result['error']}", file=sys.stderr)
+        else:
+            drift = result.get("accuracy_drift")
+            print(f"{result['model']:<6} {result['seconds']:>8.1f} {result['epochs']:>6} {result['val_loss']:>9.4f} {result['val_accuracy']:>8.4f} {result['best_epoch']:>5} {'hashed' if result['hashing'] else 'fitted':>6} {'' if drift is None else f'{drift:+.4f}':>8}", file=sys.stderr)
+    print(f"Total: {summary['wall_seconds']:.1f}s wall, {summary['serial_seconds']:.1f}s if trained one after another", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if any("error" in result for result in summary["models"]) else 0
+
+def modes(args):
+    """
+    Checks each execution mode of each model against the default mode on held-out test reviews, and recommends the fastest safe mode.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `modes` command.
+
+    Returns:
+    - status (int): The process exit status.
+    """
+    from .text_classification import AI
+    from .execution import check_execution
+
+    reports = []
+    print(f"{'model':<6} {'mode':<9} {'accuracy':>8} {'drift':>8} {'agree':>7} {'seconds':>8} {'speedup':>7} safe", file=sys.stderr)
+    for modelname in args.models:
+        ai = AI(modelname=modelname)
+        ai.build()
+        results = []
+        for mode in args.modes:
+            report = check_execution(ai, mode, threshold=args.max_drift, samples=args.samples, batch_size=args.batch_size)
+            results.append(report)
+            print(f"{modelname:<6} {report['mode']:<9} {report['accuracy']:>8.4f} {report['accuracy_drift']:>+8.4f} {report['label_agreement']:>7.2%} {report['seconds']:>8.2f} {report['speedup']:>6.2f}x {'yes' if report['safe'] else 'no'}", file=sys.stderr)
+        best = max((report for report in results if report["safe"]), key=lambda report: report["speedup"], default=None)
+        if best is not None:
+            print(f"{modelname}: fastest safe mode is {best['mode']} ({best['speedup']:.2f}x)", file=sys.stderr)
+        reports.extend(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+def parse_label(value):
+    """
+    Parses a sentiment label.
+
+    Parameters:
+    - value (str, int, float or bool): 1, 0, true, false, positive, negative, pos or neg, in any case.
+
+    Returns:
+    - label (int): 1 for positive, 0 for negative.
+
+    Raises:
+    - ValueError: If the value is not a recognised label.
+    """
+    label = str(value).strip().lower()
+    if label in ("1", "1.0", "true", "positive", "pos"):
+        return 1
+    if label in ("0", "0.0", "false", "negative", "neg"):
+        return 0
+    raise ValueError(f"Unknown label {value!r}")
+
+def finetune(args):
+    """
+    Fine-tunes a saved model on newly labeled texts and saves the result as a new version.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `finetune` command.
+
+    Returns:
+    - status (int): 2 if the input has no usable labels or the model is not saved, 0 otherwise.
+    """
+    from .text_classification import AI
+
+    infmt = args.format or detect_format(args.input)
+    if infmt == "txt":
+        print("Fine-tuning needs labels. Use a CSV or JSONL input.", file=sys.stderr)
+        return 2
+    texts, labels = [], []
+    with open(args.input, newline="", encoding="utf8") as f:
+        for record, text in iter_records(f, infmt, args.field):
+            try:
+                labels.append(parse_label(record.get(args.label_field)))
+            except ValueError as e:
+                print(f"Skipping record: {e}", file=sys.stderr)
+                continue
+            texts.append(text)
+    if not texts:
+        print(f"No labeled records found in the {args.label_field} field.", file=sys.stderr)
+        return 2
+
+    modelname = versioned(args.model, args.version)
+    ai = AI(modelname=modelname, bucketing=args.bucketing)
+    if ai.model is None or ai.tokenizer is None:
+        print(f"No saved {modelname} model with its tokenizer artifact to fine-tune. Train it with `main.py train` first.", file=sys.stderr)
+        return 2
+    report = ai.finetune(texts, labels, epochs=args.epochs, replay=args.replay, learning_rate=args.learning_rate, validation_split=args.validation_split, seed=args.seed)
+    report["version"] = ai.save_version(promote=args.promote)
+    report["modelfile"] = ai.modelfile
+    def accuracy(value):
+        return "n/a" if value is None else f"{value:.4f}"
+    print(f"{args.model} v{report['version']}: {report['new_samples']} new and {report['replay_samples']} replayed reviews, {report['epochs']} epochs in {report['seconds']:.1f}s", file=sys.stderr)
+    print(f"Held-out new reviews: accuracy {accuracy(report['new_accuracy_before'])} -> {accuracy(report['new_accuracy_after'])}", file=sys.stderr)
+    print(f"IMDB test sample: accuracy {accuracy(report['imdb_accuracy_before'])} -> {accuracy(report['imdb_accuracy_after'])}", file=sys.stderr)
+    print(f"Saved {report['modelfile']}" + ("" if args.promote else ". Add --promote to serve it by default."), file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+def bench(args):
+    """
+    Runs the offline benchmark suite and optionally compares it against a baseline.
+
+    Parameters:
+    - args (argparse.Namespace): The parsed command-line arguments of the `bench` command.
+
+    Returns:
+    - status (int): 1 if a regression against the baseline was found, 0 otherwise.
+    """
+    from .benchmark import Benchmark, compare, print_comparison, load_report, save_report
+
+    if args.report:
+        report = load_report(args.report)
+    else:
+        report = Benchmark(models=args.models, batch_sizes=args.batch_sizes, lengths=args.lengths, iterations=args.iterations, train_samples=args.train_samples, epochs=args.epochs, corpus=args.corpus, seed=args.seed, modes=tuple(args.modes)).run()
+        if args.output:
+            save_report(report, args.output)
+        else:
+            print(json.dumps(report, indent=2))
+    if args.baseline:
+        rows = compare(report, load_report(args.baseline), args.threshold)
+        print_comparison(rows)
+        return 1 if any(row["regression"] for row in rows) else 0
+    return 0
+
+def build_parser():
+    """
+    Builds the command-line argument parser.
+
+    Returns:
+    - parser (argparse.ArgumentParser): The parser with one subcommand per headless mode.
+    """
+    parser = argparse.ArgumentParser(prog="main.py", description="Headless sentiment analysis. Run without arguments to start the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = commands.add_parser("score", help="Score a CSV, JSONL or plain-text file in bounded memory.")
+    score_parser.add_argument("input", help="The input file, or - for stdin.")
+    score_parser.add_argument("-o", "--output", help="The output file. Written as CSV if it ends in .csv, JSONL otherwise. CSV columns are taken from the first record, and keys that only appear later are dropped with a warning. Defaults to stdout.")
+    score_parser.add_argument("--model", choices=MODELS, default="RNN", help="The model to score with. Defaults to RNN.")
+    score_parser.add_argument("--version", type=int, help="Score with the version saved by finetune, models/<model>.v<N>.keras, instead of the default model.")
+    score_parser.add_argument("--backend", choices=BACKENDS, default="keras", help="The inference backend. tflite, numpy and savedmodel need a model exported with the export command. Defaults to keras.")
+    score_parser.add_argument("--format", choices=FORMATS, help="The input format. Detected from the file extension by default.")
+    score_parser.add_argument("--field", default="text", help="The CSV column or JSON key holding the text. Defaults to text.")
+    score_parser.add_argument("--chunk-size", type=int, default=10000, help="The number of records read and written at a time. Defaults to 10000.")
+    score_parser.add_argument("--batch-size", type=int, default=256, help="The number of records per model call. Defaults to 256.")
+    score_parser.add_argument("--cache-size", type=int, default=100000, help="The number of predictions cached by padded token sequence, 0 to disable. Defaults to 100000.")
+    score_parser.add_argument("--execution", choices=EXECUTION_MODES, default="default", help="How Keras models run: default, xla (XLA-compiled), bf16 (bfloat16 computation, where the CPU supports it) or xla_bf16. Check a mode with the modes command first. Defaults to default.")
+    score_parser.add_argument("--bucketing", action="store_true", help="Group texts by length and pad each batch only to its bucket's length. Faster on short texts. Only for models trained with --bucketing, whose tokenizer artifact records it, and required for them.")
+    score_parser.add_argument("--ensemble", nargs="+", choices=MODELS, help="Score with several models at once instead of --model, e.g. --ensemble RNN LSTM CNN.")
+    score_parser.add_argument("--combination", choices=COMBINATIONS, default="mean", help="How the --ensemble probabilities are combined: mean, weighted (weighted vote) or disagreement (mean, labelled Uncertain when the members disagree). Defaults to mean.")
+    score_parser.add_argument("--weights", nargs="+", type=float, help="The vote weight of each --ensemble member, in the same order, for --combination weighted. Defaults to equal weights.")
+    score_parser.add_argument("--long-documents", action="store_true", help="Score every text as overlapping windows of the model's input length instead of truncating it, and combine the windows with --aggregation.")
+    score_parser.add_argument("--stride", type=int, help="The distance in tokens between the starts of consecutive windows with --long-documents. Defaults to half the input length.")
+    score_parser.add_argument("--aggregation", choices=AGGREGATIONS, default="mean", help="How the windows of a text are combined with --long-documents: mean, max_confidence or length_weighted. Defaults to mean.")
+    score_parser.add_argument("--metrics", help="Write per-stage latency metrics to this file at the end, as JSON if it ends in .json and in the Prometheus text format otherwise.")
+    score_parser.add_argument("--quiet", action="store_true", help="Only print the final summary.")
+    score_parser.set_defaults(func=score)
+
+    serve_parser = commands.add_parser("serve", help="Serve a model over local HTTP with dynamic micro-batching.")
+    serve_parser.add_argument("--model", choices=MODELS, default="RNN", help="The default model. Others are loaded on first request. Defaults to RNN.")
+    serve_parser.add_argument("--version", type=int, help="Serve the version saved by finetune, models/<model>.v<N>.keras, as the default model, named <model>.v<N> in requests.")
+    serve_parser.add_argument("--backend", choices=BACKENDS, default="keras", help="The inference backend. tflite, numpy and savedmodel need models exported with the export command. Defaults to keras.")
+    serve_parser.add_argument("--capacity", type=int, default=3, help="The number of models kept loaded at once. Defaults to 3.")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="The interface to bind. Defaults to 127.0.0.1.")
+    serve_parser.add_argument("--port", type=int, default=8000, help="The port to bind. Defaults to 8000.")
+    serve_parser.add_argument("--max-batch-size", type=int, default=64, help="The maximum number of texts per model call. Defaults to 64.")
+    serve_parser.add_argument("--max-wait-ms", type=float, default=5, help="The longest a batch waits for more requests. Defaults to 5.")
+    serve_parser.add_argument("--max-queue", type=int, default=4096, help="The number of queued texts beyond which requests get 503. Defaults to 4096.")
+    serve_parser.add_argument("--cache-size", type=int, default=100000, help="The number of predictions cached by padded token sequence, 0 to disable. Defaults to 100000.")
+    serve_parser.add_argument("--cache-ttl", type=float, help="The lifetime of a cached prediction in seconds. Defaults to no expiry.")
+    serve_parser.add_argument("--execution", choices=EXECUTION_MODES, default="default", help="How Keras models run: default, xla (XLA-compiled), bf16 (bfloat16 computation, where the CPU supports it) or xla_bf16. Check a mode with the modes command first. Defaults to default.")
+    serve_parser.add_argument("--bucketing", action="store_true", help="Group each micro-batch by length and pad only to each bucket's length. Only for models trained with --bucketing, and required for them.")
+    serve_parser.add_argument("--no-metrics", action="store_true", help="Disable the metrics exposed at /metrics.")
+    serve_parser.set_defaults(func=serve)
+
+    export_parser = commands.add_parser("export", help="Export trained models to quantized TFLite, the NumPy engine or a string-in SavedModel for CPU serving.")
+    export_parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS), help="The models to export. Defaults to all.")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="tflite", help="tflite, numpy for the NumPy engine that runs without TensorFlow, or savedmodel for one graph that takes raw strings and does the tokenization, padding and labelling itself. Defaults to tflite.")
+    export_parser.add_argument("--quantization", choices=QUANTIZATIONS, default="int8", help="The TFLite quantization: none, float16 weights, or int8 weights with dynamic-range activations. Ignored for numpy. Defaults to int8.")
+    export_parser.add_argument("--samples", type=int, default=5000, help="The number of held-out test reviews the accuracy drift is measured on, 0 to skip. Defaults to 5000.")
+    export_parser.add_argument("--batch-size", type=int, default=256, help="The batch size of the accuracy comparison. Defaults to 256.")
+    export_parser.add_argument("--max-drift", type=float, default=0.01, help="The accuracy drop beyond which the command exits with status 1. Defaults to 0.01.")
+    export_parser.add_argument("-o", "--output", help="Where to write the JSON report.")
+    export_parser.set_defaults(func=export)
+
+    train_parser = commands.add_parser("train", help="Retrain several models concurrently on data preprocessed once.")
+    train_parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS), help="The models to train. Defaults to all.")
+    train_parser.add_argument("--workers", type=int, help="The number of concurrent training processes. The CPUs are split evenly between them. Defaults to one per model.")
+    train_parser.add_argument("--bucketing", action="store_true", help="Train on batches grouped by length and padded only to their bucket's length.")
+    train_parser.add_argument("--execution", choices=EXECUTION_MODES, default="default", help="How the models train: default, xla (XLA-compiled steps), bf16 (bfloat16 computation, where the CPU supports it) or xla_bf16. The saved models are float32 either way. Defaults to default.")
+    train_parser.add_argument("--resume", action="store_true", help="Continue interrupted runs from their last completed epoch. Every epoch is checkpointed to models/checkpoints.")
+    train_parser.add_argument("--hashing", nargs="+", choices=MODELS, default=[], help="The models that hash words into 10000 indices instead of fitting a vocabulary. They need no fitting pass and no vocabulary artifact. Their accuracy is compared with the saved models they replace.")
+    train_parser.add_argument("-o", "--output", help="Where to write the JSON summary.")
+    train_parser.set_defaults(func=train)
+
+    modes_parser = commands.add_parser("modes", help="Check the accuracy and speed of the XLA and bfloat16 execution modes against the default mode.")
+    modes_parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS), help="The models to check. Defaults to all.")
+    modes_parser.add_argument("--modes", nargs="+", choices=EXECUTION_MODES, default=list(EXECUTION_MODES), help="The execution modes to check. Defaults to all.")
+    modes_parser.add_argument("--samples", type=int, default=5000, help="The number of held-out test reviews compared. Defaults to 5000.")
+    modes_parser.add_argument("--batch-size", type=int, default=256, help="The batch size. Defaults to 256.")
+    modes_parser.add_argument("--max-drift", type=float, default=0.005, help="The largest validation accuracy drop of a safe mode. Defaults to 0.005.")
+    modes_parser.add_argument("-o", "--output", help="Where to write the JSON report.")
+    modes_parser.set_defaults(func=modes)
+
+    finetune_parser = commands.add_parser("finetune", help="Fine-tune a saved model on newly labeled reviews and save it as a new version.")
+    finetune_parser.add_argument("input", help="A CSV or JSONL file of labeled reviews.")
+    finetune_parser.add_argument("--model", choices=MODELS, default="RNN", help="The model to fine-tune. Defaults to RNN.")
+    finetune_parser.add_argument("--version", type=int, help="Continue from the version saved by an earlier finetune instead of the default model. The result is still numbered after the highest version of the model.")
+    finetune_parser.add_argument("--format", choices=("csv", "jsonl"), help="The input format. Detected from the file extension by default.")
+    finetune_parser.add_argument("--field", default="text", help="The CSV column or JSON key holding the text. Defaults to text.")
+    finetune_parser.add_argument("--label-field", default="label", help="The CSV column or JSON key holding the label: 1/0, true/false, positive/negative or pos/neg. Defaults to label.")
+    finetune_parser.add_argument("--epochs", type=int, default=3, help="The maximum number of epochs. Defaults to 3.")
+    finetune_parser.add_argument("--replay", type=float, default=1.0, help="The number of IMDB training reviews replayed per new review, 0 to train on the new reviews only. Defaults to 1.")
+    finetune_parser.add_argument("--learning-rate", type=float, default=1e-4, help="The learning rate. Defaults to 0.0001.")
+    finetune_parser.add_argument("--validation-split", type=float, default=0.1, help="The share of the new reviews held out for early stopping and the report. Defaults to 0.1.")
+    finetune_parser.add_argument("--seed", type=int, default=0, help="The random seed. Defaults to 0.")
+    finetune_parser.add_argument("--bucketing", action="store_true", help="Train on batches grouped by length and padded only to their bucket's length.")
+    finetune_parser.add_argument("--promote", action="store_true", help="Also replace the model served by default. The previous versions are kept.")
+    finetune_parser.add_argument("-o", "--output", help="Where to write the JSON report.")
+    finetune_parser.set_defaults(func=finetune)
+
+    bench_parser = commands.add_parser("bench", help="Run the offline benchmark suite, optionally comparing against a baseline report.")
+    bench_parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS), help="The models to benchmark. Defaults to all.")
+    bench_parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 32, 256], help="The inference batch sizes. Defaults to 1 32 256.")
+    bench_parser.add_argument("--lengths", nargs="+", type=int, default=[20, 100, 400], help="The input lengths in words. Defaults to 20 100 400.")
+    bench_parser.add_argument("--iterations", type=int, default=20, help="The number of timed calls per measurement. Defaults to 20.")
+    bench_parser.add_argument("--train-samples", type=int, default=2048, help="The number of reviews per timed training epoch. Defaults to 2048.")
+    bench_parser.add_argument("--epochs", type=int, default=2, help="The number of timed training epochs. Defaults to 2.")
+    bench_parser.add_argument("--corpus", help="A local review corpus with one review per line. Defaults to synthetic reviews.")
+    bench_parser.add_argument("--seed", type=int, default=0, help="The random seed. Defaults to 0.")
+    bench_parser.add_argument("--modes", nargs="+", choices=EXECUTION_MODES, default=["default"], help="The execution modes to compare by epoch time, inference throughput and label agreement. Defaults to default only.")
+    bench_parser.add_argument("-o", "--output", help="Where to write the JSON report. Defaults to stdout.")
+    bench_parser.add_argument("--report", help="Compare this existing report instead of running the suite.")
+    bench_parser.add_argument("--baseline", help="A baseline report to compare against. Exits with status 1 on regressions.")
+    bench_parser.add_argument("--threshold", type=float, default=0.1, help="The relative slowdown that counts as a regression. Defaults to 0.1.")
+    bench_parser.set_defaults(func=bench)
+    return parser
+
+def main(argv=None):
+    """
+    Runs the headless command-line interface.
+
+    Parameters:
+    - argv (list, optional): The command-line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+    - status (int): The process exit status.
+    """
+    args = build_parser().parse_args(argv)
+    return args.func(args)
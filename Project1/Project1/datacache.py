@@ -0,0 +1,127 @@
+try:
+    import json
+    import hashlib
+    import os
+    from os import path, makedirs
+    import numpy as np
+    from .tokenizer import tokenizer_from_json
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+CACHE_FORMAT_VERSION = 1
+
+class DataCache:
+    """
+    An on-disk cache of tokenized and padded dataset splits.
+
+    Each split is stored as a padded array and a label array in `.npy` files, loaded back memory-mapped so no tokenization is repeated and pages are shared between processes reading the same cache. The tokenizer fitted on the training split is stored with them.
+
+    The cache directory is keyed by the dataset, the vocabulary size, the out-of-vocabulary token, `maxlen`, the padding and truncation settings and whether words are hashed, so a change to any of them uses a fresh entry.
+    """
+    def __init__(self, root, dataset, num_words, oov_token, maxlen, padding, truncating, hashing=False):
+        """
+        Initializes the cache entry for the given preprocessing settings.
+
+        Parameters:
+        - root (str): The directory holding all cache entries.
+        - dataset (str): The name of the dataset.
+        - num_words (int): The vocabulary size.
+        - oov_token (str): The out-of-vocabulary token.
+        - maxlen (int): The padded sequence length.
+        - padding (str): 'pre' or 'post'.
+        - truncating (str): 'pre' or 'post'.
+        - hashing (bool, optional): Whether the arrays were converted with a `HashingTokenizer`. Defaults to False.
+        """
+        key = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'dataset': dataset,
+            'num_words': num_words,
+            'oov_token': oov_token,
+            'maxlen': maxlen,
+            'padding': padding,
+            'truncating': truncating
+        }
+        if hashing:
+            # Only added when set, so the existing vocabulary entries keep their keys.
+            key['hashing'] = 'crc32'
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf8')).hexdigest()[:12]
+        self.key = key
+        self.directory = path.join(root, f"{dataset}-{'h' if hashing else 'w'}{num_words}-l{maxlen}-{padding}-{truncating}-{digest}")
+        self.tokenizerfile = path.join(self.directory, 'tokenizer.json')
+
+    def _file(self, split, name):
+        """
+        Returns the path of one array of a split.
+
+        Parameters:
+        - split (str): The dataset split, e.g. "train" or "test".
+        - name (str): "padded" or "labels".
+        """
+        return path.join(self.directory, f"{split}.{name}.npy")
+
+    def exists(self, splits=('train', 'test')):
+        """
+        Checks whether the tokenizer and every array of the given splits are cached.
+
+        Parameters:
+        - splits (tuple, optional): The splits to check. Defaults to ('train', 'test').
+
+        Returns:
+        - exists (bool): True if the cache entry is complete.
+        """
+        files = [self.tokenizerfile] + [self._file(split, name) for split in splits for name in ('padded', 'labels')]
+        return all(path.exists(f) for f in files)
+
+    def load_tokenizer(self):
+        """
+        Loads the cached tokenizer.
+
+        Returns:
+        - tokenizer (FastTokenizer or HashingTokenizer): The tokenizer fitted on the training split, or the hashing tokenizer.
+        """
+        with open(self.tokenizerfile, encoding='utf8') as f:
+            return tokenizer_from_json(f.read())
+
+    def load_split(self, split):
+        """
+        Maps the arrays of a split into memory.
+
+        Parameters:
+        - split (str): The dataset split.
+
+        Returns:
+        - (padded, labels) (tuple): Read-only memory-mapped numpy arrays.
+        """
+        return (np.load(self._file(split, 'padded'), mmap_mode='r'),
+                np.load(self._file(split, 'labels'), mmap_mode='r'))
+
+    def save_split(self, split, padded, labels):
+        """
+        Writes the arrays of a split.
+
+        Parameters:
+        - split (str): The dataset split.
+        - padded (numpy.ndarray): The padded sequences.
+        - labels (numpy.ndarray): The labels.
+
+        Each file is written under a temporary name and moved into place, so readers never see a partial array.
+        """
+        makedirs(self.directory, exist_ok=True)
+        for name, array in (('padded', padded), ('labels', labels)):
+            filename = self._file(split, name)
+            with open(filename + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(filename + '.tmp', filename)
+
+    def save_tokenizer(self, tokenizer):
+        """
+        Writes the tokenizer. Written after the splits, it marks the cache entry as complete.
+
+        Parameters:
+        - tokenizer (FastTokenizer): The tokenizer fitted on the training split.
+        """
+        makedirs(self.directory, exist_ok=True)
+        with open(self.tokenizerfile + '.tmp', 'w', encoding='utf8') as f:
+            f.write(tokenizer.to_json())
+        os.replace(self.tokenizerfile + '.tmp', self.tokenizerfile)
@@ -0,0 +1,177 @@
+try:
+    import time
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    from .metrics import NULL_METRICS, SIZE_BUCKETS
+    from .registry import load_ai
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+COMBINATIONS = ("mean", "weighted", "disagreement")
+
+class Ensemble:
+    """
+    The Ensemble class scores texts with several loaded models at once and combines their probabilities.
+
+    Members with the same tokenizer artifact and padding settings, as models trained on the same data have, share one tokenization pass. The padded arrays are then run through all members concurrently, one thread per member. TensorFlow and NumPy release the GIL during the forward pass, so the latency of a batch is close to that of the slowest member rather than the sum.
+    """
+    def __init__(self, members, combination="mean", weights=None, metrics=None):
+        """
+        Initializes the ensemble.
+
+        Parameters:
+        - members (dict): The built models (`AI` or `Classifier`) by name.
+        - combination (str, optional): "mean" averages the member probabilities. "weighted" takes the weighted share of members voting positive as the probability. "disagreement" averages the probabilities, but labels the texts the members disagree on "Uncertain". Defaults to "mean".
+        - weights (dict, optional): The vote weight of each member for the "weighted" combination. Defaults to equal weights.
+        - metrics (Metrics, optional): Records the ensemble's request, stage and per-member timers. Defaults to None (disabled).
+
+        Raises:
+        - ValueError: If there are no members, the combination is unknown, a member has no weight or a member has no Python tokenizer, as with the "savedmodel" backend.
+        """
+        if not members:
+            raise ValueError("An ensemble needs at least one member")
+        if any(member.tokenizer is None for member in members.values()):
+            raise ValueError("Ensemble members share a tokenization pass, so they need their tokenizer artifact. The savedmodel backend is not supported.")
+        if combination not in COMBINATIONS:
+            raise ValueError(f"Unknown combination {combination}")
+        if weights is not None and set(weights) != set(members):
+            raise ValueError("weights must have one entry per member")
+        self.members = dict(members)
+        self.modelname = "+".join(self.members)
+        self.combination = combination
+        self.weights = np.array([weights[name] if weights is not None else 1.0 for name in self.members], dtype=np.float64)
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        groups = {}
+        for name, member in self.members.items():
+            key = (member.tokenizer.to_json(), member.maxlen, member.padding, member.truncating)
+            groups.setdefault(key, []).append(name)
+        self.groups = list(groups.values())
+        self.executor = ThreadPoolExecutor(len(self.members), thread_name_prefix="ensemble")
+
+    def _run_member(self, name, padded, batch_size):
+        """
+        Runs one member on the shared padded sequences, through its prediction cache when it has one.
+
+        Returns:
+        - (probabilities, seconds) (tuple): The member's positive-class probabilities and how long it took.
+        """
+        member = self.members[name]
+        start = time.perf_counter()
+        if member.cache is not None:
+            probabilities = member._predict_cached(padded, batch_size)
+        else:
+            probabilities = member._predict(padded, batch_size)
+        seconds = time.perf_counter() - start
+        self.metrics.observe("member_seconds", seconds, model=self.modelname, member=name)
+        return probabilities, seconds
+
+    def predict(self, texts, batch_size=256):
+        """
+        Scores a list of texts with every member and combines the results.
+
+        Parameters:
+        - texts (list): The input texts to analyze.
+        - batch_size (int, optional): The number of texts passed to each member per call. Defaults to 256.
+
+        Returns:
+        - result (dict): The combined `labels` and `probabilities`, the `member_probabilities` by member name, whether all members `agree` on each label, the `member_seconds` each member took, and the `tokenize_seconds` and total `seconds` of the request.
+        """
+        metrics = self.metrics
+        metrics.count("requests_total", model=self.modelname)
+        start = time.perf_counter()
+        with metrics.timer("request_seconds", model=self.modelname):
+            with metrics.timer("stage_seconds", stage="tokenize_pad", model=self.modelname):
+                padded = {}
+                for names in self.groups:
+                    first = self.members[names[0]]
+                    if first.model is None and first.runtime is None:
+                        raise Exception(f"Model {names[0]} not initialized. Please call build() first.")
+                    shared = first.tokenizer.texts_to_padded(texts, maxlen=first.maxlen, padding=first.padding, truncating=first.truncating)
+                    padded.update((name, shared) for name in names)
+            tokenize_seconds = time.perf_counter() - start
+            futures = {name: self.executor.submit(self._run_member, name, padded[name], batch_size) for name in self.members}
+            results = {name: future.result() for name, future in futures.items()}
+            with metrics.timer("stage_seconds", stage="combine", model=self.modelname):
+                probabilities = np.stack([results[name][0] for name in self.members])
+                votes = probabilities > 0.5
+                agree = votes.all(axis=0) | ~votes.any(axis=0)
+                if self.combination == "weighted":
+                    combined = self.weights @ votes / self.weights.sum()
+                else:
+                    combined = probabilities.mean(axis=0)
+                labels = np.where(combined > 0.5, "Positive", "Negative")
+                if self.combination == "disagreement":
+                    labels = np.where(agree, labels, "Uncertain")
+        metrics.count("texts_total", len(texts), model=self.modelname)
+        metrics.observe("request_texts", len(texts), SIZE_BUCKETS, model=self.modelname)
+        return {
+            "labels": labels,
+            "probabilities": combined.astype(np.float32),
+            "member_probabilities": {name: results[name][0] for name in self.members},
+            "agree": agree,
+            "member_seconds": {name: results[name][1] for name in self.members},
+            "tokenize_seconds": tokenize_seconds,
+            "seconds": time.perf_counter() - start
+        }
+
+    def analyze_batch(self, texts, batch_size=256):
+        """
+        Analyzes a list of texts and returns the combined sentiments and probabilities, like `AI.analyze_batch`.
+
+        Parameters:
+        - texts (list): The input texts to analyze.
+        - batch_size (int, optional): The number of texts passed to each member per call. Defaults to 256.
+
+        Returns:
+        - labels (numpy.ndarray): The combined sentiment of each text: "Positive", "Negative", or "Uncertain" with the "disagreement" combination.
+        - probabilities (numpy.ndarray): The combined positive-class probability of each text.
+        """
+        result = self.predict(texts, batch_size)
+        return result["labels"], result["probabilities"]
+
+    def analyze(self, text):
+        """
+        Analyzes the input text and returns the combined sentiment.
+
+        Parameters:
+        - text (str): The input text to analyze.
+
+        Returns:
+        - sentiment (str): The combined sentiment of the input text.
+        """
+        labels, _ = self.analyze_batch([text])
+        return str(labels[0])
+
+    def close(self):
+        """
+        Stops the member threads. The members themselves stay loaded.
+        """
+        self.executor.shutdown(wait=False)
+
+def load_ensemble(modelnames, combination="mean", weights=None, cache=None, metrics=None, backend="keras", bucketing=False, execution="default", loader=load_ai):
+    """
+    Loads and builds the member models and returns them as an ensemble.
+
+    Parameters:
+    - modelnames (iterable): The member models, e.g. ("RNN", "LSTM", "CNN").
+    - combination (str, optional): How member probabilities are combined, see `Ensemble`. Defaults to "mean".
+    - weights (dict, optional): The vote weight of each member. Defaults to equal weights.
+    - cache (PredictionCache, optional): The prediction cache shared by the members. Each member keeps its own namespace. Defaults to None.
+    - metrics (Metrics, optional): The metrics registry shared by the members and the ensemble. Defaults to None.
+    - backend (str, optional): The inference backend of every member. Defaults to "keras".
+    - bucketing (bool, optional): Whether the members bucket batches by length. Defaults to False.
+    - execution (str, optional): The execution mode of every Keras member. Defaults to "default".
+    - loader (callable, optional): Loads one member by name. Defaults to `load_ai`.
+
+    Returns:
+    - ensemble (Ensemble): The ensemble.
+
+    Raises:
+    - ValueError: If a model is named twice.
+    """
+    modelnames = list(modelnames)
+    if len(set(modelnames)) != len(modelnames):
+        raise ValueError("Ensemble members must be different models")
+    members = {name: loader(name, cache=cache, metrics=metrics, backend=backend, bucketing=bucketing, execution=execution) for name in modelnames}
+    return Ensemble(members, combination=combination, weights=weights, metrics=metrics)
@@ -0,0 +1,139 @@
+try:
+    import contextlib
+    import numpy as np
+    import keras
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+EXECUTION_MODES = ("default", "xla", "bf16", "xla_bf16")
+
+def bf16_supported():
+    """
+    Checks whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX-BF16). Without them bfloat16 is emulated and slower than float32.
+
+    Returns:
+    - supported (bool): True if the CPU flags list either extension. Always False where `/proc/cpuinfo` does not exist.
+    """
+    try:
+        with open("/proc/cpuinfo", encoding="utf8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def resolve(mode):
+    """
+    Returns the execution mode to run for a requested mode.
+
+    Parameters:
+    - mode (str): "default", "xla" (XLA-compiled train and predict steps), "bf16" (bfloat16 computation with float32 weights) or "xla_bf16" (both).
+
+    Returns:
+    - mode (str): The requested mode, or the same mode without bfloat16 if the CPU does not support it.
+
+    Raises:
+    - ValueError: If the mode is unknown.
+    """
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode {mode}")
+    if mode.endswith("bf16") and not bf16_supported():
+        fallback = "xla" if mode == "xla_bf16" else "default"
+        print(f"This CPU has no native bfloat16 support. Running {fallback} instead of {mode}.")
+        return fallback
+    return mode
+
+def uses_xla(mode):
+    """
+    Returns whether the mode compiles the train and predict steps with XLA.
+    """
+    return mode in ("xla", "xla_bf16")
+
+def dtype_policy(mode):
+    """
+    Returns the Keras dtype policy of the mode: "mixed_bfloat16" for the bfloat16 modes, "float32" otherwise.
+    """
+    return "mixed_bfloat16" if mode in ("bf16", "xla_bf16") else "float32"
+
+@contextlib.contextmanager
+def policy_scope(mode):
+    """
+    Sets the global Keras dtype policy of the mode while a model is created, and restores the previous policy afterwards. Layers keep the policy they were created with.
+    """
+    previous = keras.config.dtype_policy()
+    keras.config.set_dtype_policy(dtype_policy(mode))
+    try:
+        yield
+    finally:
+        keras.config.set_dtype_policy(previous)
+
+def with_execution(model, mode):
+    """
+    Returns a copy of a trained model that runs in the given execution mode.
+
+    Parameters:
+    - model (keras.Sequential): The trained, compiled model.
+    - mode (str): The execution mode, as returned by `resolve`.
+
+    Returns:
+    - model (keras.Sequential): A model with the same weights, compiled with the same loss and a fresh optimizer of the same configuration. Every layer but the output layer computes in the mode's dtype policy. The output layer stays in float32 so the probabilities keep their precision.
+    """
+    policy = dtype_policy(mode)
+    output = model.layers[-1]
+
+    def clone_layer(layer):
+        config = layer.get_config()
+        layer_policy = "float32" if layer is output else policy
+        config["dtype"] = layer_policy
+        for key in ("layer", "backward_layer"):
+            if config.get(key):
+                config[key]["config"]["dtype"] = layer_policy
+        return type(layer).from_config(config)
+
+    clone = keras.models.clone_model(model, clone_function=clone_layer)
+    clone.set_weights(model.get_weights())
+    optimizer = keras.optimizers.deserialize(keras.optimizers.serialize(model.optimizer))
+    clone.compile(loss=model.loss, optimizer=optimizer, metrics=["accuracy"], jit_compile=uses_xla(mode))
+    return clone
+
+def check_execution(ai, mode, threshold=0.005, samples=5000, batch_size=256, seed=0):
+    """
+    Compares a model running in an execution mode with the same model in the default mode on held-out test reviews.
+
+    Parameters:
+    - ai (AI): The model, loaded with the Keras backend.
+    - mode (str): The execution mode to check.
+    - threshold (float, optional): The largest accuracy drop that counts as safe. Defaults to 0.005.
+    - samples (int, optional): The number of test reviews sampled. Defaults to 5000.
+    - batch_size (int, optional): The batch size. Defaults to 256.
+    - seed (int, optional): The sampling seed. Defaults to 0.
+
+    Returns:
+    - report (dict): The mode actually run, the validation accuracy in the default mode and in the mode, the accuracy drift, the share of identical labels, the largest probability difference, the time each took, the speedup and whether the mode is `safe`.
+    """
+    from .export import measure_drift, sample_test_split
+
+    mode = resolve(mode)
+    reference = with_execution(ai.model, "default")
+    candidate = reference if mode == "default" else with_execution(ai.model, mode)
+    sample = sample_test_split(ai, samples, seed)
+    count = len(sample[0])
+    # The first call of each batch shape traces (and with XLA compiles) the predict step, which is not what is being compared.
+    for model in (reference, candidate):
+        for rows in {min(batch_size, count), count % batch_size} - {0}:
+            model.predict_on_batch(np.zeros((rows, ai.maxlen), dtype=np.int32))
+    drift = measure_drift(ai, candidate, samples, batch_size, seed, reference=reference, sample=sample)
+    return {
+        "model": ai.modelname,
+        "mode": mode,
+        "samples": drift["samples"],
+        "default_accuracy": drift["keras_accuracy"],
+        "accuracy": drift["exported_accuracy"],
+        "accuracy_drift": drift["accuracy_drift"],
+        "label_agreement": drift["label_agreement"],
+        "max_probability_diff": drift["max_probability_diff"],
+        "default_seconds": drift["keras_seconds"],
+        "seconds": drift["exported_seconds"],
+        "speedup": drift["keras_seconds"] / drift["exported_seconds"],
+        "safe": drift["accuracy_drift"] >= -threshold
+    }
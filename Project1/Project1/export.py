@@ -0,0 +1,244 @@
+try:
+    import json
+    import time
+    import numpy as np
+    from os import path, replace
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+FORMATS = ("tflite", "numpy", "savedmodel")
+
+def _run(predictor, padded, batch_size):
+    """
+    Runs a predictor over padded sequences in batches and times it.
+
+    Returns:
+    - (probabilities, seconds) (tuple): The positive-class probabilities and the elapsed seconds.
+    """
+    probabilities = np.empty(len(padded), dtype=np.float32)
+    start = time.perf_counter()
+    for i in range(0, len(padded), batch_size):
+        batch = padded[i:i + batch_size]
+        probabilities[i:i + len(batch)] = np.asarray(predictor.predict_on_batch(batch)).reshape(-1)
+    return probabilities, time.perf_counter() - start
+
+def _compare(labels, reference, exported, keras_seconds, exported_seconds):
+    """
+    Builds the drift report of two sets of probabilities for the same labelled reviews.
+    """
+    keras_accuracy = float(np.mean((reference > 0.5) == labels))
+    exported_accuracy = float(np.mean((exported > 0.5) == labels))
+    return {
+        "samples": len(labels),
+        "keras_accuracy": keras_accuracy,
+        "exported_accuracy": exported_accuracy,
+        "accuracy_drift": exported_accuracy - keras_accuracy,
+        "label_agreement": float(np.mean((reference > 0.5) == (exported > 0.5))),
+        "max_probability_diff": float(np.max(np.abs(reference - exported))),
+        "keras_seconds": keras_seconds,
+        "exported_seconds": exported_seconds
+    }
+
+def sample_test_texts(samples=5000, seed=0):
+    """
+    Samples raw held-out test reviews from the dataset.
+
+    Parameters:
+    - samples (int, optional): The number of test reviews sampled, or None for all of them. Defaults to 5000.
+    - seed (int, optional): The sampling seed. Defaults to 0.
+
+    Returns:
+    - (texts, labels) (tuple): The sampled texts and their labels, in dataset order.
+    """
+    from .pipeline import load_text_split
+
+    texts, labels = [], []
+    for batch_texts, batch_labels in load_text_split("test").batch(1024).as_numpy_iterator():
+        texts.extend(text.decode("utf8") for text in batch_texts)
+        labels.extend(batch_labels)
+    if samples is None:
+        return texts, np.asarray(labels)
+    indices = np.sort(np.random.default_rng(seed).choice(len(texts), min(samples, len(texts)), replace=False))
+    return [texts[i] for i in indices], np.asarray(labels)[indices]
+
+def sample_test_split(ai, samples=5000, seed=0):
+    """
+    Samples held-out test reviews, tokenized and padded for a model.
+
+    The rows are read from the data cache when it was built with the model's vocabulary, like `AI._replay_data` does. Otherwise, as for a fine-tuned model or a missing cache, the raw reviews are tokenized with the model's own tokenizer. `ai.tokenizer` is never replaced.
+
+    Parameters:
+    - ai (AI): The model, loaded with its tokenizer.
+    - samples (int, optional): The number of test reviews sampled, or None for all of them. Defaults to 5000.
+    - seed (int, optional): The sampling seed. Defaults to 0.
+
+    Returns:
+    - (padded, labels) (tuple): The padded sequences and their labels.
+    """
+    data = ai.data_cache()
+    if data.exists(("test",)) and data.load_tokenizer().word_index == ai.tokenizer.word_index:
+        padded, labels = data.load_split("test")
+        if samples is None:
+            return np.asarray(padded), np.asarray(labels)
+        indices = np.sort(np.random.default_rng(seed).choice(len(padded), min(samples, len(padded)), replace=False))
+        return np.asarray(padded[indices]), np.asarray(labels[indices])
+    texts, labels = sample_test_texts(samples, seed)
+    return ai.tokenizer.texts_to_padded(texts, maxlen=ai.maxlen, padding=ai.padding, truncating=ai.truncating), labels
+
+def measure_drift(ai, runtime, samples=5000, batch_size=256, seed=0, reference=None, sample=None):
+    """
+    Compares an exported model with the Keras model it was exported from on held-out test reviews.
+
+    Parameters:
+    - ai (AI): The Keras model.
+    - runtime (object): The exported model, with a `predict_on_batch` method.
+    - samples (int, optional): The number of test reviews sampled. Defaults to 5000.
+    - batch_size (int, optional): The batch size. Defaults to 256.
+    - seed (int, optional): The sampling seed. Defaults to 0.
+    - reference (object, optional): The model compared against, with a `predict_on_batch` method. Defaults to `ai.model`.
+    - sample (tuple, optional): The (padded, labels) to compare on, from `sample_test_split`. Defaults to a new sample.
+
+    Returns:
+    - report (dict): The accuracy of both models, the accuracy drift, the share of identical labels, the largest probability difference and the time each model took.
+    """
+    padded, labels = sample if sample is not None else sample_test_split(ai, samples, seed)
+    reference, keras_seconds = _run(reference if reference is not None else ai.model, padded, batch_size)
+    exported, exported_seconds = _run(runtime, padded, batch_size)
+    return _compare(labels, reference, exported, keras_seconds, exported_seconds)
+
+def measure_text_drift(ai, runtime, samples=5000, batch_size=256, seed=0):
+    """
+    Compares a string-in exported model with the Keras model it was exported from on held-out raw test reviews.
+
+    Parameters:
+    - ai (AI): The Keras model.
+    - runtime (SavedModelRuntime): The exported model, with a `predict_texts` method.
+    - samples (int, optional): The number of test reviews sampled. Defaults to 5000.
+    - batch_size (int, optional): The batch size. Defaults to 256.
+    - seed (int, optional): The sampling seed. Defaults to 0.
+
+    Returns:
+    - report (dict): The same report as `measure_drift`. Both times include tokenization: the Keras model's in Python, the exported model's in its graph.
+
+    The raw texts are read from the dataset, since the data cache only holds padded arrays.
+    """
+    texts, labels = sample_test_texts(samples, seed)
+    start = time.perf_counter()
+    padded = ai.tokenizer.texts_to_padded(texts, maxlen=ai.maxlen, padding=ai.padding, truncating=ai.truncating)
+    reference, _ = _run(ai.model, padded, batch_size)
+    keras_seconds = time.perf_counter() - start
+    exported = np.empty(len(texts), dtype=np.float32)
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        exported[i:i + batch_size] = runtime.predict_texts(texts[i:i + batch_size])[1]
+    exported_seconds = time.perf_counter() - start
+    return _compare(labels, reference, exported, keras_seconds, exported_seconds)
+
+def export_tflite(ai, quantization="none"):
+    """
+    Exports a trained model to `<modelname>.tflite`, with its metadata in `<modelname>.tflite.json`.
+
+    Parameters:
+    - ai (AI): The model to export, loaded with the Keras backend.
+    - quantization (str, optional): "none", "float16" or "int8". Defaults to "none".
+
+    Returns:
+    - runtime (TFLiteRuntime): The exported model, loaded.
+    """
+    from .tflite import TFLITE_FORMAT_VERSION, TFLiteRuntime, convert
+
+    content = convert(ai.model, ai.maxlen, quantization)
+    metadata = {
+        "format_version": TFLITE_FORMAT_VERSION,
+        "source_fingerprint": ai._model_fingerprint(),
+        "quantization": quantization,
+        "maxlen": ai.maxlen
+    }
+    with open(ai.tflitefile + ".tmp", "wb") as f:
+        f.write(content)
+    replace(ai.tflitefile + ".tmp", ai.tflitefile)
+    with open(ai.tflitefile + ".json", "w", encoding="utf8") as f:
+        json.dump(metadata, f)
+    return TFLiteRuntime(ai.tflitefile)
+
+def export_numpy(ai):
+    """
+    Exports the weights of a trained model to `<modelname>.npz` for the NumPy engine.
+
+    Parameters:
+    - ai (AI): The model to export, loaded with the Keras backend.
+
+    Returns:
+    - runtime (NumpyModel): The exported model, loaded.
+    """
+    from .numpyengine import NumpyModel, save_weights
+
+    save_weights(ai.model, ai.numpyfile, ai._model_fingerprint())
+    return NumpyModel(ai.numpyfile)
+
+def export_savedmodel(ai, threshold=0.5):
+    """
+    Exports a trained model with its tokenization, padding and thresholding to the `<modelname>.savedmodel` directory, with its metadata in `<modelname>.savedmodel.json`.
+
+    Parameters:
+    - ai (AI): The model to export, loaded with the Keras backend.
+    - threshold (float, optional): The positive-class probability above which the graph labels a text "Positive". Defaults to 0.5.
+
+    Returns:
+    - runtime (SavedModelRuntime): The exported model, loaded and warmed up.
+
+    Raises:
+    - ValueError: If the model maps words with a `HashingTokenizer`, which has no in-graph equivalent.
+    """
+    from .savedmodel import SavedModelRuntime, save
+
+    save(ai, ai.savedmodelfile, threshold)
+    return SavedModelRuntime(ai.savedmodelfile)
+
+def export(ai, fmt="tflite", quantization="none", samples=5000, batch_size=256, seed=0):
+    """
+    Exports a trained model for CPU serving and measures what the export costs.
+
+    Parameters:
+    - ai (AI): The model to export, loaded with the Keras backend.
+    - fmt (str, optional): "tflite", "numpy" or "savedmodel". Defaults to "tflite".
+    - quantization (str, optional): The TFLite quantization, "none", "float16" or "int8". The NumPy engine and the SavedModel are always float32. Defaults to "none".
+    - samples (int, optional): The number of held-out test reviews to compare on, 0 to skip the comparison. Defaults to 5000.
+    - batch_size (int, optional): The batch size of the comparison. Defaults to 256.
+    - seed (int, optional): The seed used to sample the test reviews. Defaults to 0.
+
+    Returns:
+    - report (dict): The Keras and exported file sizes, and when `samples` is set the result of `measure_drift`.
+    """
+    if ai.model is None:
+        raise ValueError("Model not initialized. Please call build() first.")
+    if fmt == "tflite":
+        runtime, modelfile = export_tflite(ai, quantization), ai.tflitefile
+    elif fmt == "numpy":
+        runtime, modelfile, quantization = export_numpy(ai), ai.numpyfile, "none"
+    elif fmt == "savedmodel":
+        runtime, modelfile, quantization = export_savedmodel(ai), ai.savedmodelfile, "none"
+    else:
+        raise ValueError(f"Unknown export format {fmt}")
+    keras_bytes = path.getsize(ai.modelfile)
+    if fmt == "savedmodel":
+        from .savedmodel import directory_bytes
+        exported_bytes = directory_bytes(modelfile)
+    else:
+        exported_bytes = path.getsize(modelfile)
+    report = {
+        "model": ai.modelname,
+        "format": fmt,
+        "quantization": quantization,
+        "file": modelfile,
+        "keras_bytes": keras_bytes,
+        "exported_bytes": exported_bytes,
+        "size_reduction": 1 - exported_bytes / keras_bytes
+    }
+    if fmt == "savedmodel":
+        report["warmup_seconds"] = runtime.warmup_seconds
+    if samples:
+        measure = measure_text_drift if fmt == "savedmodel" else measure_drift
+        report.update(measure(ai, runtime, samples, batch_size, seed))
+    return report
@@ -0,0 +1,225 @@
+try:
+    import threading
+    import time
+    from bisect import bisect_left
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+class Histogram:
+    """
+    A cumulative histogram with fixed bucket upper bounds, in the Prometheus style.
+    """
+    def __init__(self, buckets):
+        """
+        Initializes an empty histogram.
+
+        Parameters:
+        - buckets (tuple): The sorted bucket upper bounds. An implicit +Inf bucket is added.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Records one value.
+
+        Parameters:
+        - value (float): The value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket that contains it.
+
+        Parameters:
+        - q (float): The quantile, between 0 and 1.
+
+        Returns:
+        - value (float): The estimate, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class _Timer:
+    """
+    A context manager that observes its duration into a histogram of a `Metrics` instance.
+    """
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, LATENCY_BUCKETS, **self.labels)
+        return False
+
+class Metrics:
+    """
+    An in-process metrics registry of counters and histograms.
+
+    Each metric is identified by its name and a set of labels such as the model name or inference stage. `snapshot` returns everything as a dict, and `to_prometheus` renders the Prometheus text exposition format. The registry is thread-safe.
+    """
+    enabled = True
+
+    def __init__(self, prefix="sentiment_"):
+        """
+        Initializes an empty registry.
+
+        Parameters:
+        - prefix (str, optional): The prefix of every exported metric name. Defaults to "sentiment_".
+        """
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def count(self, name, value=1, **labels):
+        """
+        Increments a counter.
+
+        Parameters:
+        - name (str): The counter name.
+        - value (int, optional): The increment. Defaults to 1.
+        - **labels: The metric labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Records a value in a histogram.
+
+        Parameters:
+        - name (str): The histogram name.
+        - value (float): The value.
+        - buckets (tuple, optional): The bucket bounds used if the histogram is new. Defaults to `LATENCY_BUCKETS` (seconds).
+        - **labels: The metric labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        """
+        Returns a context manager that records the duration of its block in seconds.
+
+        Parameters:
+        - name (str): The histogram name.
+        - **labels: The metric labels.
+        """
+        return _Timer(self, name, labels)
+
+    def snapshot(self):
+        """
+        Returns the current values of all metrics.
+
+        Returns:
+        - snapshot (dict): Counters as a list of {name, labels, value}, and histograms as a list of {name, labels, count, sum, p50, p90, p99, buckets}.
+        """
+        with self.lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()]
+            histograms = [{
+                "name": name,
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "p50": histogram.quantile(0.5),
+                "p90": histogram.quantile(0.9),
+                "p99": histogram.quantile(0.99),
+                "buckets": dict(zip([str(bound) for bound in histogram.buckets] + ["+Inf"], histogram.counts))
+            } for (name, labels), histogram in self.histograms.items()]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+        - text (str): The exposition text.
+        """
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def render(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {self.prefix}{name} counter")
+                for (other, labels), value in self.counters.items():
+                    if other == name:
+                        lines.append(f"{self.prefix}{name}{render(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {self.prefix}{name} histogram")
+                for (other, labels), histogram in self.histograms.items():
+                    if other != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{self.prefix}{name}_bucket{render(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{self.prefix}{name}_sum{render(labels)} {histogram.sum}")
+                    lines.append(f"{self.prefix}{name}_count{render(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+class _NullTimer:
+    """
+    A context manager that does nothing.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullMetrics:
+    """
+    A metrics registry that records nothing. It is the default, so instrumentation costs one no-op call per metric when disabled.
+    """
+    enabled = False
+    _timer = _NullTimer()
+
+    def count(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        pass
+
+    def timer(self, name, **labels):
+        return self._timer
+
+    def snapshot(self):
+        return {"counters": [], "histograms": []}
+
+    def to_prometheus(self):
+        return ""
+
+NULL_METRICS = NullMetrics()
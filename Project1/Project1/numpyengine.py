@@ -0,0 +1,204 @@
+try:
+    import json
+    import numpy as np
+    from os import replace
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+NUMPY_FORMAT_VERSION = 1
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (1 + np.tanh(0.5 * x))
+}
+
+def _activation(name):
+    """
+    Returns the NumPy function of a Keras activation name.
+    """
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation {name}")
+    return ACTIVATIONS[name]
+
+def _layer_spec(layer):
+    """
+    Describes a Keras layer as a JSON-serializable dict, or raises ValueError if the engine cannot run it.
+    """
+    kind = type(layer).__name__
+    config = layer.get_config()
+    if kind in ("Embedding", "Dropout"):
+        return {"type": kind}
+    if kind in ("SimpleRNN", "LSTM"):
+        for name in ("activation", "recurrent_activation"):
+            if name in config:
+                _activation(config[name])
+        return {
+            "type": kind,
+            "activation": config["activation"],
+            "recurrent_activation": config.get("recurrent_activation"),
+            "return_sequences": config["return_sequences"],
+            "go_backwards": config["go_backwards"]
+        }
+    if kind == "Bidirectional":
+        if config["merge_mode"] != "concat":
+            raise ValueError(f"Unsupported merge mode {config['merge_mode']}")
+        return {"type": kind, "layer": _layer_spec(layer.forward_layer)}
+    if kind == "Conv1D":
+        if config["padding"] != "valid" or tuple(config["strides"]) != (1,) or tuple(config["dilation_rate"]) != (1,):
+            raise ValueError("Only unstrided Conv1D layers with valid padding are supported")
+        _activation(config["activation"])
+        return {"type": kind, "activation": config["activation"]}
+    if kind == "MaxPooling1D":
+        if config["padding"] != "valid":
+            raise ValueError("Only MaxPooling1D layers with valid padding are supported")
+        return {"type": kind, "pool_size": config["pool_size"][0], "strides": config["strides"][0]}
+    if kind == "Dense":
+        _activation(config["activation"])
+        return {"type": kind, "activation": config["activation"]}
+    raise ValueError(f"Unsupported layer {kind}")
+
+def save_weights(model, filename, source_fingerprint):
+    """
+    Saves the architecture and weights of a trained Keras model in the format `NumpyModel` reads.
+
+    Parameters:
+    - model (keras.Sequential): The trained model.
+    - filename (str): The `.npz` file to write.
+    - source_fingerprint (str): The fingerprint of the saved Keras model file.
+
+    Raises:
+    - ValueError: If the model has a layer the engine cannot run.
+    """
+    specs = [_layer_spec(layer) for layer in model.layers]
+    arrays = {}
+    for i, layer in enumerate(model.layers):
+        for j, weight in enumerate(layer.get_weights()):
+            arrays[f"layer{i}_{j}"] = np.asarray(weight, dtype=np.float32)
+    metadata = {"format_version": NUMPY_FORMAT_VERSION, "source_fingerprint": source_fingerprint, "layers": specs}
+    with open(filename + ".tmp", "wb") as f:
+        np.savez(f, metadata=np.array(json.dumps(metadata)), **arrays)
+    replace(filename + ".tmp", filename)
+
+def _recurrent(spec, weights, x):
+    """
+    Runs a SimpleRNN or LSTM layer over a batch of sequences.
+
+    The input projection of every time step is computed in one matrix product, so only the recurrent product is left in the loop over time. LSTM gates are in the Keras order: input, forget, cell, output.
+    """
+    kernel, recurrent, bias = weights
+    activation = _activation(spec["activation"])
+    steps = x.shape[1]
+    order = range(steps - 1, -1, -1) if spec["go_backwards"] else range(steps)
+    projected = x @ kernel + bias
+    units = recurrent.shape[0]
+    h = np.zeros((x.shape[0], units), dtype=np.float32)
+    outputs = np.empty((x.shape[0], steps, units), dtype=np.float32) if spec["return_sequences"] else None
+    if spec["type"] == "LSTM":
+        recurrent_activation = _activation(spec["recurrent_activation"])
+        c = np.zeros_like(h)
+        for n, t in enumerate(order):
+            z = projected[:, t] + h @ recurrent
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            c = f * c + i * activation(z[:, 2 * units:3 * units])
+            h = recurrent_activation(z[:, 3 * units:]) * activation(c)
+            if outputs is not None:
+                outputs[:, n] = h
+    else:
+        for n, t in enumerate(order):
+            h = activation(projected[:, t] + h @ recurrent)
+            if outputs is not None:
+                outputs[:, n] = h
+    return outputs if outputs is not None else h
+
+def _bidirectional(spec, weights, x):
+    """
+    Runs a bidirectional recurrent layer. The backward outputs are reversed back into time order before concatenation, as in Keras.
+    """
+    half = len(weights) // 2
+    forward = dict(spec["layer"], go_backwards=False)
+    backward = dict(spec["layer"], go_backwards=True)
+    y = _recurrent(forward, weights[:half], x)
+    z = _recurrent(backward, weights[half:], x)
+    if spec["layer"]["return_sequences"]:
+        z = z[:, ::-1]
+    return np.concatenate([y, z], axis=-1)
+
+def _conv1d(spec, weights, x):
+    """
+    Runs an unstrided Conv1D layer with valid padding as one tensor contraction over sliding windows.
+    """
+    kernel, bias = weights
+    windows = np.lib.stride_tricks.sliding_window_view(x, kernel.shape[0], axis=1)
+    return _activation(spec["activation"])(np.einsum("btck,kcf->btf", windows, kernel, optimize=True) + bias)
+
+def _maxpool1d(spec, weights, x):
+    """
+    Runs a MaxPooling1D layer with valid padding.
+    """
+    size, stride = spec["pool_size"], spec["strides"]
+    if size == stride:
+        steps = x.shape[1] // size
+        return x[:, :steps * size].reshape(x.shape[0], steps, size, x.shape[2]).max(axis=2)
+    windows = np.lib.stride_tricks.sliding_window_view(x, size, axis=1)[:, ::stride]
+    return windows.max(axis=-1)
+
+LAYERS = {
+    "Embedding": lambda spec, weights, x: weights[0][x],
+    "Dropout": lambda spec, weights, x: x,
+    "SimpleRNN": _recurrent,
+    "LSTM": _recurrent,
+    "Bidirectional": _bidirectional,
+    "Conv1D": _conv1d,
+    "MaxPooling1D": _maxpool1d,
+    "Dense": lambda spec, weights, x: _activation(spec["activation"])(x @ weights[0] + weights[1])
+}
+
+class NumpyModel:
+    """
+    Runs the forward pass of an exported RNN, LSTM or CNN model in NumPy, with the `predict_on_batch` interface of a Keras model.
+
+    Loading needs neither TensorFlow nor Keras, so a process that only serves predictions starts in a fraction of a second.
+    """
+    def __init__(self, modelfile):
+        """
+        Loads the exported weights.
+
+        Parameters:
+        - modelfile (str): The `.npz` file written by `save_weights`.
+
+        Raises:
+        - OSError: If the file cannot be read.
+        - ValueError: If the file has an unsupported format version.
+        """
+        with np.load(modelfile, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata.get("format_version") != NUMPY_FORMAT_VERSION:
+                raise ValueError(f"unsupported NumPy model format version {metadata.get('format_version')}")
+            self.layers = []
+            for i, spec in enumerate(metadata["layers"]):
+                weights = []
+                while f"layer{i}_{len(weights)}" in data.files:
+                    weights.append(data[f"layer{i}_{len(weights)}"])
+                self.layers.append((spec, weights))
+        self.source_fingerprint = metadata["source_fingerprint"]
+        self.quantization = "none"
+        self.nbytes = sum(weight.nbytes for _, weights in self.layers for weight in weights)
+
+    def predict_on_batch(self, batch):
+        """
+        Runs the model on one batch of padded sequences.
+
+        Parameters:
+        - batch (numpy.ndarray): The padded sequences.
+
+        Returns:
+        - outputs (numpy.ndarray): The model output, of shape (len(batch), 1) for the sentiment models.
+        """
+        x = np.asarray(batch)
+        for spec, weights in self.layers:
+            x = LAYERS[spec["type"]](spec, weights, x)
+        return x
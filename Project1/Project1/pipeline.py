@@ -0,0 +1,158 @@
+try:
+    import numpy as np
+    import tensorflow as tf
+    import tensorflow_datasets as tfds
+    from .bucketing import bucket_bounds, bucket_batches
+    from .tokenizer import HashingTokenizer
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+def _filters_pattern(filters):
+    """
+    Builds an RE2 character class matching any of the filter characters.
+
+    Parameters:
+    - filters (str): The characters to match.
+
+    Returns:
+    - pattern (str): The regular expression.
+    """
+    return '[' + ''.join(f'\\x{{{ord(c):x}}}' for c in filters) + ']'
+
+class Vectorizer(tf.Module):
+    """
+    An in-graph text vectorizer equivalent to `FastTokenizer.texts_to_padded`.
+
+    The fitted vocabulary is compiled into a static hash table that maps each word to its final, capped index. The Keras splitting rules are reproduced with string ops, so a batch of raw review strings becomes a padded int32 tensor inside the tf.data graph. Lowercasing uses Unicode case mapping, which matches Python's `str.lower` for all but a few special cases.
+    """
+    def __init__(self, tokenizer, maxlen=100, padding='post', truncating='post'):
+        """
+        Initializes the vectorizer from a fitted tokenizer.
+
+        Parameters:
+        - tokenizer (FastTokenizer): The fitted tokenizer.
+        - maxlen (int, optional): The padded sequence length. Defaults to 100.
+        - padding (str, optional): 'pre' or 'post'. Defaults to 'post'.
+        - truncating (str, optional): 'pre' or 'post'. Defaults to 'post'.
+
+        Raises:
+        - ValueError: If the tokenizer is a `HashingTokenizer`, whose CRC-32 hash has no TensorFlow string op.
+        """
+        if isinstance(tokenizer, HashingTokenizer):
+            raise ValueError("The in-graph vectorizer needs a fitted vocabulary. Hashing tokenizers are not supported.")
+        super().__init__()
+        words = list(tokenizer._lookup.keys())
+        indices = list(tokenizer._lookup.values())
+        self.default = -1 if tokenizer.oov_index is None else tokenizer.oov_index
+        self.table = tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(tf.constant(words or [''], tf.string), tf.constant(indices or [self.default], tf.int32)),
+            default_value=self.default
+        )
+        self.pattern = _filters_pattern(tokenizer.filters)
+        self.lower = tokenizer.lower
+        self.split = tokenizer.split
+        self.maxlen = maxlen
+        self.padding = padding
+        self.truncating = truncating
+
+    def __call__(self, texts):
+        """
+        Vectorizes a batch of texts.
+
+        Parameters:
+        - texts (tf.Tensor): A 1-D string tensor.
+
+        Returns:
+        - padded (tf.Tensor): An int32 tensor of shape (batch, maxlen).
+        """
+        if self.lower:
+            texts = tf.strings.lower(texts, encoding='utf-8')
+        texts = tf.strings.regex_replace(texts, self.pattern, self.split)
+        words = tf.strings.split(texts, sep=self.split)
+        words = tf.ragged.boolean_mask(words, tf.strings.length(words) > 0)
+        ids = tf.ragged.map_flat_values(self.table.lookup, words)
+        if self.default < 0:
+            ids = tf.ragged.boolean_mask(ids, ids >= 0)
+        if self.truncating == 'post':
+            ids = ids[:, :self.maxlen]
+        else:
+            ids = ids[:, -self.maxlen:]
+        if self.padding == 'post':
+            return ids.to_tensor(default_value=0, shape=[None, self.maxlen])
+        # Pre-padding is post-padding of the reversed rows, reversed back.
+        reversed_ids = tf.RaggedTensor.from_row_lengths(tf.reverse(ids.flat_values, [0]), tf.reverse(ids.row_lengths(), [0]))
+        return tf.reverse(reversed_ids.to_tensor(default_value=0, shape=[None, self.maxlen]), [0, 1])
+
+def load_text_split(split, shuffle_files=False):
+    """
+    Loads one split of the IMDB dataset as a stream of (text, label) pairs.
+
+    Parameters:
+    - split (str): The dataset split, e.g. "train" or "test".
+    - shuffle_files (bool, optional): Whether to shuffle the order of the dataset files. Defaults to False.
+
+    Returns:
+    - dataset (tf.data.Dataset): The unbatched (text, label) pairs.
+    """
+    return tfds.load('imdb_reviews', split=split, as_supervised=True, shuffle_files=shuffle_files)
+
+def iter_texts(dataset):
+    """
+    Iterates over the decoded texts of a (text, label) dataset without holding them all in memory.
+
+    Parameters:
+    - dataset (tf.data.Dataset): The unbatched (text, label) pairs.
+
+    Yields:
+    - text (str): The next decoded text.
+    """
+    for texts, _ in dataset.batch(1024).as_numpy_iterator():
+        for text in texts:
+            yield text.decode('utf8')
+
+def make_dataset(dataset, vectorizer, batch_size=32, shuffle_buffer=None, seed=None):
+    """
+    Builds a streaming training or evaluation input pipeline.
+
+    Parameters:
+    - dataset (tf.data.Dataset): The unbatched (text, label) pairs.
+    - vectorizer (Vectorizer): The in-graph vectorizer.
+    - batch_size (int, optional): The batch size. Defaults to 32.
+    - shuffle_buffer (int, optional): The size of the bounded shuffle buffer. Defaults to None (no shuffling).
+    - seed (int, optional): The shuffle seed. Defaults to None.
+
+    Returns:
+    - dataset (tf.data.Dataset): Batches of (padded, label) pairs.
+
+    Reviews are shuffled through a bounded buffer, batched, vectorized in parallel across cores and prefetched, so peak memory depends on the buffer and batch sizes rather than on the corpus size.
+    """
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(lambda texts, labels: (vectorizer(texts), labels), num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def make_bucketed_dataset(padded, labels, batch_size=32, bounds=None, padding='post', shuffle=False, seed=None):
+    """
+    Builds a training or evaluation input pipeline over padded arrays, with length-bucketed batches.
+
+    Parameters:
+    - padded (numpy.ndarray): The padded sequences, e.g. memory-mapped from the data cache.
+    - labels (numpy.ndarray): The labels.
+    - batch_size (int, optional): The maximum batch size. Defaults to 32.
+    - bounds (tuple, optional): The bucket lengths. Defaults to `bucket_bounds` of the padded length.
+    - padding (str, optional): 'post' or 'pre'. Defaults to 'post'.
+    - shuffle (bool, optional): Whether the sequences within each bucket and the order of the batches are reshuffled every epoch. Defaults to False.
+    - seed (int, optional): The shuffle seed. Defaults to None.
+
+    Returns:
+    - dataset (tf.data.Dataset): Batches of (padded, label) pairs, each padded only to its bucket's length.
+    """
+    bounds = bounds or bucket_bounds(padded.shape[1])
+    rng = np.random.default_rng(seed) if shuffle else None
+    def batches():
+        for indices, batch in bucket_batches(padded, batch_size, bounds, padding, rng):
+            yield batch.astype(np.int32, copy=False), labels[indices]
+    signature = (tf.TensorSpec((None, None), tf.int32), tf.TensorSpec((None,), tf.as_dtype(labels.dtype)))
+    return tf.data.Dataset.from_generator(batches, output_signature=signature).prefetch(tf.data.AUTOTUNE)
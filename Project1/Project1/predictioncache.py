@@ -0,0 +1,101 @@
+try:
+    import threading
+    import time
+    from collections import OrderedDict
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+class PredictionCache:
+    """
+    A bounded cache of model outputs keyed by the padded token sequence.
+
+    Texts that tokenize to the same padded sequence, e.g. ones that differ only in case or punctuation, share an entry. Keys are namespaced per model so several models can share one cache. Entries are evicted least recently used first once `capacity` is reached, and expire after `ttl` seconds when a TTL is set. The cache is thread-safe.
+    """
+    def __init__(self, capacity=100000, ttl=None, clock=time.monotonic):
+        """
+        Initializes an empty cache.
+
+        Parameters:
+        - capacity (int, optional): The maximum number of entries. Defaults to 100000.
+        - ttl (float, optional): The lifetime of an entry in seconds. Defaults to None (entries never expire).
+        - clock (callable, optional): Returns the current time in seconds. Defaults to `time.monotonic`.
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, namespace, keys):
+        """
+        Looks up several keys.
+
+        Parameters:
+        - namespace (str): The model namespace.
+        - keys (list): The keys, e.g. padded sequences as bytes.
+
+        Returns:
+        - values (list): The cached value of each key, or None on a miss.
+        """
+        now = self.clock()
+        values = []
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get((namespace, key))
+                if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                    del self.entries[(namespace, key)]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    self.entries.move_to_end((namespace, key))
+                    self.hits += 1
+                    values.append(entry[0])
+        return values
+
+    def put_many(self, namespace, keys, values):
+        """
+        Stores several values.
+
+        Parameters:
+        - namespace (str): The model namespace.
+        - keys (list): The keys.
+        - values (list): The values to store.
+        """
+        now = self.clock()
+        with self.lock:
+            for key, value in zip(keys, values):
+                self.entries[(namespace, key)] = (value, now)
+                self.entries.move_to_end((namespace, key))
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, namespace=None):
+        """
+        Removes the entries of one namespace, or all entries.
+
+        Parameters:
+        - namespace (str, optional): The namespace to clear. Defaults to None (clear everything).
+        """
+        with self.lock:
+            if namespace is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == namespace]:
+                    del self.entries[key]
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+        - stats (dict): The number of entries and the hit, miss and eviction counts.
+        """
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,227 @@
+try:
+    import threading
+    import time
+    from collections import OrderedDict
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+class ModelNotFound(Exception):
+    """
+    Raised by `load_ai` when a model has not been trained or exported yet, or was not trained the way it is asked to be served.
+    """
+
+def construct_ai(modelname, cache=None, metrics=None, backend="keras", bucketing=False, execution="default"):
+    """
+    Constructs an `AI` instance, or a `Classifier` for the numpy backend so TensorFlow is not imported. Whatever is saved on disk is loaded, but nothing is trained.
+
+    Parameters:
+    - modelname (str): "RNN", "LSTM" or "CNN".
+    - cache (PredictionCache, optional): The prediction cache the model uses. Defaults to None.
+    - metrics (Metrics, optional): The metrics registry the model reports to. Defaults to None.
+    - backend (str, optional): The inference backend, "keras", "tflite", "numpy" or "savedmodel". Defaults to "keras".
+    - bucketing (bool, optional): Whether inference batches are bucketed by length. Defaults to False.
+    - execution (str, optional): The execution mode of a Keras model, see `AI`. Defaults to "default".
+
+    Returns:
+    - ai (AI): The constructed model.
+    """
+    if backend == "numpy":
+        if execution != "default":
+            raise ValueError("Execution modes apply to the keras backend only")
+        from .classifier import Classifier
+        return Classifier(modelname=modelname, cache=cache, metrics=metrics, backend=backend, bucketing=bucketing)
+    from .text_classification import AI
+    return AI(modelname=modelname, cache=cache, metrics=metrics, backend=backend, bucketing=bucketing, execution=execution)
+
+def load_ai(modelname, cache=None, metrics=None, backend="keras", bucketing=False, execution="default"):
+    """
+    Loads a saved model without ever training one. The default loader of `ModelRegistry`, used for serving and scoring.
+
+    Takes the same parameters as `construct_ai`.
+
+    Returns:
+    - ai (AI): The loaded model.
+
+    Raises:
+    - ModelNotFound: If the Keras model or its tokenizer artifact, or the exported model, is not on disk, or if `bucketing` does not match how the model was trained. The models have no masking, so bucketed and unbucketed inputs give different predictions.
+    """
+    ai = construct_ai(modelname, cache=cache, metrics=metrics, backend=backend, bucketing=bucketing, execution=execution)
+    if backend != "keras":
+        if ai.runtime is None:
+            raise ModelNotFound(f"No exported {backend} model for {modelname}. Export it with `main.py export` first.")
+    elif ai.model is None:
+        raise ModelNotFound(f"No trained model for {modelname}. Train it with `main.py train` first.")
+    elif ai.tokenizer is None:
+        raise ModelNotFound(f"No tokenizer artifact for {modelname}. Retrain it with `main.py train` first.")
+    if ai.tokenizer is not None and bucketing != ai.trained_bucketing:
+        raise ModelNotFound(f"{modelname} was trained {'with' if ai.trained_bucketing else 'without'} --bucketing and must be served the same way.")
+    return ai
+
+def build_ai(modelname, cache=None, metrics=None, backend="keras", bucketing=False, execution="default"):
+    """
+    Loads a model, training it first if it was never saved or refitting its tokenizer if the artifact is missing. The loader of the GUI's registry.
+
+    Takes the same parameters as `construct_ai`.
+
+    Returns:
+    - ai (AI): The built model.
+    """
+    ai = construct_ai(modelname, cache=cache, metrics=metrics, backend=backend, bucketing=bucketing, execution=execution)
+    ai.build()
+    return ai
+
+def estimate_bytes(ai):
+    """
+    Estimates the memory held by a loaded model and its tokenizer.
+
+    Parameters:
+    - ai (AI): The built model.
+
+    Returns:
+    - size (int): The estimated size in bytes: four bytes per model parameter, or the size of the exported model file, plus about 100 bytes per vocabulary entry.
+    """
+    size = ai.model.count_params() * 4 if ai.model is not None else 0
+    if ai.runtime is not None:
+        size += ai.runtime.nbytes
+    if ai.tokenizer is not None:
+        size += len(ai.tokenizer.word_index) * 100
+    return size
+
+def print_event(event, modelname, info):
+    """
+    Prints a registry event. The default event listener of `ModelRegistry`.
+
+    Parameters:
+    - event (str): "load", "hit" or "evict".
+    - modelname (str): The model concerned.
+    - info (dict): The event details.
+    """
+    if event == "load":
+        print(f"Registry: loaded {modelname} in {info['seconds']:.2f}s (~{info['bytes'] / 2**20:.1f} MB, {info['models']} models, ~{info['total_bytes'] / 2**20:.1f} MB total)")
+    elif event == "evict":
+        print(f"Registry: evicted {modelname} (~{info['bytes'] / 2**20:.1f} MB)")
+
+class ModelRegistry:
+    """
+    Keeps several loaded models and their tokenizers warm, with LRU eviction.
+
+    `get` returns a loaded model, loading it on first use. When the number of models exceeds `capacity` or their estimated memory exceeds `max_bytes`, the least recently used models are evicted. The registry is thread-safe, and concurrent requests for the same model share one load.
+    """
+    def __init__(self, capacity=3, max_bytes=None, loader=load_ai, on_event=print_event, cache=None, metrics=None, backend="keras", bucketing=False, execution="default"):
+        """
+        Initializes an empty registry.
+
+        Parameters:
+        - capacity (int, optional): The maximum number of loaded models. Defaults to 3.
+        - max_bytes (int, optional): The maximum estimated memory of the loaded models. Defaults to None (no limit).
+        - loader (callable, optional): Loads a model by name, taking the `cache`, `metrics`, `backend`, `bucketing` and `execution` keywords. Defaults to `load_ai`.
+        - on_event (callable, optional): Called with (event, modelname, info) on every load, hit and eviction. Defaults to `print_event`.
+        - cache (PredictionCache, optional): The prediction cache passed to the loader and shared by all models, each under its own namespace. Defaults to None.
+        - metrics (Metrics, optional): The metrics registry passed to the loader. Load and eviction counts are recorded in it too. Defaults to None.
+        - backend (str, optional): The inference backend passed to the loader. Defaults to "keras".
+        - bucketing (bool, optional): Whether the loaded models bucket inference batches by length. Defaults to False.
+        - execution (str, optional): The execution mode of the loaded Keras models. Defaults to "default".
+        """
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.on_event = on_event
+        self.cache = cache
+        self.metrics = metrics
+        self.backend = backend
+        self.bucketing = bucketing
+        self.execution = execution
+        self.models = OrderedDict()
+        self.sizes = {}
+        self.lock = threading.Lock()
+        self.loading = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _emit(self, event, modelname, **info):
+        """
+        Reports an event to the listener, if any.
+        """
+        if self.metrics is not None:
+            self.metrics.count("registry_events_total", event=event, model=modelname)
+        if self.on_event is not None:
+            self.on_event(event, modelname, info)
+
+    def get(self, modelname):
+        """
+        Returns a loaded model, loading it if needed.
+
+        Parameters:
+        - modelname (str): "RNN", "LSTM" or "CNN".
+
+        Returns:
+        - ai (AI): The built model.
+        """
+        with self.lock:
+            if modelname in self.models:
+                self.models.move_to_end(modelname)
+                self.hits += 1
+                ai = self.models[modelname]
+                self._emit("hit", modelname)
+                return ai
+            loading = self.loading.setdefault(modelname, threading.Lock())
+        with loading:
+            with self.lock:
+                if modelname in self.models:
+                    self.models.move_to_end(modelname)
+                    self.hits += 1
+                    return self.models[modelname]
+            start = time.perf_counter()
+            ai = self.loader(modelname, cache=self.cache, metrics=self.metrics, backend=self.backend, bucketing=self.bucketing, execution=self.execution)
+            seconds = time.perf_counter() - start
+            size = estimate_bytes(ai)
+            with self.lock:
+                self.models[modelname] = ai
+                self.sizes[modelname] = size
+                self.loads += 1
+                self.loading.pop(modelname, None)
+                self._emit("load", modelname, seconds=seconds, bytes=size, models=len(self.models), total_bytes=sum(self.sizes.values()))
+                self._evict()
+        return ai
+
+    def _evict(self):
+        """
+        Evicts least recently used models until the registry is within its limits. The most recently used model is never evicted. Must be called with the lock held.
+        """
+        while len(self.models) > 1 and (len(self.models) > self.capacity or (self.max_bytes is not None and sum(self.sizes.values()) > self.max_bytes)):
+            modelname, _ = self.models.popitem(last=False)
+            size = self.sizes.pop(modelname)
+            self.evictions += 1
+            self._emit("evict", modelname, bytes=size)
+
+    def evict(self, modelname):
+        """
+        Evicts a model if it is loaded.
+
+        Parameters:
+        - modelname (str): The model to evict.
+        """
+        with self.lock:
+            if modelname in self.models:
+                del self.models[modelname]
+                self.evictions += 1
+                self._emit("evict", modelname, bytes=self.sizes.pop(modelname))
+
+    def stats(self):
+        """
+        Returns the registry counters.
+
+        Returns:
+        - stats (dict): The loaded models in LRU order, their estimated sizes and the hit, load and eviction counts.
+        """
+        with self.lock:
+            return {
+                "models": list(self.models),
+                "bytes": dict(self.sizes),
+                "total_bytes": sum(self.sizes.values()),
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,140 @@
+try:
+    import json
+    import os
+    import shutil
+    import time
+    import tensorflow as tf
+    from os import path
+    from .pipeline import Vectorizer
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+SAVEDMODEL_FORMAT_VERSION = 1
+WARMUP_TEXT = "warm up"
+
+class ServingModule(tf.Module):
+    """
+    A trained model packaged with its preprocessing and thresholding into one graph.
+
+    The `serve` signature takes a batch of raw review strings. Inside the graph they are lowercased, split, looked up in the fitted vocabulary and padded to `maxlen` by the `Vectorizer`, run through the network, and thresholded into labels, so serving needs neither the Python tokenizer nor the Keras model file.
+    """
+    def __init__(self, model, tokenizer, maxlen, padding, truncating, threshold=0.5):
+        """
+        Initializes the module.
+
+        Parameters:
+        - model (keras.Sequential): The trained model.
+        - tokenizer (FastTokenizer): The fitted tokenizer of the model.
+        - maxlen (int): The padded sequence length.
+        - padding (str): 'pre' or 'post'.
+        - truncating (str): 'pre' or 'post'.
+        - threshold (float, optional): The positive-class probability above which a text is labelled "Positive". Defaults to 0.5.
+
+        Raises:
+        - ValueError: If the tokenizer is a `HashingTokenizer`, which has no in-graph equivalent.
+        """
+        super().__init__()
+        self.vectorizer = Vectorizer(tokenizer, maxlen, padding, truncating)
+        self.model = model
+        # Keras layers are not tracked by tf.Module, so their variables, including the dropout seed states, are listed for the SavedModel to save.
+        self.model_variables = list(model.variables)
+        self.threshold = tf.constant(threshold, tf.float32)
+
+    @tf.function(input_signature=[tf.TensorSpec([None], tf.string, name="texts")])
+    def serve(self, texts):
+        """
+        Scores a batch of raw texts.
+
+        Parameters:
+        - texts (tf.Tensor): A 1-D string tensor of any length.
+
+        Returns:
+        - outputs (dict): The positive-class `probabilities` (float32) and the `labels` ("Positive" or "Negative") of the texts.
+        """
+        probabilities = tf.reshape(tf.cast(self.model(self.vectorizer(texts), training=False), tf.float32), [-1])
+        labels = tf.where(probabilities > self.threshold, tf.constant("Positive"), tf.constant("Negative"))
+        return {"probabilities": probabilities, "labels": labels}
+
+def directory_bytes(directory):
+    """
+    Returns the total size in bytes of the files under a directory.
+    """
+    return sum(path.getsize(path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+def save(ai, directory, threshold=0.5):
+    """
+    Saves a trained model with its preprocessing and thresholding as a SavedModel with a single string-in serving signature.
+
+    Parameters:
+    - ai (AI): The model, loaded with the Keras backend and its tokenizer.
+    - directory (str): The SavedModel directory. The metadata is written to the same path with `.json` appended.
+    - threshold (float, optional): The labelling threshold. Defaults to 0.5.
+
+    The SavedModel is written to a temporary directory and moved into place, so a loaded artifact is never partially overwritten.
+    """
+    module = ServingModule(ai.model, ai.tokenizer, ai.maxlen, ai.padding, ai.truncating, threshold)
+    temporary = directory + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    tf.saved_model.save(module, temporary, signatures={"serving_default": module.serve})
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+    metadata = {
+        "format_version": SAVEDMODEL_FORMAT_VERSION,
+        "source_fingerprint": ai._model_fingerprint(),
+        "quantization": "none",
+        "maxlen": ai.maxlen,
+        "threshold": threshold
+    }
+    with open(directory + ".json", "w", encoding="utf8") as f:
+        json.dump(metadata, f)
+
+class SavedModelRuntime:
+    """
+    Runs an exported string-in SavedModel.
+
+    Unlike the other runtimes it takes raw texts rather than padded sequences, through `predict_texts`. Its serving signature is traced when it is saved, and it is run once on a short text at load time, so the first request does not pay for graph initialization.
+    """
+    string_input = True
+
+    def __init__(self, directory):
+        """
+        Loads the SavedModel and its metadata, and warms it up.
+
+        Parameters:
+        - directory (str): The SavedModel directory. The metadata is read from the same path with `.json` appended.
+
+        Raises:
+        - OSError: If the model or its metadata cannot be read.
+        - ValueError: If the metadata has an unsupported format version.
+        """
+        with open(directory + ".json", encoding="utf8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format_version") != SAVEDMODEL_FORMAT_VERSION:
+            raise ValueError(f"unsupported SavedModel format version {self.metadata.get('format_version')}")
+        if not path.isdir(directory):
+            raise FileNotFoundError(f"No SavedModel at {directory}")
+        self.source_fingerprint = self.metadata["source_fingerprint"]
+        self.quantization = self.metadata["quantization"]
+        self.maxlen = self.metadata["maxlen"]
+        self.nbytes = directory_bytes(directory)
+        self.loaded = tf.saved_model.load(directory)
+        self.serve = self.loaded.signatures["serving_default"]
+        start = time.perf_counter()
+        self.predict_texts([WARMUP_TEXT])
+        self.warmup_seconds = time.perf_counter() - start
+
+    def predict_texts(self, texts):
+        """
+        Scores one batch of raw texts.
+
+        Parameters:
+        - texts (list): The texts.
+
+        Returns:
+        - labels (numpy.ndarray): The label of each text, thresholded in the graph.
+        - probabilities (numpy.ndarray): The positive-class probability of each text.
+        """
+        outputs = self.serve(texts=tf.constant(list(texts), tf.string))
+        labels = outputs["labels"].numpy().astype(str)
+        return labels, outputs["probabilities"].numpy()
@@ -0,0 +1,323 @@
+try:
+    import asyncio
+    import json
+    import signal
+    import sys
+    import time
+    from http import HTTPStatus
+    from urllib.parse import parse_qs
+    from .metrics import NULL_METRICS, SIZE_BUCKETS
+    from .registry import ModelNotFound
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+ROUTES = ("/analyze", "/healthz", "/readyz", "/metrics")
+
+class Overloaded(Exception):
+    """
+    Raised when the batcher's queue is full and a request has to be rejected.
+    """
+
+class MicroBatcher:
+    """
+    Coalesces concurrent analysis requests into micro-batches before one model call.
+
+    Requests are queued with their texts. A single worker takes the first waiting request, then keeps collecting until the batch holds `max_batch_size` texts or `max_wait_ms` has passed, and scores the whole batch with one `analyze_batch` call on a worker thread so the event loop stays responsive. The queue is bounded by `max_queue` texts. Beyond that, requests are rejected instead of piling up.
+    """
+    def __init__(self, analyze_batch, max_batch_size=64, max_wait_ms=5, max_queue=4096, metrics=NULL_METRICS, name=""):
+        """
+        Initializes the batcher.
+
+        Parameters:
+        - analyze_batch (callable): Takes a list of texts and returns (labels, probabilities), e.g. `AI.analyze_batch`.
+        - max_batch_size (int, optional): The maximum number of texts per model call. Defaults to 64.
+        - max_wait_ms (float, optional): The longest a batch waits for more requests after its first one. Defaults to 5.
+        - max_queue (int, optional): The maximum number of queued texts before requests are rejected. Defaults to 4096.
+        - metrics (Metrics, optional): Records micro-batch sizes, queue waits and rejections. Defaults to disabled.
+        - name (str, optional): The model label of the recorded metrics. Defaults to "".
+        """
+        self.analyze_batch = analyze_batch
+        self.metrics = metrics
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.queue = asyncio.Queue()
+        self.queued = 0
+        self.batches = 0
+        self.worker = None
+
+    def start(self):
+        """
+        Starts the batching worker on the running event loop.
+        """
+        self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Scores every queued request, then stops the worker.
+        """
+        await self.queue.join()
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, texts):
+        """
+        Queues texts for scoring and waits for their results.
+
+        Parameters:
+        - texts (list): The texts to score.
+
+        Returns:
+        - (labels, probabilities) (tuple): The results for `texts`, in order.
+
+        Raises:
+        - Overloaded: If the queue is full.
+        """
+        if self.queued + len(texts) > self.max_queue:
+            self.metrics.count("rejected_total", model=self.name)
+            raise Overloaded()
+        future = asyncio.get_running_loop().create_future()
+        self.queued += len(texts)
+        self.queue.put_nowait((texts, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """
+        Waits for a first request, then collects more until the batch is full or the wait expires.
+
+        Returns:
+        - requests (list): The collected (texts, future) pairs.
+        """
+        requests = [await self.queue.get()]
+        size = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    async def _run(self):
+        """
+        Scores collected batches until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = await self._collect()
+            texts = [text for request_texts, _, _ in requests for text in request_texts]
+            now = time.perf_counter()
+            for _, _, queued_at in requests:
+                self.metrics.observe("queue_wait_seconds", now - queued_at, model=self.name)
+            self.metrics.observe("microbatch_texts", len(texts), SIZE_BUCKETS, model=self.name)
+            try:
+                labels, probabilities = await loop.run_in_executor(None, self.analyze_batch, texts)
+            except Exception as e:
+                for _, future, _ in requests:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                start = 0
+                for request_texts, future, _ in requests:
+                    end = start + len(request_texts)
+                    if not future.done():
+                        future.set_result((labels[start:end], probabilities[start:end]))
+                    start = end
+            self.batches += 1
+            self.queued -= len(texts)
+            for _ in requests:
+                self.queue.task_done()
+
+class InferenceServer:
+    """
+    A minimal asyncio HTTP/1.1 server that scores reviews with models from a `ModelRegistry`.
+
+    Endpoints:
+    - POST /analyze: Scores {"text": "..."} or {"texts": ["...", ...]}. An optional "model" key, or a ?model= query parameter, picks the model. The default model is used otherwise. A model that was never trained or exported answers 404.
+    - GET /healthz: Liveness, 200 while the process is serving.
+    - GET /readyz: Readiness, 200 once the default model is loaded and until shutdown starts.
+    - GET /metrics: The metrics registry in the Prometheus text format, or as a JSON snapshot with ?format=json.
+
+    Requests are coalesced into micro-batches by one `MicroBatcher` per model. When a batcher's queue is full the server answers 503 with a Retry-After header. On SIGINT or SIGTERM it stops accepting connections, reports not ready, finishes queued work and exits.
+    """
+    def __init__(self, registry, modelname, models=("RNN", "LSTM", "CNN"), host="127.0.0.1", port=8000, max_batch_size=64, max_wait_ms=5, max_queue=4096):
+        """
+        Initializes the server.
+
+        Parameters:
+        - registry (ModelRegistry): The registry that keeps the served models warm.
+        - modelname (str): The default model, loaded before the server reports ready.
+        - models (tuple, optional): The models clients may select. Defaults to ("RNN", "LSTM", "CNN").
+        - host (str, optional): The interface to bind. Defaults to "127.0.0.1".
+        - port (int, optional): The port to bind. Defaults to 8000.
+        - max_batch_size (int, optional): The maximum number of texts per model call. Defaults to 64.
+        - max_wait_ms (float, optional): The longest a batch waits for more requests. Defaults to 5.
+        - max_queue (int, optional): The maximum number of queued texts per model before 503 responses. Defaults to 4096.
+        """
+        self.registry = registry
+        self.metrics = registry.metrics if registry.metrics is not None else NULL_METRICS
+        self.modelname = modelname
+        self.host = host
+        self.port = port
+        self.batchers = {
+            name: MicroBatcher(lambda texts, name=name: registry.get(name).analyze_batch(texts, batch_size=max_batch_size), max_batch_size, max_wait_ms, max_queue, self.metrics, name)
+            for name in models
+        }
+        self.ready = False
+        self.connections = set()
+
+    async def _respond(self, writer, status, body, headers=None):
+        """
+        Writes a JSON or plain-text response.
+
+        Parameters:
+        - writer (asyncio.StreamWriter): The connection.
+        - status (http.HTTPStatus): The response status.
+        - body (dict or str): The JSON body, or a plain-text body.
+        - headers (dict, optional): Extra response headers. Defaults to None.
+        """
+        if isinstance(body, str):
+            payload, content_type = body.encode("utf8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            payload, content_type = json.dumps(body).encode("utf8"), "application/json"
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}", f"Content-Length: {len(payload)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    async def _analyze(self, body, query):
+        """
+        Handles a POST /analyze body.
+
+        Parameters:
+        - body (bytes): The request body.
+        - query (dict): The parsed query parameters.
+
+        Returns:
+        - (status, response) (tuple): The HTTP status and JSON response.
+        """
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "body must be JSON"}
+        single = isinstance(payload, dict) and isinstance(payload.get("text"), str)
+        texts = [payload["text"]] if single else payload.get("texts") if isinstance(payload, dict) else None
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return HTTPStatus.BAD_REQUEST, {"error": "expected {\"text\": str} or {\"texts\": [str, ...]}"}
+        modelname = payload.get("model") or query.get("model", [self.modelname])[0]
+        if not isinstance(modelname, str):
+            return HTTPStatus.BAD_REQUEST, {"error": "model must be a string"}
+        batcher = self.batchers.get(modelname)
+        if batcher is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"unknown model {modelname}"}
+        if not texts:
+            return HTTPStatus.OK, {"results": []}
+        if len(texts) > batcher.max_queue:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": f"at most {batcher.max_queue} texts per request"}
+        labels, probabilities = await batcher.submit(texts)
+        results = [{"label": str(label), "probability": float(probability)} for label, probability in zip(labels, probabilities)]
+        return HTTPStatus.OK, results[0] if single else {"results": results}
+
+    async def _handle(self, reader, writer):
+        """
+        Serves one keep-alive connection.
+
+        Parameters:
+        - reader (asyncio.StreamReader): The connection's reader.
+        - writer (asyncio.StreamWriter): The connection's writer.
+        """
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"}, {"Connection": "close"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+                path, _, querystring = target.partition("?")
+                query = parse_qs(querystring)
+                extra = {}
+                if path == "/healthz" and method == "GET":
+                    status, response = HTTPStatus.OK, {"status": "ok"}
+                elif path == "/readyz" and method == "GET":
+                    status = HTTPStatus.OK if self.ready else HTTPStatus.SERVICE_UNAVAILABLE
+                    response = {"ready": self.ready, "model": self.modelname, "models": self.registry.stats()["models"]}
+                elif path == "/metrics" and method == "GET":
+                    status = HTTPStatus.OK
+                    response = self.metrics.snapshot() if query.get("format") == ["json"] else self.metrics.to_prometheus()
+                elif path == "/analyze" and method == "POST":
+                    if not self.ready:
+                        status, response = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "not ready"}
+                    else:
+                        try:
+                            status, response = await self._analyze(body, query)
+                        except Overloaded:
+                            status, response, extra = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "overloaded"}, {"Retry-After": "1"}
+                        except ModelNotFound as e:
+                            status, response = HTTPStatus.NOT_FOUND, {"error": str(e)}
+                        except Exception as e:
+                            status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                else:
+                    status, response = HTTPStatus.NOT_FOUND, {"error": "not found"}
+                close = headers.get("connection", "").lower() == "close" or version.strip() == "HTTP/1.0" or not self.ready
+                if close:
+                    extra["Connection"] = "close"
+                self.metrics.count("http_requests_total", path=path if path in ROUTES else "other", status=status.value)
+                await self._respond(writer, status, response, extra)
+                if close:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def serve(self):
+        """
+        Serves until SIGINT or SIGTERM, then shuts down gracefully.
+        """
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(stop.set))
+        for batcher in self.batchers.values():
+            batcher.start()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        await loop.run_in_executor(None, self.registry.get, self.modelname)
+        self.ready = True
+        print(f"Serving {self.modelname} on http://{self.host}:{self.port}", file=sys.stderr, flush=True)
+        await stop.wait()
+
+        print("Shutting down", file=sys.stderr, flush=True)
+        self.ready = False
+        server.close()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        for writer in list(self.connections):
+            writer.close()
+        await server.wait_closed()
@@ -2,8 +2,20 @@ try:
     import numpy as np
     import tensorflow as tf
     import keras
-    from os import path
+    import json
+    import re
+    import time
+    from os import path, makedirs, cpu_count, listdir
     import tensorflow_datasets as tfds
+    from .tokenizer import FastTokenizer, HashingTokenizer
+    from .datacache import DataCache
+    from .pipeline import Vectorizer, load_text_split, iter_texts, make_dataset, make_bucketed_dataset
+    from .bucketing import bucket_bounds
+    from .classifier import Classifier, MAXLEN, PADDING, TRUNCATING, TOKENIZER_FORMAT_VERSION
+    from .tflite import TFLiteRuntime
+    from .savedmodel import SavedModelRuntime
+    from .checkpoint import TrainingCheckpoint, ResumableEarlyStopping
+    from .execution import resolve, uses_xla, policy_scope, with_execution
 except ModuleNotFoundError as e:
     print(f"Couldn't import modules: {e}")
     exit(1)
@@ -11,42 +23,167 @@ except ModuleNotFoundError as e:
 if not tf.__version__.startswith('2'):
     raise ValueError('This code requires TensorFlow V2.x')
 
-class AI:
+NUM_WORDS = 10000
+OOV_TOKEN = '<OOV>'
+BATCH_SIZE = 32
+SHUFFLE_BUFFER = 10000
+EPOCHS = 10
+REPLAY_EVAL_SAMPLES = 2000
+
+class AI(Classifier):
     """
     The AI class is responsible for loading and processing the IMDb dataset
     and building various neural network models for text classification using TensorFlow and Keras.
     """
-    def __init__(self, modelname = ""):
+    backends = ("keras", "tflite", "numpy", "savedmodel")
+
+    def __init__(self, modelname = "", streaming = False, cache = None, metrics = None, backend = "keras", load = True, bucketing = False, execution = "default", hashing = False):
         """
-        Initializes the object by calling the `load_imdb_data` method.
+        Initializes the object by loading the saved model and its tokenizer artifact.
 
-        This method is called when an instance of the class is created. It loads the IMDB dataset for sentiment analysis.
+        This method is called when an instance of the class is created. If a saved model exists in the `models` directory it is loaded together with the tokenizer artifact saved next to it, so the model is ready to serve without touching the IMDB dataset.
+        With the "tflite", "numpy" and "savedmodel" backends the model exported by `main.py export` is loaded instead of the Keras model, and it can only be used for inference. The "savedmodel" artifact tokenizes in its own graph, so it is served without the tokenizer artifact or the Keras model file.
+
+        Parameters:
+        - modelname (str, optional): "RNN", "LSTM" or "CNN", or a saved version such as "RNN.v3", see `Classifier`. Defaults to "".
+        - streaming (bool, optional): Whether `build` trains from a streaming tf.data pipeline instead of fully materialized arrays. Defaults to False.
+        - cache (PredictionCache, optional): A prediction cache consulted before the model, shared with other models or not. Defaults to None.
+        - metrics (Metrics, optional): Records per-stage timers, histograms and counters of the inference path. Defaults to None (disabled).
+        - backend (str, optional): "keras", "tflite", "numpy" or "savedmodel". Defaults to "keras".
+        - load (bool, optional): Whether to load the saved Keras model. Pass False to train from scratch with `train`. Defaults to True.
+        - bucketing (bool, optional): Whether training and inference batches are grouped by length and padded only to their bucket's length. Not available with `streaming`, the "tflite" backend, whose input length is fixed, or the "savedmodel" backend, which pads in its graph. Defaults to False.
+        - execution (str, optional): How the Keras model runs when training and predicting: "default", "xla" (XLA-compiled steps), "bf16" (bfloat16 computation with float32 weights, where the CPU supports it) or "xla_bf16". Models are always saved in float32. Defaults to "default".
+        - hashing (bool, optional): Whether a model trained from scratch maps words to indices with a `HashingTokenizer` instead of a vocabulary fitted on the training set. A loaded model uses the kind of tokenizer it was saved with. Not available with `streaming`. Defaults to False.
         """
-        self.modelname = modelname
-        self.modelpath = path.join(path.dirname(__file__), 'models')
+        if bucketing and (streaming or backend in ("tflite", "savedmodel")):
+            raise ValueError("Bucketing needs the padded arrays and a model that accepts any input length")
+        if execution != "default" and backend != "keras":
+            raise ValueError("Execution modes apply to the keras backend only")
+        if hashing and streaming:
+            raise ValueError("The streaming pipeline needs a fitted vocabulary")
+        self.execution = resolve(execution)
+        self.hashing = hashing
+        super().__init__(modelname, cache, metrics, backend, bucketing)
+        self.streaming = streaming
+        self.history = None
+        if backend == "tflite":
+            self.load_runtime(TFLiteRuntime, self.tflitefile)
+        elif backend == "savedmodel":
+            self.load_runtime(SavedModelRuntime, self.savedmodelfile)
+        if backend != "keras" or not load:
+            return
         try:
-            self.model = keras.models.load_model(self.modelpath + "/" + self.modelname + ".keras")
+            self.model = keras.models.load_model(self.modelfile)
         except:
             print("Couldn't locally load model. Building instead.")
             self.model = None
+        if self.model is not None:
+            try:
+                self.load_tokenizer()
+            except (OSError, ValueError) as e:
+                print(f"Couldn't load tokenizer artifact: {e}. Refitting from dataset instead.")
+            else:
+                self.hashing = isinstance(self.tokenizer, HashingTokenizer)
+            if self.execution != "default":
+                self.model = with_execution(self.model, self.execution)
             
     def build(self):
         """
         Builds the model.
 
-        This method is called when the user selects the "Build" button. It builds the model using the `build_rnn_model`, `build_lstm_model`, and `build_cnn_model` methods.
+        This method is called when the user selects the "Build" button. If the model and its tokenizer were both loaded from disk it returns immediately. If only the model was loaded the tokenizer is refitted on the IMDB dataset and saved next to the model. Otherwise the model is built using the `buildRNN_model`, `buildLSTM_model`, and `buildCNN_model` methods.
+        Exported backends cannot be trained, so with them it raises ValueError if nothing was loaded.
         """
-        self.load_imdb_data()
+        if self.backend != "keras":
+            return super().build()
+        if self.model is not None and self.tokenizer is not None:
+            return
+        if self.streaming:
+            self.load_imdb_stream()
+        else:
+            self.load_imdb_data()
         if self.model != None:
+          self.save_tokenizer()
           return
+        self.train()
+
+    def train(self, resume=False):
+        """
+        Trains the model named by `modelname` from scratch on the loaded data and saves it.
+
+        Dispatches to `buildRNN_model`, `buildLSTM_model` or `buildCNN_model`. The data must already be loaded with `load_imdb_data` or `load_imdb_stream`. The Keras training history is kept in `history`.
+
+        Parameters:
+        - resume (bool, optional): Whether to continue an interrupted run from its last completed epoch, if a matching checkpoint exists. Defaults to False.
+        """
         if self.modelname == "RNN":
-            self.buildRNN_model()
+            self.buildRNN_model(resume)
         elif self.modelname == "LSTM":
-            self.buildLSTM_model()
+            self.buildLSTM_model(resume)
         elif self.modelname == "CNN":
-            self.buildCNN_model()
+            self.buildCNN_model(resume)
+        else:
+            raise ValueError(f"Unknown model {self.modelname}")
+
+    def checkpointdir(self):
+        """
+        Returns the directory training checkpoints are written to, `models/checkpoints`.
+        """
+        return path.join(self.modelpath, 'checkpoints')
+
+    def _train(self, model, resume=False, epochs=EPOCHS):
+        """
+        Trains a compiled model with early stopping and per-epoch checkpoints, then saves it.
+
+        After every epoch the model with its optimizer state, the early-stopping state and the history are saved to `checkpointdir()` by `TrainingCheckpoint`, together with the model of the best epoch so far. With `resume`, a checkpoint saved with the same model, epochs and data settings replaces `model`, and training continues from the epoch after it, so the run ends as an uninterrupted one would. Once the trained model is saved, the resumable state is removed.
+
+        Parameters:
+        - model (keras.Sequential): The compiled, untrained model.
+        - resume (bool, optional): Whether to resume from a matching checkpoint. Defaults to False.
+        - epochs (int, optional): The maximum number of epochs of the whole run. Defaults to 10.
+        """
+        config = {"model": self.modelname, "epochs": epochs, "streaming": self.streaming, "bucketing": self.bucketing, "execution": self.execution, "hashing": self.hashing, "data": path.basename(self.data_cache().directory)}
+        checkpoint = TrainingCheckpoint(self.checkpointdir(), self.modelname, config)
+        state = None
+        if resume:
+            restored, state = checkpoint.restore()
+            if restored is None:
+                print(f"No checkpoint of {self.modelname} to resume. Training from scratch.")
+            else:
+                print(f"Resuming {self.modelname} after epoch {state['epoch']}.")
+                model = restored
+        early_stop = ResumableEarlyStopping(state["early_stopping"] if state else None, monitor='val_loss', patience=3)
+        checkpoint.early_stopping = early_stop
+        initial_epoch = state["epoch"] if state else 0
+        if state and state["early_stopping"]["stopped"]:
+            epochs = initial_epoch
+        self.history = model.fit(epochs=epochs, initial_epoch=initial_epoch, callbacks=[early_stop, checkpoint], **self._fit_data())
+        self.history.history = checkpoint.history
+        self.model = model
+        self.save_model()
+        checkpoint.clear()
+
+    def data_cache(self):
+        """
+        Returns the cache entry of the tokenized IMDB data for the current preprocessing settings.
+
+        Returns:
+        - cache (DataCache): The cache entry under `models/cache`.
+        """
+        return DataCache(path.join(self.modelpath, 'cache'), 'imdb_reviews', NUM_WORDS, OOV_TOKEN, self.maxlen, self.padding, self.truncating, self.hashing)
+
+    def new_tokenizer(self):
+        """
+        Returns a new tokenizer of the kind the model uses.
+
+        Returns:
+        - tokenizer (FastTokenizer or HashingTokenizer): A `HashingTokenizer` into `NUM_WORDS` indices when `hashing` is set, which needs no fitting. Otherwise an unfitted `FastTokenizer` capped at `NUM_WORDS` words.
+        """
+        if self.hashing:
+            return HashingTokenizer(num_words=NUM_WORDS)
+        return FastTokenizer(num_words=NUM_WORDS, oov_token=OOV_TOKEN)
 
-    def load_imdb_data(self):
+    def load_imdb_data(self, use_cache=True):
         """
         Loads the IMDB dataset for sentiment analysis.
 
@@ -54,7 +191,19 @@ class AI:
         labeled as positive or negative. The dataset is split into training and
         testing sets. The function then tokenizes and pads the training and
         testing data.
+
+        The padded arrays, the labels and the tokenizer are cached on disk. Later calls with the same preprocessing settings map the cached arrays into memory instead of tokenizing again.
+
+        Parameters:
+        - use_cache (bool, optional): Whether to read and write the on-disk cache. Defaults to True.
         """
+        cache = self.data_cache()
+        if use_cache and cache.exists():
+            self.tokenizer = cache.load_tokenizer()
+            self.train_padded, self.train_labels = cache.load_split('train')
+            self.test_padded, self.test_labels = cache.load_split('test')
+            return
+
         (train_data, test_data), _ = tfds.load(
             'imdb_reviews',
             split=[tfds.Split.TRAIN, tfds.Split.TEST],
@@ -64,6 +213,49 @@ class AI:
         )
 
         self._tokenize_and_pad_data(train_data, test_data)
+        if use_cache:
+            cache.save_split('train', self.train_padded, self.train_labels)
+            cache.save_split('test', self.test_padded, self.test_labels)
+            cache.save_tokenizer(self.tokenizer)
+
+    def load_imdb_stream(self, batch_size=BATCH_SIZE, shuffle_buffer=SHUFFLE_BUFFER):
+        """
+        Loads the IMDB dataset as streaming training and validation pipelines.
+
+        The tokenizer is taken from the model artifact or the data cache when available. Otherwise it is fitted in one streaming pass over the training texts. Reviews are then vectorized inside the tf.data graph, shuffled through a bounded buffer, batched and prefetched. Stores the pipelines as instance variables (self.train_dataset, self.test_dataset).
+
+        Parameters:
+        - batch_size (int, optional): The batch size. Defaults to 32.
+        - shuffle_buffer (int, optional): The number of training reviews held in the shuffle buffer. Defaults to 10000.
+        """
+        cache = self.data_cache()
+        if self.tokenizer is None:
+            if path.exists(cache.tokenizerfile):
+                self.tokenizer = cache.load_tokenizer()
+            else:
+                self.tokenizer = self.new_tokenizer()
+                self.tokenizer.fit_on_texts(iter_texts(load_text_split('train')), workers=cpu_count() or 1)
+                cache.save_tokenizer(self.tokenizer)
+        vectorizer = Vectorizer(self.tokenizer, self.maxlen, self.padding, self.truncating)
+        self.train_dataset = make_dataset(load_text_split('train', shuffle_files=True), vectorizer, batch_size, shuffle_buffer)
+        self.test_dataset = make_dataset(load_text_split('test'), vectorizer, batch_size)
+
+    def _fit_data(self):
+        """
+        Returns the training and validation inputs for `model.fit`.
+
+        Returns:
+        - data (dict): The streaming pipelines when `streaming` is set, length-bucketed pipelines over the padded arrays when `bucketing` is set, otherwise the padded arrays and labels.
+        """
+        if self.streaming:
+            return {'x': self.train_dataset, 'validation_data': self.test_dataset}
+        if self.bucketing:
+            bounds = bucket_bounds(self.maxlen)
+            return {
+                'x': make_bucketed_dataset(self.train_padded, self.train_labels, BATCH_SIZE, bounds, self.padding, shuffle=True),
+                'validation_data': make_bucketed_dataset(self.test_padded, self.test_labels, BATCH_SIZE, bounds, self.padding)
+            }
+        return {'x': self.train_padded, 'y': self.train_labels, 'validation_data': (self.test_padded, self.test_labels)}
 
     def _tokenize_and_pad_data(self, train_data, test_data):
         """
@@ -73,27 +265,99 @@ class AI:
         - train_data (list): A list of tuples containing the training sentences and labels.
         - test_data (list): A list of tuples containing the testing sentences and labels.
         
-        Uses Tokenizer from Keras to fit on the training sentences.
-        Converts sentences to sequences and pads them to a maximum length of 100.
+        Uses FastTokenizer, which matches the Keras Tokenizer, to fit on the training sentences in parallel across processes. With `hashing` the HashingTokenizer is used instead, and there is no fitting pass.
+        Converts sentences straight into sequences padded to a maximum length of 100.
         Stores the padded sequences and labels as instance variables (self.train_padded, self.test_padded, self.train_labels, self.test_labels).
         """
-        self.tokenizer = tf.keras.preprocessing.text.Tokenizer(num_words=10000, oov_token='<OOV>')
+        self.tokenizer = self.new_tokenizer()
         train_sentences, train_labels = zip(*[(sent.numpy().decode('utf8'), label.numpy()) for sent, label in train_data])
-        self.tokenizer.fit_on_texts(train_sentences)
-        train_sequences = self.tokenizer.texts_to_sequences(train_sentences)
-        self.train_padded = keras.preprocessing.sequence.pad_sequences(train_sequences, maxlen=100, padding='post', truncating='post')
+        if not self.hashing:
+            self.tokenizer.fit_on_texts(train_sentences, workers=cpu_count() or 1)
+        self.train_padded = self.tokenizer.texts_to_padded(train_sentences, maxlen=self.maxlen, padding=self.padding, truncating=self.truncating)
 
         test_sentences, test_labels = zip(*[(sent.numpy().decode('utf8'), label.numpy()) for sent, label in test_data])
-        test_sequences = self.tokenizer.texts_to_sequences(test_sentences)
-        self.test_padded = keras.preprocessing.sequence.pad_sequences(test_sequences, maxlen=100, padding='post', truncating='post')
+        self.test_padded = self.tokenizer.texts_to_padded(test_sentences, maxlen=self.maxlen, padding=self.padding, truncating=self.truncating)
 
         self.train_labels = np.array(train_labels)
         self.test_labels = np.array(test_labels)
 
-    def buildRNN_model(self):
+    def create_model(self):
+        """
+        Creates an untrained, compiled model of the architecture named by `modelname`.
+
+        Returns:
+        - model (keras.Sequential): The compiled model.
+        """
+        if self.modelname == "RNN":
+            return self.createRNN_model()
+        elif self.modelname == "LSTM":
+            return self.createLSTM_model()
+        elif self.modelname == "CNN":
+            return self.createCNN_model()
+        raise ValueError(f"Unknown model {self.modelname}")
+
+    def createRNN_model(self):
+        """
+        Creates the untrained, compiled RNN model used by `buildRNN_model`.
+
+        Returns:
+        - model (keras.Sequential): The compiled RNN model.
+        """
+        with policy_scope(self.execution):
+            model = keras.Sequential([
+                keras.layers.Embedding(10000, 32),
+                keras.layers.Dropout(0.5),
+                keras.layers.SimpleRNN(32, kernel_regularizer=keras.regularizers.l2(0.001)),
+                keras.layers.Dense(1, activation='sigmoid', dtype='float32')
+            ])
+
+        model.compile(loss="binary_crossentropy", optimizer="adam", metrics=["accuracy"], jit_compile=uses_xla(self.execution))
+        return model
+
+    def createLSTM_model(self):
+        """
+        Creates the untrained, compiled LSTM model used by `buildLSTM_model`.
+
+        Returns:
+        - model (keras.Sequential): The compiled LSTM model.
+        """
+        with policy_scope(self.execution):
+            model = keras.models.Sequential([
+                keras.layers.Embedding(10000, 32),
+                keras.layers.Bidirectional(keras.layers.LSTM(32, dropout=0.5, recurrent_dropout=0.5, kernel_regularizer=keras.regularizers.l2(0.001))),
+                keras.layers.Dense(1, activation='sigmoid', dtype='float32')
+            ])
+
+        model.compile(loss="binary_crossentropy", optimizer="adam", metrics=["accuracy"], jit_compile=uses_xla(self.execution))
+        return model
+
+    def createCNN_model(self):
+        """
+        Creates the untrained, compiled CNN model used by `buildCNN_model`.
+
+        Returns:
+        - model (keras.Sequential): The compiled CNN model.
+        """
+        with policy_scope(self.execution):
+            model = keras.Sequential([
+                keras.layers.Embedding(10000, 32),
+                keras.layers.Conv1D(32, 7, activation='relu'),
+                keras.layers.MaxPooling1D(5),
+                keras.layers.Bidirectional(keras.layers.LSTM(32, return_sequences=True, dropout=0.5, recurrent_dropout=0.5, kernel_regularizer=keras.regularizers.l2(0.001))),
+                keras.layers.Bidirectional(keras.layers.LSTM(32, dropout=0.5, recurrent_dropout=0.5, kernel_regularizer=keras.regularizers.l2(0.001))),
+                keras.layers.Dense(1, activation='sigmoid', dtype='float32')
+            ])
+
+        model.compile(loss="binary_crossentropy", optimizer="rmsprop", metrics=["accuracy"], jit_compile=uses_xla(self.execution))
+        return model
+
+    def buildRNN_model(self, resume=False):
         """
         Builds a simple RNN model for binary classification.
 
+        Parameters:
+        - resume (bool, optional): Whether to continue an interrupted run from its last checkpoint. Defaults to False.
+
         Returns:
         - model (keras.Sequential): The compiled RNN model.
 
@@ -104,26 +368,18 @@ class AI:
         - Dense layer: Applies a dense layer with a single unit and sigmoid activation function.
 
         The model is compiled with binary cross-entropy loss, Adam optimizer, and accuracy metric.
-        The model is trained for 10 epochs with early stopping based on the validation loss.
+        The model is trained for 10 epochs with early stopping based on the validation loss, checkpointed every epoch by `_train`.
         The trained model is returned.
         """
-        model = keras.Sequential([
-            keras.layers.Embedding(10000, 32),
-            keras.layers.Dropout(0.5),
-            keras.layers.SimpleRNN(32, kernel_regularizer=keras.regularizers.l2(0.001)),
-            keras.layers.Dense(1, activation='sigmoid')
-        ])
-
-        model.compile(loss="binary_crossentropy", optimizer="adam", metrics=["accuracy"])
-        early_stop = keras.callbacks.EarlyStopping(monitor='val_loss', patience=3)
-        model.fit(self.train_padded, self.train_labels, epochs=10, validation_data=(self.test_padded, self.test_labels), callbacks=[early_stop])
-        self.model = model
-        keras.models.save_model(self.model, self.modelpath + "/RNN.keras")
+        self._train(self.createRNN_model(), resume)
 
-    def buildLSTM_model(self):
+    def buildLSTM_model(self, resume=False):
         """
         Builds an LSTM model for binary classification.
 
+        Parameters:
+        - resume (bool, optional): Whether to continue an interrupted run from its last checkpoint. Defaults to False.
+
         Returns:
         - model (keras.Sequential): The compiled LSTM model.
 
@@ -133,25 +389,18 @@ class AI:
         - Dense layer: Applies a dense layer with a single unit and sigmoid activation function.
 
         The model is compiled with binary cross-entropy loss, Adam optimizer, and accuracy metric.
-        The model is trained for 10 epochs with early stopping based on the validation loss.
+        The model is trained for 10 epochs with early stopping based on the validation loss, checkpointed every epoch by `_train`.
         The trained model is returned.
         """
-        model = keras.models.Sequential([
-            keras.layers.Embedding(10000, 32),
-            keras.layers.Bidirectional(keras.layers.LSTM(32, dropout=0.5, recurrent_dropout=0.5, kernel_regularizer=keras.regularizers.l2(0.001))),
-            keras.layers.Dense(1, activation='sigmoid')
-        ])
-
-        model.compile(loss="binary_crossentropy", optimizer="adam", metrics=["accuracy"])
-        early_stop = keras.callbacks.EarlyStopping(monitor='val_loss', patience=3)
-        model.fit(self.train_padded, self.train_labels, epochs=10, validation_data=(self.test_padded, self.test_labels), callbacks=[early_stop])
-        self.model = model
-        keras.models.save_model(self.model, self.modelpath + "\\LSTM")
+        self._train(self.createLSTM_model(), resume)
 
-    def buildCNN_model(self):
+    def buildCNN_model(self, resume=False):
         """
         Builds a CNN model for binary classification.
 
+        Parameters:
+        - resume (bool, optional): Whether to continue an interrupted run from its last checkpoint. Defaults to False.
+
         Returns:
         - model (keras.Sequential): The compiled CNN model.
 
@@ -164,42 +413,162 @@ class AI:
         - Dense layer: Applies a dense layer with a single unit and sigmoid activation function.
 
         The model is compiled with binary cross-entropy loss, RMSprop optimizer, and accuracy metric.
-        The model is trained for 10 epochs with early stopping based on the validation loss.
-        The trained model is saved to "best_model.h5" if it achieves the best validation loss.
+        The model is trained for 10 epochs with early stopping based on the validation loss, checkpointed every epoch by `_train`.
+        The final model and its tokenizer artifact are saved to the `models` directory.
         The trained model is returned.
         """
-        model = keras.Sequential([
-            keras.layers.Embedding(10000, 32),
-            keras.layers.Conv1D(32, 7, activation='relu'),
-            keras.layers.MaxPooling1D(5),
-            keras.layers.Bidirectional(keras.layers.LSTM(32, return_sequences=True, dropout=0.5, recurrent_dropout=0.5, kernel_regularizer=keras.regularizers.l2(0.001))),
-            keras.layers.Bidirectional(keras.layers.LSTM(32, dropout=0.5, recurrent_dropout=0.5, kernel_regularizer=keras.regularizers.l2(0.001))),
-            keras.layers.Dense(1, activation='sigmoid')
-        ])
-
-        model.compile(loss="binary_crossentropy", optimizer="rmsprop", metrics=["accuracy"])
-        early_stop = keras.callbacks.EarlyStopping(monitor='val_loss', patience=3)
-        checkpoint = keras.callbacks.ModelCheckpoint("best_model.h5", save_best_only=True)
-        model.fit(self.train_padded, self.train_labels, epochs=10, validation_data=(self.test_padded, self.test_labels), callbacks=[early_stop, checkpoint])
-        self.model = model
-        keras.models.save_model(self.model, self.modelpath + "\\CNN")
-        
-    def analyze(self, text):
+        self._train(self.createCNN_model(), resume)
+
+    def _replay_data(self, replay_samples, eval_samples, rng):
         """
-        Analyzes the input text and returns the predicted sentiment.
+        Samples rows of the cached IMDB splits for fine-tuning.
 
         Parameters:
-        - text (str): The input text to analyze.
+        - replay_samples (int): The number of training rows to mix into the new data.
+        - eval_samples (int): The number of test rows to measure forgetting on.
+        - rng (numpy.random.Generator): The random generator.
 
         Returns:
-        - sentiment (str): The predicted sentiment of the input text.
+        - (replay_padded, replay_labels, eval_padded, eval_labels) (tuple): The sampled arrays, or None if the data cache is missing or was built with a different vocabulary than the model's.
 
-        The function uses the trained model to predict the sentiment of the input text.
-        The predicted sentiment is returned as a string.
+        Only the sampled rows are read from the memory-mapped cache.
+        """
+        cache = self.data_cache()
+        if not cache.exists() or cache.load_tokenizer().word_index != self.tokenizer.word_index:
+            return None
+        sampled = []
+        for split, samples in (('train', replay_samples), ('test', eval_samples)):
+            padded, labels = cache.load_split(split)
+            rows = np.sort(rng.choice(len(padded), min(samples, len(padded)), replace=False))
+            sampled += [np.asarray(padded[rows]), np.asarray(labels[rows])]
+        return tuple(sampled)
+
+    def finetune(self, texts, labels, epochs=3, replay=1.0, learning_rate=1e-4, validation_split=0.1, seed=0):
+        """
+        Fine-tunes the loaded model on new labeled texts, starting from its current weights.
+
+        The new texts are tokenized with the model's own tokenizer, so the vocabulary and the embedding stay aligned. A share of them is held out for early stopping. The rest is mixed with a replay buffer of IMDB training reviews sampled from the data cache, so the model does not forget what it learned from them. The model is recompiled with a small learning rate of the same optimizer it was trained with, and the weights of the epoch with the lowest validation loss are kept. Call `save_version` to save the result.
+
+        Parameters:
+        - texts (list): The new texts.
+        - labels (list): Their labels, 1 for positive and 0 for negative.
+        - epochs (int, optional): The maximum number of epochs. Defaults to 3.
+        - replay (float, optional): The number of replayed IMDB reviews per new text, 0 to train on the new data only. Defaults to 1.0.
+        - learning_rate (float, optional): The learning rate. Defaults to 1e-4.
+        - validation_split (float, optional): The share of the new texts held out for early stopping and the report. Defaults to 0.1.
+        - seed (int, optional): The seed of the split, the replay sample and the shuffling. Defaults to 0.
+
+        Returns:
+        - report (dict): The sample counts, the epochs run, the training time, and the accuracy on the held-out new texts (`new_accuracy_*`) and on a sample of the IMDB test split (`imdb_accuracy_*`) before and after fine-tuning.
+
+        Raises:
+        - ValueError: If no Keras model is loaded, the model trains from a stream, or the data is too small to hold out a validation set.
+        """
+        if self.backend != "keras" or self.model is None or self.tokenizer is None:
+            raise ValueError("Fine-tuning needs a loaded Keras model and tokenizer. Train one with `main.py train` first.")
+        if self.streaming:
+            raise ValueError("Fine-tuning needs the padded arrays, not a stream")
+        if len(texts) != len(labels):
+            raise ValueError("texts and labels must have the same length")
+        rng = np.random.default_rng(seed)
+        padded = self.tokenizer.texts_to_padded(texts, maxlen=self.maxlen, padding=self.padding, truncating=self.truncating)
+        labels = np.asarray(labels, dtype=np.int64)
+        order = rng.permutation(len(padded))
+        holdout = order[:int(len(order) * validation_split)]
+        train = order[len(holdout):]
+        if len(holdout) == 0 or len(train) == 0:
+            raise ValueError(f"{len(texts)} texts are too few to hold out {validation_split:.0%} for validation")
+        replay_padded = replay_labels = eval_padded = eval_labels = None
+        sampled = self._replay_data(int(len(train) * replay), REPLAY_EVAL_SAMPLES, rng)
+        if sampled is not None:
+            replay_padded, replay_labels, eval_padded, eval_labels = sampled
+        elif replay:
+            print("No data cache matching the model's tokenizer. Fine-tuning on the new data only. Run `main.py train` once to build the cache.")
+
+        def accuracy(x, y):
+            return None if x is None else float(np.mean((self._predict(x, 256) > 0.5) == y))
+
+        report = {
+            "new_samples": len(train),
+            "validation_samples": len(holdout),
+            "replay_samples": 0 if replay_padded is None else len(replay_padded),
+            "new_accuracy_before": accuracy(padded[holdout], labels[holdout]),
+            "imdb_accuracy_before": accuracy(eval_padded, eval_labels)
+        }
+        self.train_padded, self.train_labels = padded[train], labels[train]
+        if report["replay_samples"]:
+            self.train_padded = np.concatenate([self.train_padded, replay_padded])
+            self.train_labels = np.concatenate([self.train_labels, replay_labels])
+        self.test_padded, self.test_labels = padded[holdout], labels[holdout]
+
+        optimizer = type(self.model.optimizer)(learning_rate=learning_rate)
+        self.model.compile(loss="binary_crossentropy", optimizer=optimizer, metrics=["accuracy"], jit_compile=uses_xla(self.execution))
+        early_stop = keras.callbacks.EarlyStopping(monitor='val_loss', patience=1, restore_best_weights=True)
+        start = time.perf_counter()
+        self.history = self.model.fit(epochs=epochs, callbacks=[early_stop], **self._fit_data())
+        report.update(
+            epochs=len(self.history.history["loss"]),
+            seconds=time.perf_counter() - start,
+            new_accuracy_after=accuracy(padded[holdout], labels[holdout]),
+            imdb_accuracy_after=accuracy(eval_padded, eval_labels)
+        )
+        return report
+
+    def save_model(self):
+        """
+        Saves the model and its tokenizer artifact to the `models` directory.
+
+        The model is written to `<modelname>.keras` and the tokenizer is written next to it by `save_tokenizer`, fingerprinted against the saved model file.
+        A model running in another execution mode is saved as its float32, non-XLA copy, so the artifact loads and exports the same way whatever mode it was trained in.
+        """
+        makedirs(self.modelpath, exist_ok=True)
+        keras.models.save_model(self.model if self.execution == "default" else with_execution(self.model, "default"), self.modelfile)
+        self.save_tokenizer()
+
+    def save_tokenizer(self):
+        """
+        Saves the fitted tokenizer as a versioned artifact next to the model.
+
+        The artifact `<modelname>.tokenizer.json` holds the format version, the tokenizer vocabulary, the padding configuration, whether the model was trained with bucketing and the fingerprint of the model file it belongs to.
+        """
+        fingerprint = self._model_fingerprint()
+        self.namespace = self._namespace(fingerprint)
+        artifact = {
+            'format_version': TOKENIZER_FORMAT_VERSION,
+            'model_fingerprint': fingerprint,
+            'maxlen': self.maxlen,
+            'padding': self.padding,
+            'truncating': self.truncating,
+            'bucketing': self.bucketing,
+            'tokenizer': self.tokenizer.to_json()
+        }
+        with open(self.tokenizerfile, 'w', encoding='utf8') as f:
+            json.dump(artifact, f)
+
+    def next_version(self):
+        """
+        Returns the number of the next saved version of the model: one more than the highest `<modelname>.v<N>.keras` in the `models` directory, or 1. Versions are always numbered against the base model, also when a version is loaded.
+        """
+        pattern = re.compile(re.escape(self.modelname) + r"\.v(\d+)\.keras$")
+        versions = [int(match.group(1)) for match in map(pattern.match, listdir(self.modelpath) if path.isdir(self.modelpath) else []) if match]
+        return max(versions, default=0) + 1
+
+    def save_version(self, promote=False):
+        """
+        Saves the model and its tokenizer artifact as a new version, without replacing the served model unless asked to.
+
+        The version is written to `<modelname>.v<N>.keras` and `<modelname>.v<N>.tokenizer.json`, and can be loaded with `AI("<modelname>.v<N>")`. Older versions are kept, so rolling back means copying both files of a version over `<modelname>.keras` and `<modelname>.tokenizer.json`. Afterwards the files point at the new version, or at the default model when promoted.
+
+        Parameters:
+        - promote (bool, optional): Whether to also save it as `<modelname>.keras`, the model loaded by default. Defaults to False.
+
+        Returns:
+        - version (int): The version number.
         """
-        sequences = self.tokenizer.texts_to_sequences([text])
-        padded = keras.preprocessing.sequence.pad_sequences(sequences, maxlen=100, padding='post', truncating='post')
-        if not self.model:
-            raise Exception("Model not initialized. Please call build() or buildCNN_model() first.")
-        sentiment = "Positive" if self.model.predict(padded)[0][0] > 0.5 else "Negative"
-        return sentiment
\ No newline at end of file
+        version = self.next_version()
+        self.use_version(version)
+        self.save_model()
+        if promote:
+            self.use_version(None)
+            self.save_model()
+        return version
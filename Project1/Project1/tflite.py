@@ -0,0 +1,120 @@
+try:
+    import json
+    import threading
+    import numpy as np
+    import tensorflow as tf
+    import keras
+    from os import path, cpu_count
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ModuleNotFoundError:
+    Interpreter = tf.lite.Interpreter
+
+TFLITE_FORMAT_VERSION = 1
+QUANTIZATIONS = ("none", "float16", "int8")
+
+def _inference_layer(layer):
+    """
+    Clones a layer for inference: dropout is removed and recurrent layers are unrolled, so the converted graph has no random ops and no while loops.
+    """
+    if isinstance(layer, keras.layers.Dropout):
+        return keras.layers.Identity(name=layer.name)
+    config = layer.get_config()
+    if isinstance(layer, keras.layers.Bidirectional):
+        for key in ("layer", "backward_layer"):
+            if config.get(key):
+                config[key]["config"].update(dropout=0.0, recurrent_dropout=0.0, unroll=True)
+    elif isinstance(layer, keras.layers.RNN):
+        config.update(dropout=0.0, recurrent_dropout=0.0, unroll=True)
+    return type(layer).from_config(config)
+
+def inference_model(model, maxlen):
+    """
+    Returns a copy of a trained model that can be converted to TFLite.
+
+    Parameters:
+    - model (keras.Sequential): The trained model.
+    - maxlen (int): The length of the padded sequences.
+
+    Returns:
+    - model (keras.Sequential): A model with the same weights, an int32 input of shape (None, maxlen), no dropout and unrolled recurrent layers.
+    """
+    clone = keras.models.clone_model(model, input_tensors=keras.Input((maxlen,), dtype="int32"), clone_function=_inference_layer)
+    clone.set_weights(model.get_weights())
+    return clone
+
+def convert(model, maxlen, quantization="none"):
+    """
+    Converts a trained model to a TFLite flatbuffer.
+
+    Parameters:
+    - model (keras.Sequential): The trained model.
+    - maxlen (int): The length of the padded sequences.
+    - quantization (str, optional): "none", "float16" (float16 weights) or "int8" (int8 weights with dynamic-range activations). Defaults to "none".
+
+    Returns:
+    - content (bytes): The TFLite model.
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization}")
+    converter = tf.lite.TFLiteConverter.from_keras_model(inference_model(model, maxlen))
+    if quantization != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+class TFLiteRuntime:
+    """
+    Runs an exported TFLite model with the `predict_on_batch` interface of a Keras model.
+
+    The metadata saved next to the model records the fingerprint of the Keras model it was exported from, which the tokenizer artifact is checked against. Calls are serialized because a TFLite interpreter is not thread-safe.
+    """
+    def __init__(self, modelfile, num_threads=None):
+        """
+        Loads the model and its metadata.
+
+        Parameters:
+        - modelfile (str): The path of the `.tflite` file. The metadata is read from the same path with `.json` appended.
+        - num_threads (int, optional): The number of interpreter threads. Defaults to the number of CPUs.
+
+        Raises:
+        - OSError: If the model or its metadata cannot be read.
+        - ValueError: If the metadata has an unsupported format version.
+        """
+        with open(modelfile + ".json", encoding="utf8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format_version") != TFLITE_FORMAT_VERSION:
+            raise ValueError(f"unsupported TFLite format version {self.metadata.get('format_version')}")
+        self.source_fingerprint = self.metadata["source_fingerprint"]
+        self.quantization = self.metadata["quantization"]
+        self.nbytes = path.getsize(modelfile)
+        self.interpreter = Interpreter(model_path=modelfile, num_threads=num_threads or cpu_count() or 1)
+        self.input = self.interpreter.get_input_details()[0]["index"]
+        self.output = self.interpreter.get_output_details()[0]["index"]
+        self.shape = None
+        self.lock = threading.Lock()
+
+    def predict_on_batch(self, batch):
+        """
+        Runs the model on one batch of padded sequences.
+
+        Parameters:
+        - batch (numpy.ndarray): The padded sequences.
+
+        Returns:
+        - probabilities (numpy.ndarray): The model output of shape (len(batch), 1).
+        """
+        batch = np.ascontiguousarray(batch, dtype=np.int32)
+        with self.lock:
+            if batch.shape != self.shape:
+                self.interpreter.resize_tensor_input(self.input, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.shape = batch.shape
+            self.interpreter.set_tensor(self.input, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output).copy()
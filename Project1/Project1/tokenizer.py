@@ -0,0 +1,333 @@
+try:
+    import json
+    from collections import Counter, deque
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import islice
+    from operator import itemgetter
+    from zlib import crc32
+    import numpy as np
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+HASH_CACHE_SIZE = 1 << 16
+
+def _count_words(texts, filters, lower, split):
+    """
+    Counts the words of a chunk of texts. Runs in worker processes during a parallel fit.
+
+    Parameters:
+    - texts (list): The texts to count.
+    - filters (str): The characters replaced by the split character.
+    - lower (bool): Whether to lowercase the texts.
+    - split (str): The word separator.
+
+    Returns:
+    - counts (collections.Counter): The word counts in first-occurrence order.
+    """
+    table = str.maketrans({c: split for c in filters})
+    counts = Counter()
+    for text in texts:
+        if lower:
+            text = text.lower()
+        counts.update(w for w in text.translate(table).split(split) if w)
+    return counts
+
+class FastTokenizer:
+    """
+    A drop-in replacement for the Keras `Tokenizer` on the inference and training hot paths.
+
+    It uses the same splitting rules, the same `num_words` cap and the same out-of-vocabulary handling, and produces the same sequences as `Tokenizer.texts_to_sequences` followed by `pad_sequences`. After fitting, the vocabulary is compiled into a single dict that maps each word straight to its final, capped index. A batch of texts is then written into one preallocated padded array.
+
+    Its JSON form is the Keras tokenizer JSON, so artifacts can be read by either class.
+    """
+    def __init__(self, num_words=None, oov_token=None, filters=FILTERS, lower=True, split=' ', document_count=0):
+        """
+        Initializes an unfitted tokenizer.
+
+        Parameters:
+        - num_words (int, optional): Only words with an index below `num_words` are kept. Defaults to None (no cap).
+        - oov_token (str, optional): The token substituted for unknown words, at index 1. Defaults to None (unknown words are dropped).
+        - filters (str, optional): The characters replaced by the split character. Defaults to the Keras filters.
+        - lower (bool, optional): Whether to lowercase the texts. Defaults to True.
+        - split (str, optional): The word separator. Defaults to ' '.
+        - document_count (int, optional): The number of texts fitted so far. Defaults to 0.
+        """
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+        self.document_count = document_count
+        self.word_counts = Counter()
+        self.word_index = {}
+        self._table = str.maketrans({c: split for c in filters})
+        self._compile()
+
+    def _compile(self):
+        """
+        Compiles the word index into the capped lookup used by `texts_to_sequences` and `texts_to_padded`.
+
+        Words with an index at or above `num_words` are mapped to the out-of-vocabulary index, or left out when there is no out-of-vocabulary token.
+        """
+        self.oov_index = self.word_index.get(self.oov_token)
+        if self.num_words:
+            self._lookup = {w: (i if i < self.num_words else self.oov_index) for w, i in self.word_index.items() if i < self.num_words or self.oov_index is not None}
+        else:
+            self._lookup = dict(self.word_index)
+
+    def text_to_words(self, text):
+        """
+        Splits a text into words using the Keras `text_to_word_sequence` rules.
+
+        Parameters:
+        - text (str): The text to split.
+
+        Returns:
+        - words (list): The non-empty words of the text.
+        """
+        if self.lower:
+            text = text.lower()
+        return [w for w in text.translate(self._table).split(self.split) if w]
+
+    def fit_on_texts(self, texts, workers=1, chunk_size=2000):
+        """
+        Builds the vocabulary from an iterable of texts.
+
+        Parameters:
+        - texts (iterable): The texts to fit on. They are consumed in chunks, so a stream never has to be held in memory.
+        - workers (int, optional): The number of processes counting words in parallel. Defaults to 1.
+        - chunk_size (int, optional): The number of texts sent to a worker at a time. Defaults to 2000.
+
+        Words are indexed by descending frequency, ties broken by first occurrence, with index 1 reserved for the out-of-vocabulary token. Chunk counts are merged in input order, so the result does not depend on `workers`.
+        """
+        iterator = iter(texts)
+        chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+        args = (self.filters, self.lower, self.split)
+        first = next(chunks, [])
+        self.document_count += len(first)
+        if workers > 1 and len(first) == chunk_size:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque([executor.submit(_count_words, first, *args)])
+                for chunk in chunks:
+                    self.document_count += len(chunk)
+                    pending.append(executor.submit(_count_words, chunk, *args))
+                    if len(pending) > 2 * workers:
+                        self.word_counts.update(pending.popleft().result())
+                while pending:
+                    self.word_counts.update(pending.popleft().result())
+        else:
+            self.word_counts.update(_count_words(first, *args))
+            for chunk in chunks:
+                self.document_count += len(chunk)
+                self.word_counts.update(_count_words(chunk, *args))
+
+        vocabulary = [] if self.oov_token is None else [self.oov_token]
+        vocabulary.extend(w for w, _ in sorted(self.word_counts.items(), key=itemgetter(1), reverse=True))
+        self.word_index = dict(zip(vocabulary, range(1, len(vocabulary) + 1)))
+        self._compile()
+
+    def _sequence(self, text, maxlen=None, truncating='post'):
+        """
+        Converts one text into its list of word indices.
+
+        Parameters:
+        - text (str): The text to convert.
+        - maxlen (int, optional): When given, only the words that survive truncation to `maxlen` are looked up. Defaults to None.
+        - truncating (str, optional): 'pre' or 'post', the side words are removed from. Defaults to 'post'.
+
+        Returns:
+        - sequence (list): The word indices.
+        """
+        words = self.text_to_words(text)
+        get = self._lookup.get
+        if self.oov_index is not None:
+            # Every word yields exactly one index, so truncating before the lookup is exact.
+            if maxlen is not None and len(words) > maxlen:
+                words = words[:maxlen] if truncating == 'post' else words[-maxlen:]
+            oov = self.oov_index
+            return [get(w, oov) for w in words]
+        sequence = [i for i in map(get, words) if i is not None]
+        if maxlen is not None and len(sequence) > maxlen:
+            sequence = sequence[:maxlen] if truncating == 'post' else sequence[-maxlen:]
+        return sequence
+
+    def texts_to_sequences(self, texts):
+        """
+        Converts texts to lists of word indices.
+
+        Parameters:
+        - texts (iterable): The texts to convert.
+
+        Returns:
+        - sequences (list): One list of word indices per text.
+        """
+        return [self._sequence(text) for text in texts]
+
+    def texts_to_padded(self, texts, maxlen=100, padding='post', truncating='post', dtype=np.int32):
+        """
+        Converts texts straight into a padded array of word indices.
+
+        Parameters:
+        - texts (iterable): The texts to convert.
+        - maxlen (int, optional): The length of each row. Defaults to 100.
+        - padding (str, optional): 'pre' or 'post', the side zeros are added to. Defaults to 'post'.
+        - truncating (str, optional): 'pre' or 'post', the side words are removed from. Defaults to 'post'.
+        - dtype (numpy.dtype, optional): The array type. Defaults to numpy.int32.
+
+        Returns:
+        - padded (numpy.ndarray): An array of shape (len(texts), maxlen), equal to `pad_sequences(texts_to_sequences(texts), ...)`.
+        """
+        sequences = [self._sequence(text, maxlen, truncating) for text in texts]
+        lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+        padded = np.zeros((len(sequences), maxlen), dtype=dtype)
+        positions = np.arange(maxlen)
+        if padding == 'post':
+            mask = positions < lengths[:, None]
+        else:
+            mask = positions >= (maxlen - lengths)[:, None]
+        padded[mask] = np.fromiter((i for sequence in sequences for i in sequence), dtype=dtype, count=int(lengths.sum()))
+        return padded
+
+    def to_json(self):
+        """
+        Serializes the tokenizer to the Keras tokenizer JSON format.
+
+        Returns:
+        - json (str): A string readable by `FastTokenizer.from_json` and by Keras `tokenizer_from_json`.
+        """
+        config = {
+            'num_words': self.num_words,
+            'filters': self.filters,
+            'lower': self.lower,
+            'split': self.split,
+            'char_level': False,
+            'oov_token': self.oov_token,
+            'document_count': self.document_count,
+            'word_counts': json.dumps(self.word_counts),
+            'word_docs': '{}',
+            'index_docs': '{}',
+            'index_word': json.dumps({i: w for w, i in self.word_index.items()}),
+            'word_index': json.dumps(self.word_index)
+        }
+        return json.dumps({'class_name': 'Tokenizer', 'config': config})
+
+    @classmethod
+    def from_json(cls, json_string):
+        """
+        Creates a tokenizer from its Keras tokenizer JSON form.
+
+        Parameters:
+        - json_string (str): The JSON written by `to_json` or by Keras `Tokenizer.to_json`.
+
+        Returns:
+        - tokenizer (FastTokenizer): The fitted tokenizer.
+        """
+        config = json.loads(json_string)['config']
+        if config.get('char_level'):
+            raise ValueError("character-level tokenizers are not supported")
+        tokenizer = cls(num_words=config['num_words'], oov_token=config['oov_token'], filters=config['filters'], lower=config['lower'], split=config['split'], document_count=config.get('document_count', 0))
+        tokenizer.word_counts = Counter(json.loads(config['word_counts']))
+        tokenizer.word_index = json.loads(config['word_index'])
+        tokenizer._compile()
+        return tokenizer
+
+class _Buckets(dict):
+    """
+    The hash bucket of each word seen so far, computed on first lookup. Holds at most `HASH_CACHE_SIZE` words, so the common words skip hashing and memory stays bounded.
+    """
+    def __init__(self, buckets):
+        super().__init__()
+        self.buckets = buckets
+
+    def __missing__(self, word):
+        index = crc32(word.encode('utf8')) % self.buckets + 1
+        if len(self) < HASH_CACHE_SIZE:
+            self[word] = index
+        return index
+
+class HashingTokenizer(FastTokenizer):
+    """
+    A tokenizer that maps words to indices with a stable hash instead of a fitted vocabulary.
+
+    Each word is hashed with CRC-32 into one of `num_words - 1` buckets, at indices 1 to `num_words - 1`, with 0 left for padding. The same word always gets the same index, in every process and Python version, so there is no fitting pass over the corpus and no vocabulary to store or keep in memory. Words that share a bucket share an embedding, which costs some accuracy. There is no out-of-vocabulary token.
+
+    It uses the same splitting rules as `FastTokenizer` and can stand in for it wherever texts are converted in Python. The in-graph `Vectorizer` cannot reproduce the hash, so it does not support it.
+    """
+    def __init__(self, num_words=10000, filters=FILTERS, lower=True, split=' ', document_count=0):
+        """
+        Initializes the tokenizer.
+
+        Parameters:
+        - num_words (int, optional): The embedding size. Words are hashed into indices 1 to `num_words - 1`. Defaults to 10000.
+        - filters (str, optional): The characters replaced by the split character. Defaults to the Keras filters.
+        - lower (bool, optional): Whether to lowercase the texts. Defaults to True.
+        - split (str, optional): The word separator. Defaults to ' '.
+        - document_count (int, optional): Unused, kept for the JSON form. Defaults to 0.
+        """
+        if not num_words or num_words < 2:
+            raise ValueError("num_words must be at least 2")
+        super().__init__(num_words=num_words, filters=filters, lower=lower, split=split, document_count=document_count)
+
+    def _compile(self):
+        self.oov_index = None
+        self._lookup = {}
+        self._buckets = _Buckets(self.num_words - 1)
+
+    def fit_on_texts(self, texts, workers=1, chunk_size=2000):
+        """
+        Does nothing: a hashing tokenizer needs no fitting. Kept so it can stand in for `FastTokenizer`.
+        """
+
+    def _sequence(self, text, maxlen=None, truncating='post'):
+        words = self.text_to_words(text)
+        if maxlen is not None and len(words) > maxlen:
+            words = words[:maxlen] if truncating == 'post' else words[-maxlen:]
+        return list(map(self._buckets.__getitem__, words))
+
+    def to_json(self):
+        """
+        Serializes the tokenizer settings. There is no vocabulary to save.
+
+        Returns:
+        - json (str): A string readable by `tokenizer_from_json`.
+        """
+        config = {
+            'num_words': self.num_words,
+            'filters': self.filters,
+            'lower': self.lower,
+            'split': self.split,
+            'hash': 'crc32'
+        }
+        return json.dumps({'class_name': 'HashingTokenizer', 'config': config})
+
+    @classmethod
+    def from_json(cls, json_string):
+        """
+        Creates a tokenizer from its JSON form.
+
+        Parameters:
+        - json_string (str): The JSON written by `to_json`.
+
+        Returns:
+        - tokenizer (HashingTokenizer): The tokenizer.
+        """
+        config = json.loads(json_string)['config']
+        if config.get('hash') != 'crc32':
+            raise ValueError(f"unsupported hash function {config.get('hash')}")
+        return cls(num_words=config['num_words'], filters=config['filters'], lower=config['lower'], split=config['split'])
+
+def tokenizer_from_json(json_string):
+    """
+    Creates a tokenizer from a saved artifact, whichever class wrote it.
+
+    Parameters:
+    - json_string (str): The JSON written by `FastTokenizer.to_json`, `HashingTokenizer.to_json` or Keras `Tokenizer.to_json`.
+
+    Returns:
+    - tokenizer (FastTokenizer or HashingTokenizer): The tokenizer.
+    """
+    if json.loads(json_string).get('class_name') == 'HashingTokenizer':
+        return HashingTokenizer.from_json(json_string)
+    return FastTokenizer.from_json(json_string)
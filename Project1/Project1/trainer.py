@@ -0,0 +1,155 @@
+try:
+    import multiprocessing
+    import os
+    import time
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+MODELS = ("RNN", "LSTM", "CNN")
+
+def _limit_threads(threads):
+    """
+    Limits the CPU threads of a worker process. Runs before the worker imports TensorFlow, which reads these variables at startup.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(min(2, threads))
+
+def prepare(modelname=MODELS[0], hashing=False):
+    """
+    Tokenizes and pads the IMDB dataset into the data cache, unless it is cached already.
+
+    Parameters:
+    - modelname (str, optional): Any model name. Only the preprocessing settings matter. Defaults to "RNN".
+    - hashing (bool, optional): Whether to prepare the entry of hashed words instead of the fitted vocabulary. Defaults to False.
+
+    Returns:
+    - seconds (float): The time it took.
+    """
+    from .text_classification import AI
+
+    start = time.perf_counter()
+    AI(modelname=modelname, load=False, hashing=hashing).load_imdb_data()
+    return time.perf_counter() - start
+
+def vocabulary_accuracy(modelname):
+    """
+    Measures the accuracy of the saved model on the IMDB test split, if it was trained with a fitted vocabulary. Used as the baseline of a model retrained with hashing, before it is replaced.
+
+    The test split is tokenized with the model's own tokenizer, or read from the data cache if that was built with the same vocabulary. Call it before the workers start, so it never writes to a cache entry they read.
+
+    Parameters:
+    - modelname (str): "RNN", "LSTM" or "CNN".
+
+    Returns:
+    - accuracy (float): The test accuracy, or None if there is no saved model with a fitted vocabulary.
+    """
+    from .text_classification import AI
+    from .export import sample_test_split
+
+    ai = AI(modelname=modelname)
+    if ai.model is None or ai.tokenizer is None or ai.hashing:
+        return None
+    padded, labels = sample_test_split(ai, samples=None)
+    _, accuracy = ai.model.evaluate(padded, labels, batch_size=256, verbose=0)
+    return float(accuracy)
+
+def train_model(modelname, threads=None, bucketing=False, resume=False, execution="default", hashing=False, baseline=None):
+    """
+    Trains one model from scratch on the cached data and saves it. Runs in a worker process.
+
+    Parameters:
+    - modelname (str): "RNN", "LSTM" or "CNN".
+    - threads (int, optional): The intra-op thread count of TensorFlow. Defaults to TensorFlow's choice.
+    - bucketing (bool, optional): Whether to train on length-bucketed batches. Defaults to False.
+    - resume (bool, optional): Whether to continue an interrupted run from its last checkpoint. Defaults to False.
+    - execution (str, optional): The execution mode to train in, see `AI`. Defaults to "default".
+    - hashing (bool, optional): Whether to map words to indices with a `HashingTokenizer` instead of a fitted vocabulary. Defaults to False.
+    - baseline (float, optional): The test accuracy of the model it replaces, from `vocabulary_accuracy`. Reported with `hashing`. Defaults to None.
+
+    Returns:
+    - summary (dict): The wall time, the number of epochs run, and the validation loss and accuracy of the saved (last) epoch and of the best epoch. With `hashing`, also the `baseline` (`vocabulary_accuracy`) and the difference (`accuracy_drift`).
+
+    The padded arrays are memory-mapped from the data cache, so every worker shares the same pages of the OS file cache instead of receiving a pickled copy.
+    """
+    import tensorflow as tf
+    from .text_classification import AI
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+    start = time.perf_counter()
+    ai = AI(modelname=modelname, load=False, bucketing=bucketing, execution=execution, hashing=hashing)
+    ai.load_imdb_data()
+    ai.train(resume)
+    history = ai.history.history
+    best = min(range(len(history["val_loss"])), key=history["val_loss"].__getitem__)
+    summary = {
+        "model": modelname,
+        "seconds": time.perf_counter() - start,
+        "epochs": len(history["loss"]),
+        "val_loss": history["val_loss"][-1],
+        "val_accuracy": history["val_accuracy"][-1],
+        "best_epoch": best + 1,
+        "best_val_loss": history["val_loss"][best],
+        "best_val_accuracy": history["val_accuracy"][best],
+        "execution": ai.execution,
+        "hashing": hashing,
+        "threads": threads,
+        "pid": os.getpid()
+    }
+    if hashing:
+        summary["vocabulary_accuracy"] = baseline
+        summary["accuracy_drift"] = None if baseline is None else summary["val_accuracy"] - baseline
+    return summary
+
+def train_all(models=MODELS, workers=None, bucketing=False, resume=False, execution="default", hashing=(), log=print):
+    """
+    Preprocesses the IMDB dataset once, then trains several models concurrently in separate processes.
+
+    Parameters:
+    - models (tuple, optional): The models to train. Defaults to all three.
+    - workers (int, optional): The number of concurrent training processes. Defaults to one per model.
+    - bucketing (bool, optional): Whether to train on length-bucketed batches. Defaults to False.
+    - resume (bool, optional): Whether each model continues an interrupted run from its last checkpoint. Defaults to False.
+    - execution (str, optional): The execution mode every model trains in. Defaults to "default".
+    - hashing (tuple, optional): The models that map words to indices with a `HashingTokenizer` instead of a fitted vocabulary. Defaults to none.
+    - log (callable, optional): Called with a progress line as each model finishes. Defaults to `print`.
+
+    Returns:
+    - summary (dict): The per-model summaries of `train_model` in the order given, the preprocessing time, the total wall time, the serial time (the sum of the per-model times) and the worker and thread counts.
+
+    The CPUs are split evenly between the workers. Workers are spawned rather than forked, so each starts a fresh TensorFlow runtime with its own thread limits. A model that fails is reported with its error and does not stop the others.
+    """
+    workers = workers or len(models)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    start = time.perf_counter()
+    preprocess_seconds = 0.0
+    for hashed in sorted({modelname in hashing for modelname in models}):
+        preprocess_seconds += prepare(models[0], hashed)
+    baselines = {modelname: vocabulary_accuracy(modelname) for modelname in models if modelname in hashing}
+    log(f"Preprocessed in {preprocess_seconds:.1f}s. Training {', '.join(models)} in {workers} processes with {threads} threads each.")
+    results = {}
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_limit_threads, initargs=(threads,)) as pool:
+        futures = {pool.submit(train_model, modelname, threads, bucketing, resume, execution, modelname in hashing, baselines.get(modelname)): modelname for modelname in models}
+        for future in as_completed(futures):
+            modelname = futures[future]
+            try:
+                result = future.result()
+                log(f"{modelname}: {result['seconds']:.1f}s, {result['epochs']} epochs, val_loss {result['val_loss']:.4f}, val_accuracy {result['val_accuracy']:.4f}")
+                if result.get("accuracy_drift") is not None:
+                    log(f"{modelname}: hashing val_accuracy {result['val_accuracy']:.4f} vs {result['vocabulary_accuracy']:.4f} with the fitted vocabulary ({result['accuracy_drift']:+.4f})")
+            except Exception as e:
+                result = {"model": modelname, "error": repr(e)}
+                log(f"{modelname}: failed: {e!r}")
+            results[modelname] = result
+    return {
+        "models": [results[modelname] for modelname in models],
+        "preprocess_seconds": preprocess_seconds,
+        "wall_seconds": time.perf_counter() - start,
+        "serial_seconds": preprocess_seconds + sum(result.get("seconds", 0.0) for result in results.values()),
+        "workers": workers,
+        "threads_per_worker": threads
+    }
@@ -0,0 +1,82 @@
+try:
+    import numpy as np
+except ModuleNotFoundError as e:
+    print(f"Couldn't import modules: {e}")
+    exit(1)
+
+AGGREGATIONS = ("mean", "max_confidence", "length_weighted")
+
+def window_starts(length, maxlen, stride):
+    """
+    Returns the start positions of the token windows covering a sequence.
+
+    Parameters:
+    - length (int): The number of tokens in the sequence.
+    - maxlen (int): The window length.
+    - stride (int): The distance between the starts of consecutive windows.
+
+    Returns:
+    - starts (range): The start of each window. The last window is the first that reaches the end of the sequence, so it may be shorter than `maxlen`. A sequence no longer than `maxlen` has one window.
+    """
+    if length <= maxlen:
+        return range(1)
+    return range(0, length - maxlen + stride, stride)
+
+def sliding_windows(sequences, maxlen, stride, padding='post', dtype=np.int32):
+    """
+    Splits sequences into overlapping windows and pads the windows of all sequences into one array.
+
+    Parameters:
+    - sequences (list): The untruncated word index lists.
+    - maxlen (int): The window length.
+    - stride (int): The distance between the starts of consecutive windows, at most `maxlen`.
+    - padding (str, optional): 'pre' or 'post', the side zeros are added to. Defaults to 'post'.
+    - dtype (numpy.dtype, optional): The array type. Defaults to numpy.int32.
+
+    Returns:
+    - padded (numpy.ndarray): The windows, of shape (number of windows, maxlen). The windows of each sequence are consecutive.
+    - owners (numpy.ndarray): The index of the sequence each window belongs to.
+    - lengths (numpy.ndarray): The number of tokens in each window.
+    """
+    if not 0 < stride <= maxlen:
+        raise ValueError(f"stride must be between 1 and {maxlen}, got {stride}")
+    windows = [(owner, sequence[start:start + maxlen]) for owner, sequence in enumerate(sequences) for start in window_starts(len(sequence), maxlen, stride)]
+    owners = np.fromiter((owner for owner, _ in windows), dtype=np.int64, count=len(windows))
+    lengths = np.fromiter((len(window) for _, window in windows), dtype=np.int64, count=len(windows))
+    padded = np.zeros((len(windows), maxlen), dtype=dtype)
+    positions = np.arange(maxlen)
+    if padding == 'post':
+        mask = positions < lengths[:, None]
+    else:
+        mask = positions >= (maxlen - lengths)[:, None]
+    padded[mask] = np.fromiter((i for _, window in windows for i in window), dtype=dtype, count=int(lengths.sum()))
+    return padded, owners, lengths
+
+def aggregate(probabilities, owners, lengths, count, strategy="mean"):
+    """
+    Combines the window probabilities of each sequence into one probability.
+
+    Parameters:
+    - probabilities (numpy.ndarray): The positive-class probability of each window.
+    - owners (numpy.ndarray): The index of the sequence each window belongs to, as returned by `sliding_windows`.
+    - lengths (numpy.ndarray): The number of tokens in each window.
+    - count (int): The number of sequences.
+    - strategy (str, optional): "mean" averages the windows, "length_weighted" weights each window by its number of tokens so a short tail window counts less, and "max_confidence" takes the window furthest from 0.5. Defaults to "mean".
+
+    Returns:
+    - probabilities (numpy.ndarray): The probability of each sequence.
+
+    Raises:
+    - ValueError: If the strategy is unknown.
+    """
+    if strategy == "mean":
+        return (np.bincount(owners, weights=probabilities, minlength=count) / np.bincount(owners, minlength=count)).astype(np.float32)
+    if strategy == "length_weighted":
+        # Empty sequences have one window of length 0, so their weight is floored at 1.
+        weights = np.maximum(lengths, 1)
+        return (np.bincount(owners, weights=probabilities * weights, minlength=count) / np.bincount(owners, weights=weights, minlength=count)).astype(np.float32)
+    if strategy == "max_confidence":
+        order = np.lexsort((-np.abs(probabilities - 0.5), owners))
+        _, first = np.unique(owners[order], return_index=True)
+        return probabilities[order[first]].astype(np.float32)
+    raise ValueError(f"Unknown aggregation {strategy}")
@@ -0,0 +1 @@
+# Puts the project directory on sys.path, so the tests import the `Project1` package as `main.py` does.
@@ -1,3 +1,12 @@
-from Project1.app import app
+import sys
+import time
 
-app.run()
\ No newline at end of file
+if __name__ == "__main__":
+    started = time.perf_counter()
+    if len(sys.argv) > 1:
+        from Project1.cli import main
+        sys.exit(main())
+
+    from Project1.app import app
+
+    app.run(started)
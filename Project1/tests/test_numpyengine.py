@@ -0,0 +1,60 @@
+import pytest
+
+keras = pytest.importorskip("keras")
+import numpy as np
+
+from Project1.numpyengine import NumpyModel, save_weights
+
+VOCABULARY = 50
+MAXLEN = 24
+
+def stacks():
+    """
+    Returns the layer stacks the engine supports: the three sentiment models and variants of their layers.
+    """
+    layers = keras.layers
+    return {
+        "rnn": [layers.Embedding(VOCABULARY, 8), layers.Dropout(0.5), layers.SimpleRNN(6), layers.Dense(1, activation="sigmoid")],
+        "rnn_sequences": [layers.Embedding(VOCABULARY, 8), layers.SimpleRNN(6, return_sequences=True, go_backwards=True), layers.SimpleRNN(5, activation="relu"), layers.Dense(1, activation="sigmoid")],
+        "lstm": [layers.Embedding(VOCABULARY, 8), layers.Bidirectional(layers.LSTM(6)), layers.Dense(1, activation="sigmoid")],
+        "lstm_sequences": [layers.Embedding(VOCABULARY, 8), layers.Bidirectional(layers.LSTM(6, return_sequences=True)), layers.LSTM(4, go_backwards=True), layers.Dense(1, activation="sigmoid")],
+        "cnn": [layers.Embedding(VOCABULARY, 8), layers.Conv1D(6, 5, activation="relu"), layers.MaxPooling1D(3), layers.Bidirectional(layers.LSTM(4, return_sequences=True)), layers.Bidirectional(layers.LSTM(4)), layers.Dense(1, activation="sigmoid")],
+        "cnn_strided_pool": [layers.Embedding(VOCABULARY, 8), layers.Conv1D(6, 3, activation="tanh"), layers.MaxPooling1D(4, strides=2), layers.SimpleRNN(4), layers.Dense(3, activation="relu"), layers.Dense(1, activation="linear")]
+    }
+
+def random_model(layers, seed):
+    """
+    Builds a model and replaces all its weights, biases included, with random values, so every gate and bias is exercised.
+    """
+    model = keras.Sequential([keras.Input((MAXLEN,), dtype="int32")] + layers)
+    rng = np.random.default_rng(seed)
+    model.set_weights([rng.normal(0, 0.5, weight.shape).astype(np.float32) for weight in model.get_weights()])
+    return model
+
+def padded(seed, rows=9):
+    """
+    Returns random padded sequences of varied lengths, with zeros as padding.
+    """
+    rng = np.random.default_rng(seed)
+    batch = rng.integers(1, VOCABULARY, (rows, MAXLEN), dtype=np.int32)
+    for row, length in enumerate(rng.integers(0, MAXLEN + 1, rows)):
+        batch[row, length:] = 0
+    return batch
+
+@pytest.mark.parametrize("name", list(stacks()))
+def test_matches_keras(name, tmp_path):
+    model = random_model(stacks()[name], seed=len(name))
+    filename = str(tmp_path / "model.npz")
+    save_weights(model, filename, "fingerprint")
+    engine = NumpyModel(filename)
+    batch = padded(seed=len(name))
+    expected = model.predict(batch, verbose=0)
+    outputs = engine.predict_on_batch(batch)
+    assert engine.source_fingerprint == "fingerprint"
+    assert outputs.shape == expected.shape
+    assert np.allclose(outputs, expected, rtol=1e-4, atol=1e-5)
+
+def test_rejects_unsupported_layers(tmp_path):
+    model = random_model([keras.layers.Embedding(VOCABULARY, 8), keras.layers.GlobalMaxPooling1D(), keras.layers.Dense(1)], seed=0)
+    with pytest.raises(ValueError):
+        save_weights(model, str(tmp_path / "model.npz"), "fingerprint")
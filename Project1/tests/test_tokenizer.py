@@ -0,0 +1,74 @@
+import itertools
+import pytest
+
+keras = pytest.importorskip("keras")
+try:
+    from keras.preprocessing.text import Tokenizer
+except ImportError:
+    # Keras 3 dropped the text preprocessing module. tf_keras still ships it.
+    Tokenizer = pytest.importorskip("tf_keras.preprocessing.text").Tokenizer
+from keras.utils import pad_sequences
+import numpy as np
+
+from Project1.tokenizer import FastTokenizer, tokenizer_from_json
+
+# Word counts tie ("good"/"bad", "plot"/"acting"/"twist") so the first-occurrence order decides their index.
+TEXTS = [
+    "A good film, with a GOOD plot!",
+    "A bad film; bad acting and a twist.",
+    "The plot, the acting, the twist... the end?",
+    "Unseen words: zebra (quokka) [axolotl] {narwhal}",
+    "",
+    "good\tbad\nplot",
+    "one two three four five six seven eight nine ten eleven twelve"
+]
+QUERIES = TEXTS + ["good zebra unknown-words here", "the THE the", "!!!"]
+
+def fitted(num_words, oov_token, workers=1, chunk_size=2000):
+    """
+    Fits a `FastTokenizer` and a Keras `Tokenizer` with the same settings on the same texts.
+    """
+    fast = FastTokenizer(num_words=num_words, oov_token=oov_token)
+    fast.fit_on_texts(TEXTS, workers=workers, chunk_size=chunk_size)
+    reference = Tokenizer(num_words=num_words, oov_token=oov_token)
+    reference.fit_on_texts(TEXTS)
+    return fast, reference
+
+SETTINGS = list(itertools.product([None, 8], [None, "<OOV>"]))
+
+@pytest.mark.parametrize("num_words,oov_token", SETTINGS)
+def test_word_index_matches_keras(num_words, oov_token):
+    fast, reference = fitted(num_words, oov_token)
+    assert fast.word_index == reference.word_index
+    assert fast.document_count == reference.document_count
+
+@pytest.mark.parametrize("num_words,oov_token", SETTINGS)
+def test_sequences_match_keras(num_words, oov_token):
+    fast, reference = fitted(num_words, oov_token)
+    assert fast.texts_to_sequences(QUERIES) == reference.texts_to_sequences(QUERIES)
+
+@pytest.mark.parametrize("num_words,oov_token", SETTINGS)
+@pytest.mark.parametrize("padding,truncating", list(itertools.product(["pre", "post"], repeat=2)))
+@pytest.mark.parametrize("maxlen", [1, 5, 20])
+def test_padded_matches_keras(num_words, oov_token, padding, truncating, maxlen):
+    fast, reference = fitted(num_words, oov_token)
+    expected = pad_sequences(reference.texts_to_sequences(QUERIES), maxlen=maxlen, padding=padding, truncating=truncating)
+    padded = fast.texts_to_padded(QUERIES, maxlen=maxlen, padding=padding, truncating=truncating)
+    assert padded.shape == expected.shape
+    np.testing.assert_array_equal(padded, expected)
+
+@pytest.mark.parametrize("num_words,oov_token", SETTINGS)
+def test_parallel_fit_matches_serial(num_words, oov_token):
+    serial, reference = fitted(num_words, oov_token)
+    parallel, _ = fitted(num_words, oov_token, workers=2, chunk_size=2)
+    assert list(parallel.word_counts.items()) == list(serial.word_counts.items())
+    assert parallel.word_index == serial.word_index == reference.word_index
+    assert parallel.document_count == serial.document_count
+    assert parallel.texts_to_sequences(QUERIES) == reference.texts_to_sequences(QUERIES)
+
+@pytest.mark.parametrize("num_words,oov_token", SETTINGS)
+def test_keras_artifact_loads(num_words, oov_token):
+    _, reference = fitted(num_words, oov_token)
+    loaded = tokenizer_from_json(reference.to_json())
+    assert loaded.texts_to_sequences(QUERIES) == reference.texts_to_sequences(QUERIES)
+    assert tokenizer_from_json(loaded.to_json()).texts_to_sequences(QUERIES) == reference.texts_to_sequences(QUERIES)